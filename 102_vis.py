@@ -1,7 +1,12 @@
+import os
 import json
+import time
 import cv2
 import numpy as np
 import matplotlib.pyplot as plt
+from seg_mask import (LabelTable, rasterize_shapes, blend_mask, save_index_mask, load_index_mask,
+                      write_label_table, label_table_matches)
+from prefetch import prefetch
 
 # 1) JSON 파일 경로와 이미지 경로 설정
 json_path = "/home/young/LocalDataset/01_AdverseWeather/102.고정밀데이터_수집차량_악천후_데이터/01-1.정식개방데이터/Validation/02.라벨링데이터/Clip_000/Camera/Camera_Front/375_ND_000_CF_007.json"
@@ -26,52 +31,180 @@ label_colors = {
     # 필요하다면 다른 레이블도 추가
 }
 
-# 3) JSON 로드
-with open(json_path, "r", encoding="utf-8") as f:
-    json_data = json.load(f)
+# 투명도 (alpha: 마스크 색 비율, 0.0~1.0)
+alpha = 0.5
+
+# 배치 모드: Validation 세트의 Clip_*/Camera/* 전체를 마스크/오버레이로 저장
+#   BATCH_CLIPS = None        → 위의 단일 파일만 화면에 표시
+#   BATCH_CLIPS = ["Clip_000", "Clip_001"] 또는 "all"
+VALIDATION_ROOT = "/home/young/LocalDataset/01_AdverseWeather/102.고정밀데이터_수집차량_악천후_데이터/01-1.정식개방데이터/Validation"
+BATCH_CLIPS = None
+BATCH_OUTPUT_DIR = os.path.join(VALIDATION_ROOT, "seg_output")
+
+IMAGE_EXTENSIONS = [".jpg", ".png"]
+
+# 오버레이 이미지 저장 여부와 형식 (.jpg가 .png보다 인코딩이 훨씬 빠름)
+SAVE_OVERLAYS = True
+OVERLAY_EXT = ".jpg"
 
-# JSON 내부에서 imagePath, imageHeight, imageWidth 정보 얻기
-image_path = json_data.get("imagePath", None)
-img_h = json_data.get("imageHeight", None)
-img_w = json_data.get("imageWidth", None)
+# 클래스 인덱스 마스크(1채널 PNG) 저장 여부
+#   저장해 두면 다음 실행부터는 JSON이 바뀌지 않은 프레임의 폴리곤 래스터화를 건너뛰고 마스크를 읽음
+#   (인덱스 → 라벨 표는 <MASK_DIR>/labels.json)
+SAVE_INDEX_MASKS = True
+MASK_DIR = os.path.join(BATCH_OUTPUT_DIR, "masks")
 
-# 4) 원본 이미지 로드 또는 빈 캔버스 생성
-if image_path is not None:
-    # 이미지가 존재할 경우
-    img = cv2.imread(image_path)
+# 이미지/JSON prefetch (0이면 순차 처리)
+PREFETCH_DEPTH = 8
+PREFETCH_WORKERS = 4
+
+
+# 3) 원본 이미지 로드 또는 빈 캔버스 생성
+def load_frame_image(image_path, img_h, img_w):
+    """이미지를 BGR로 읽음 — 경로가 없거나 읽을 수 없으면 (img_h, img_w) 검정 캔버스"""
+    img = cv2.imread(image_path) if image_path is not None else None
     if img is None:
-        # 이미지 파일을 못 찾으면 빈 검정 캔버스로 대체
         img = np.zeros((img_h, img_w, 3), dtype=np.uint8)
-else:
-    # imagePath 필드가 비어있거나 없을 경우 빈 캔버스
-    img = np.zeros((img_h, img_w, 3), dtype=np.uint8)
-
-# Overlay 용 마스크 생성 (투명도 있는 시각화를 위해)
-overlay = img.copy()
-
-# 5) 각각의 shape(폴리곤) 그리기
-for shape in json_data["shapes"]:
-    label = shape["label"]
-    points = shape["points"]  # [[x1,y1], [x2,y2], ...]
-    
-    # label에 매칭되는 색상 가져오기 (없으면 흰색)
-    color = label_colors.get(label, (255, 255, 255))
-    
-    # numpy 배열로 변환 (정수형)
-    pts = np.array(points, dtype=np.int32)
-    pts = pts.reshape((-1, 1, 2))  # OpenCV가 요구하는 형태로 reshape
-    
-    # 폴리곤 내부를 색으로 채우기
-    cv2.fillPoly(overlay, [pts], color)
-
-# 6) 투명도 조절 후 합성 (alpha: 투명도 비율, 0.0~1.0)
-alpha = 0.5
-cv2.addWeighted(overlay, alpha, img, 1 - alpha, 0, img)
-
-# 7) Matplotlib을 이용해 BGR→RGB 변환 후 화면에 출력
-img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-plt.figure(figsize=(12, 8))
-plt.imshow(img_rgb)
-plt.axis("off")
-plt.title("Segmentation Overlay")
-plt.show()
+    return img
+
+
+def show_single(json_path, table):
+    """단일 JSON: 마스크 합성 결과를 Matplotlib으로 화면에 표시"""
+    with open(json_path, "r", encoding="utf-8") as f:
+        json_data = json.load(f)
+
+    # JSON 내부에서 imagePath, imageHeight, imageWidth 정보 얻기
+    img = load_frame_image(json_data.get("imagePath", None),
+                           json_data.get("imageHeight", None), json_data.get("imageWidth", None))
+
+    # 4) 모든 shape를 클래스 인덱스 마스크 하나에 그린 뒤, 라벨 색으로 in-place 합성
+    mask = rasterize_shapes(json_data["shapes"], table, img.shape[0], img.shape[1])
+    blend_mask(img, mask, table.lut, alpha)
+
+    # 5) Matplotlib을 이용해 BGR→RGB 변환 후 화면에 출력
+    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    plt.figure(figsize=(12, 8))
+    plt.imshow(img_rgb)
+    plt.axis("off")
+    plt.title("Segmentation Overlay")
+    plt.show()
+
+
+# 6) 배치 모드: Clip 목록 → (JSON, 이미지) 쌍 찾기
+def find_camera_frames(validation_root, clips="all"):
+    """
+    Validation/02.라벨링데이터/<Clip>/Camera/<Camera_*>/*.json 과
+    Validation/01.원천데이터/<Clip>/Camera/<Camera_*>/<같은 이름>.jpg|.png 를 짝지어 반환.
+    • clips: Clip 폴더 이름 리스트 또는 "all"
+    반환: [(rel_base, json_path, image_path 또는 None), ...] (정렬됨)
+        rel_base 예: "Clip_000/Camera/Camera_Front/375_ND_000_CF_007"
+    """
+    source_root = os.path.join(validation_root, "01.원천데이터")
+    label_root = os.path.join(validation_root, "02.라벨링데이터")
+    if clips == "all":
+        clips = sorted(d for d in os.listdir(label_root) if d.startswith("Clip_"))
+
+    frames = []
+    for clip in clips:
+        camera_root = os.path.join(label_root, clip, "Camera")
+        if not os.path.isdir(camera_root):
+            print(f"[!] Camera 폴더가 없습니다: {camera_root}")
+            continue
+        for camera in sorted(os.listdir(camera_root)):
+            rel_dir = os.path.join(clip, "Camera", camera)
+            label_dir = os.path.join(label_root, rel_dir)
+            source_dir = os.path.join(source_root, rel_dir)
+            # 카메라 폴더마다 listdir 한 번으로 이미지 인덱스 (같은 이름이면 IMAGE_EXTENSIONS 앞쪽 우선)
+            names = os.listdir(source_dir) if os.path.isdir(source_dir) else []
+            images = {}
+            for ext in reversed(IMAGE_EXTENSIONS):
+                for name in names:
+                    base, name_ext = os.path.splitext(name)
+                    if name_ext.lower() == ext:
+                        images[base] = os.path.join(source_dir, name)
+            for name in sorted(os.listdir(label_dir)):
+                base, ext = os.path.splitext(name)
+                if ext.lower() == ".json":
+                    frames.append((os.path.join(rel_dir, base), os.path.join(label_dir, name),
+                                   images.get(base)))
+    return frames
+
+
+def run_batch(validation_root, clips, output_dir, table):
+    """
+    Clip들의 카메라 프레임을 한 장씩 처리:
+      JSON → 인덱스 마스크 (저장된 최신 마스크가 있으면 그대로 읽음) → 오버레이 합성/저장
+    """
+    frames = find_camera_frames(validation_root, clips)
+    print(f"[*] 총 {len(frames)}개의 카메라 프레임을 처리합니다.")
+    # 라벨 표가 바뀌었으면 기존 마스크의 인덱스 의미가 달라지므로 재사용하지 않음
+    reuse_masks = SAVE_INDEX_MASKS and label_table_matches(MASK_DIR, table)
+    if SAVE_INDEX_MASKS:
+        write_label_table(MASK_DIR, table)
+
+    def mask_is_fresh(mask_path, json_path):
+        return reuse_masks and os.path.isfile(mask_path) \
+            and os.path.getmtime(mask_path) >= os.path.getmtime(json_path)
+
+    num_reused = 0
+    if not SAVE_OVERLAYS:
+        # 마스크만 만드는 경우: 최신 마스크가 있는 프레임은 읽을 필요도 없음
+        todo = [f for f in frames if not mask_is_fresh(os.path.join(MASK_DIR, f[0] + ".png"), f[1])]
+        num_reused = len(frames) - len(todo)
+        frames = todo
+
+    def load(frame):
+        """prefetch 스레드: 최신 마스크(있으면) 또는 JSON, 그리고 이미지 디코딩"""
+        rel_base, json_path, img_path = frame
+        mask, json_data = None, None
+        mask_path = os.path.join(MASK_DIR, rel_base + ".png")
+        if mask_is_fresh(mask_path, json_path):
+            mask = load_index_mask(mask_path)
+        if mask is None:
+            with open(json_path, "r", encoding="utf-8") as f:
+                json_data = json.load(f)
+        img = None
+        if SAVE_OVERLAYS:
+            h, w = mask.shape if mask is not None else (json_data.get("imageHeight"), json_data.get("imageWidth"))
+            img = load_frame_image(img_path, h, w)
+        return mask_path, mask, json_data, img
+
+    num_missing = 0
+    t0 = time.perf_counter()
+    for idx, (frame, (mask_path, mask, json_data, img)) in enumerate(
+            prefetch(frames, load, depth=PREFETCH_DEPTH, num_workers=PREFETCH_WORKERS), start=1):
+        rel_base, json_path, img_path = frame
+        if img_path is None:
+            num_missing += 1
+
+        if mask is not None:
+            num_reused += 1
+        else:
+            if img is not None:
+                h, w = img.shape[:2]
+            else:
+                h, w = json_data["imageHeight"], json_data["imageWidth"]
+            mask = rasterize_shapes(json_data["shapes"], table, h, w)
+            if SAVE_INDEX_MASKS:
+                save_index_mask(mask_path, mask)
+
+        if SAVE_OVERLAYS:
+            blend_mask(img, mask, table.lut, alpha)
+            out_path = os.path.join(output_dir, "overlays", rel_base + OVERLAY_EXT)
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            if not cv2.imwrite(out_path, img):
+                print(f"[!] 저장 실패: {out_path}")
+        if idx % 100 == 0 or idx == len(frames):
+            print(f"  ({idx}/{len(frames)}) {rel_base}")
+
+    elapsed = time.perf_counter() - t0
+    fps = len(frames) / elapsed if elapsed > 0 else 0.0
+    print(f"[*] {len(frames)}개 프레임 처리 (마스크 재사용 {num_reused}개, 이미지 없음 {num_missing}개), "
+          f"{elapsed:.1f}초 → {fps:.1f} frames/sec")
+
+
+if __name__ == "__main__":
+    table = LabelTable(label_colors)
+    if BATCH_CLIPS is not None:
+        run_batch(VALIDATION_ROOT, BATCH_CLIPS, BATCH_OUTPUT_DIR, table)
+    else:
+        show_single(json_path, table)
@@ -1,109 +1,191 @@
-import json
+import os
+import glob
 import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D  # 3D 축용
+from box_geometry import add_box_collection
+from dataset_formats import load_frame
+from pcd_io import read_kitti_bin, iter_kitti_sweeps
+from point_sampling import downsample_points
 
 # 1) 파일 경로 설정
 json_path = "/home/young/LocalDataset/01_AdverseWeather/102.고정밀데이터_수집차량_악천후_데이터/01-1.정식개방데이터/Validation/02.라벨링데이터/Clip_000/Lidar/Lidar_Roof/375_ND_000_LR_007.json"
 pcd_bin_path = "/home/young/LocalDataset/01_AdverseWeather/102.고정밀데이터_수집차량_악천후_데이터/01-1.정식개방데이터/Validation/01.원천데이터/Clip_000/Lidar/Lidar_Roof/375_ND_000_LR_007.bin"  # 실제 .bin 파일 경로를 맞춰주세요
 
-# 2) .bin 포인트클라우드 읽기 (KITTI 형식: float32 x,y,z,intensity)
-points = np.fromfile(pcd_bin_path, dtype=np.float32).reshape(-1, 4)
-xyz = points[:, :3]  # (N,3)
-
-# 3) JSON 어노테이션 읽기
-with open(json_path, "r", encoding="utf-8") as f:
-    data = json.load(f)
+# BEV 렌더러 사용 여부 (True: NumPy 래스터 BEV 이미지, False: Matplotlib 3D scatter)
+USE_BEV_RENDERER = True
+BEV_METERS_PER_PIXEL = 0.1  # 픽셀 하나가 덮는 거리 [m]
+BEV_COLOR_BY = "z"          # "z"(높이) 또는 "intensity"
+
+# 3D scatter 전 다운샘플링 (point_sampling.downsample_points 인자, None이면 해당 단계 생략)
+#   voxel_size: 복셀 평균 크기 [m], max_points: 최대 점 개수,
+#   lod_near_range: 이 거리 [m] 안쪽은 원본 유지 (바깥은 거리에 따라 복셀 확대, 예: 20.0)
+#                   거리는 좌표 원점 기준 → 센서 원점 sweep에서만 의미 있음, 다른 스크립트와 같이 기본은 끔
+DOWNSAMPLE = {"voxel_size": 0.1, "max_points": 200_000, "lod_near_range": None}
+
+# ROI 크롭 (memmap에서 바로 잘라내므로 ROI 밖의 점은 메모리로 복사되지 않음)
+#   None이면 해당 조건은 적용하지 않음
+ROI = {
+    "max_range": 80.0,        # 센서로부터 수평 거리 [m]
+    "z_range": (-3.0, 5.0),   # 높이 범위 [m]
+    "fov_deg": None,          # 수평 시야각 [deg] (예: 120 → 전방 ±60도)
+}
+
+# 배치 모드: Validation 세트의 여러 Clip을 스트리밍하며 BEV PNG로 저장
+#   BATCH_CLIPS = None        → 위의 단일 파일만 화면에 표시
+#   BATCH_CLIPS = ["Clip_000", "Clip_001"] 또는 "all"
+VALIDATION_ROOT = "/home/young/LocalDataset/01_AdverseWeather/102.고정밀데이터_수집차량_악천후_데이터/01-1.정식개방데이터/Validation"
+BATCH_CLIPS = None
+BATCH_OUTPUT_DIR = os.path.join(VALIDATION_ROOT, "bev_output")
+
+# 카테고리별 색상 (정의되지 않은 카테고리는 보라색)
+color_map = {
+    "car":   "r",
+    "truck": "b",
+    "bus":   "g"
+}
+
+
+# 2) JSON 어노테이션 읽기 + 모든 바운딩박스 코너를 한 번에 계산
+def load_annotation_boxes(json_path):
+    """
+    반환: (box_corners (N,8,3), box_colors 리스트)
+    (3dbbox.dimension = [length, height, width] → "102" 규약)
+    """
+    frame = load_frame(json_path, fmt="102_lidar")  # dataset_formats.read_102_lidar
+    box_colors = [color_map.get(cls, "m") for cls in frame.box_classes]
+    return frame.boxes3d, box_colors
 
-annotations = data["annotations"]  # JSON 구조에 따라 키가 다를 수 있으니, 실제 필드를 확인하세요.
 
-# 4) 바운딩박스 코너 계산 함수
-def get_3d_bbox_corners(center, dims, yaw):
+# 3) BEV 모드: 포인트/박스를 이미지 버퍼에 바로 래스터라이즈
+def render_bev_image(points, box_corners, box_colors):
+    """
+    반환: (bev 이미지 (H,W,3) RGB, x_range, y_range)
+    범위는 3D 모드와 같은 정사각형 (포인트 범위의 중심 ± max_range/2)
+    """
+    from bev_renderer import render_bev
+
+    xyz = points[:, :3]
+    xy_min = xyz[:, :2].min(axis=0)
+    xy_max = xyz[:, :2].max(axis=0)
+    mid_xy = (xy_min + xy_max) / 2
+    half = (xy_max - xy_min).max() / 2
+    x_range = (mid_xy[0] - half, mid_xy[0] + half)
+    y_range = (mid_xy[1] - half, mid_xy[1] + half)
+
+    bev = render_bev(points if BEV_COLOR_BY == "intensity" else xyz,
+                     x_range, y_range, meters_per_pixel=BEV_METERS_PER_PIXEL,
+                     color_by=BEV_COLOR_BY, cmap="viridis",
+                     box_corners=box_corners, box_colors=box_colors)
+    return bev, x_range, y_range
+
+
+def show_bev(points, box_corners, box_colors):
+    bev, x_range, y_range = render_bev_image(points, box_corners, box_colors)
+    plt.figure(figsize=(12, 9))
+    plt.imshow(bev, extent=(x_range[0], x_range[1], y_range[0], y_range[1]))
+    plt.title("PointCloud + 3D Bounding Boxes (BEV raster)")
+    plt.xlabel("X")
+    plt.ylabel("Y")
+    plt.tight_layout()
+    plt.show()
+
+
+# 4) Matplotlib 3D로 그리기 (USE_BEV_RENDERER=False일 때)
+def show_3d(points, box_corners, box_colors):
+    xyz = points[:, :3]  # (N,3)
+
+    fig = plt.figure(figsize=(12, 9))
+    ax = fig.add_subplot(111, projection='3d')
+    ax.set_title("PointCloud + 3D Bounding Boxes (Matplotlib)")
+    ax.set_xlabel("X")
+    ax.set_ylabel("Y")
+    ax.set_zlabel("Z")
+
+    # 4-1) 포인트클라우드 산점도 (DOWNSAMPLE 설정으로 복셀 평균 + 점 개수 제한)
+    plot_xyz = downsample_points(xyz, **DOWNSAMPLE)
+    ax.scatter(plot_xyz[:, 0], plot_xyz[:, 1], plot_xyz[:, 2],
+               c='gray', s=0.5, alpha=0.5, label="PointCloud")
+
+    # 4-2) 모든 바운딩박스의 12개 엣지를 Line3DCollection 하나로 그리기
+    add_box_collection(ax, box_corners, box_colors, linewidth=1.0)
+
+    ax.view_init(elev=90, azim=-90) # BEV 뷰
+    # 4-3) 축 비율 조정 (PointCloud가 왜곡 없이 보이도록)
+    xyz_range = np.ptp(xyz, axis=0)  # 각 축 범위 (ptp = max-min)
+    max_range = np.max(xyz_range)
+    mid_x = np.mean([np.min(xyz[:, 0]), np.max(xyz[:, 0])])
+    mid_y = np.mean([np.min(xyz[:, 1]), np.max(xyz[:, 1])])
+    mid_z = np.mean([np.min(xyz[:, 2]), np.max(xyz[:, 2])])
+
+    # 중심점 기준으로 반경을 max_range/2로 설정
+    ax.set_xlim(mid_x - max_range/2, mid_x + max_range/2)
+    ax.set_ylim(mid_y - max_range/2, mid_y + max_range/2)
+    ax.set_zlim(mid_z - max_range/2, mid_z + max_range/2)
+
+    plt.legend(loc="upper left")
+    plt.tight_layout()
+    plt.show()
+
+
+# 5) 배치 모드: Clip 목록 → (.bin, .json) 쌍 찾기
+def find_clip_sweeps(validation_root, clips="all"):
     """
-    center: [x, y, z]
-    dims:   [length, height, width]
-    yaw:    라디안 단위 회전 (z축 기준)
-    
-    반환: (8, 3) 모양의 각 꼭짓점 좌표
+    Validation/01.원천데이터/<Clip>/Lidar/Lidar_Roof/*.bin 과
+    Validation/02.라벨링데이터/<Clip>/Lidar/Lidar_Roof/*.json 을 짝지어 반환.
+    • clips: Clip 폴더 이름 리스트 또는 "all"
+    반환: [(bin_path, json_path), ...] (정렬됨, 라벨이 없는 sweep은 제외)
     """
-    l, h, w = dims
-    x_c, y_c, z_c = center
-
-    # ── 로컬 좌표계에서 미리 정의할 8개 코너 (yaw=0, 중심=(0,0,0))
-    x_corners = np.array([ l/2,  l/2, -l/2, -l/2,  l/2,  l/2, -l/2, -l/2])
-    y_corners = np.array([ w/2, -w/2, -w/2,  w/2,  w/2, -w/2, -w/2,  w/2])
-    z_corners = np.array([ h/2,  h/2,  h/2,  h/2, -h/2, -h/2, -h/2, -h/2])
-
-    # 회전 행렬 (z축 기준 yaw)
-    R = np.array([
-        [ np.cos(yaw), -np.sin(yaw), 0],
-        [ np.sin(yaw),  np.cos(yaw), 0],
-        [      0,             0,     1]
-    ])
-
-    corners = np.vstack((x_corners, y_corners, z_corners))   # (3,8)
-    rotated = R @ corners                                    # (3,8)
-    translated = rotated + np.array(center).reshape(3, 1)    # (3,8)
-    return translated.T                                       # (8,3)
-
-# 5) Matplotlib 3D로 그리기
-fig = plt.figure(figsize=(12, 9))
-ax = fig.add_subplot(111, projection='3d')
-ax.set_title("PointCloud + 3D Bounding Boxes (Matplotlib)")
-ax.set_xlabel("X")
-ax.set_ylabel("Y")
-ax.set_zlabel("Z")
-
-# 5-1) 포인트클라우드 산점도
-# 너무 많은 점을 그리면 느리므로, 샘플링을 할 수도 있습니다. (예: xyz[::10])
-ax.scatter(xyz[:, 0], xyz[:, 1], xyz[:, 2],
-           c='gray', s=0.5, alpha=0.5, label="PointCloud")
-
-# 5-2) 각 어노테이션마다 바운딩박스 그리기
-for ann in annotations:
-    center = ann["3dbbox.location"]       # [x, y, z]
-    dims   = ann["3dbbox.dimension"]      # [length, height, width]
-    yaw    = ann["3dbbox.rotation_y"]     # 라디안
-    category = ann.get("3dbbox.category", "unknown")
-
-    # bbox 꼭짓점 (8개)를 구함
-    corners = get_3d_bbox_corners(center, dims, yaw)  # (8,3)
-
-    # 12개 엣지 연결 인덱스 (위쪽 4개 + 아래쪽 4개 + 수직 4개)
-    edges = [
-        (0, 1), (1, 2), (2, 3), (3, 0),  # 상단 사각형
-        (4, 5), (5, 6), (6, 7), (7, 4),  # 하단 사각형
-        (0, 4), (1, 5), (2, 6), (3, 7)   # 수직 엣지
-    ]
-
-    # 카테고리별 색상
-    color_map = {
-        "car":   "r",
-        "truck": "b",
-        "bus":   "g"
-    }
-    c = color_map.get(category, "m")  # 정의되지 않은 카테고리는 보라색
-
-    # 엣지마다 선을 그림
-    for (i, j) in edges:
-        x_line = [corners[i, 0], corners[j, 0]]
-        y_line = [corners[i, 1], corners[j, 1]]
-        z_line = [corners[i, 2], corners[j, 2]]
-        ax.plot(x_line, y_line, z_line, c=c, linewidth=1.0)
-
-ax.view_init(elev=90, azim=-90) # BEV 뷰
-# 6) 축 비율 조정 (PointCloud가 왜곡 없이 보이도록)
-xyz_range = np.ptp(xyz, axis=0)  # 각 축 범위 (ptp = max-min)
-max_range = np.max(xyz_range)
-mid_x = np.mean([np.min(xyz[:, 0]), np.max(xyz[:, 0])])
-mid_y = np.mean([np.min(xyz[:, 1]), np.max(xyz[:, 1])])
-mid_z = np.mean([np.min(xyz[:, 2]), np.max(xyz[:, 2])])
-
-# 중심점 기준으로 반경을 max_range/2로 설정
-ax.set_xlim(mid_x - max_range/2, mid_x + max_range/2)
-ax.set_ylim(mid_y - max_range/2, mid_y + max_range/2)
-ax.set_zlim(mid_z - max_range/2, mid_z + max_range/2)
-
-plt.legend(loc="upper left")
-plt.tight_layout()
-plt.show()
+    source_root = os.path.join(validation_root, "01.원천데이터")
+    label_root = os.path.join(validation_root, "02.라벨링데이터")
+    if clips == "all":
+        clips = sorted(d for d in os.listdir(source_root) if d.startswith("Clip_"))
+
+    pairs = []
+    for clip in clips:
+        lidar_dir = os.path.join(clip, "Lidar", "Lidar_Roof")
+        for bin_path in sorted(glob.glob(os.path.join(source_root, lidar_dir, "*.bin"))):
+            base = os.path.splitext(os.path.basename(bin_path))[0]
+            label_path = os.path.join(label_root, lidar_dir, base + ".json")
+            if os.path.isfile(label_path):
+                pairs.append((bin_path, label_path))
+            else:
+                print(f"[!] 라벨 JSON이 없습니다: {label_path}")
+    return pairs
+
+
+def run_batch(validation_root, clips, output_dir):
+    """Clip들을 한 sweep씩 ROI 크롭해서 스트리밍 → BEV PNG 저장 (전체 sweep을 메모리에 쌓지 않음)"""
+    os.makedirs(output_dir, exist_ok=True)
+    pairs = find_clip_sweeps(validation_root, clips)
+    labels = dict(pairs)
+    print(f"[*] 총 {len(pairs)}개의 sweep을 처리합니다.")
+
+    for idx, (bin_path, points) in enumerate(
+            iter_kitti_sweeps([b for b, _ in pairs], with_intensity=True, **ROI), start=1):
+        if points.shape[0] == 0:
+            print(f"[!] ROI 안에 점이 없습니다: {bin_path}")
+            continue
+        box_corners, box_colors = load_annotation_boxes(labels[bin_path])
+        bev, _, _ = render_bev_image(points, box_corners, box_colors)
+
+        clip = os.path.relpath(bin_path, os.path.join(validation_root, "01.원천데이터")).split(os.sep)[0]
+        base = os.path.splitext(os.path.basename(bin_path))[0]
+        out_path = os.path.join(output_dir, f"{clip}_{base}_bev.png")
+        plt.imsave(out_path, bev)
+        print(f"  ({idx}/{len(pairs)}) 저장 완료: {out_path} (ROI 점 수 = {points.shape[0]})")
+
+
+if __name__ == "__main__":
+    if BATCH_CLIPS is not None:
+        run_batch(VALIDATION_ROOT, BATCH_CLIPS, BATCH_OUTPUT_DIR)
+    else:
+        # .bin 포인트클라우드 읽기 (KITTI 형식: float32 x,y,z,intensity, ROI 크롭 적용)
+        points = read_kitti_bin(pcd_bin_path, with_intensity=True, **ROI)  # (N,4)
+        box_corners, box_colors = load_annotation_boxes(json_path)
+        if points.shape[0] == 0:
+            print(f"[!] ROI 안에 점이 없습니다: {pcd_bin_path} (ROI 설정을 확인하세요)")
+        elif USE_BEV_RENDERER:
+            show_bev(points, box_corners, box_colors)
+        else:
+            show_3d(points, box_corners, box_colors)
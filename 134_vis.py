@@ -1,7 +1,12 @@
 import os
 import json
+import time
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from annotation_store import update_store, read_columns
+from prefetch import prefetch
+from run_manifest import RunManifest
+from stage_timer import StageTracer
 
 # ────────────────────────────────────────────────────────────────────
 # 0) 경로 설정 부분만 실제 환경에 맞게 변경하세요.
@@ -20,98 +25,190 @@ OUTPUT_ROOT = "/home/young/LocalDataset/134.차로_위반_영상_데이터/01.
 # (4) 이미지 확장자 후보 (가장 흔한 순서대로 시도)
 IMAGE_EXTENSIONS = [".jpg", ".png"]
 
-# ────────────────────────────────────────────────────────────────────
-# 1) 출력 폴더가 존재하지 않으면 전체 트리 생성
-for root, dirs, _ in os.walk(ANNOTATION_ROOT):
-    # 라벨링 데이터에서 하위 디렉터리 구조를 그대로 OUTPUT_ROOT로 복제
-    rel = os.path.relpath(root, ANNOTATION_ROOT)  # e.g. "subfolder1/subsub1"
-    out_folder = os.path.join(OUTPUT_ROOT, rel)
-    os.makedirs(out_folder, exist_ok=True)
+# (5) 컬럼형 어노테이션 캐시 (.npz) — 두 번째 실행부터는 바뀐 JSON만 다시 파싱
+#     None이면 캐시를 쓰지 않고 매번 JSON을 직접 읽음
+ANNOTATION_CACHE_PATH = os.path.join(OUTPUT_ROOT, "annotation_cache.npz")
 
-# ────────────────────────────────────────────────────────────────────
-# 2) 인덱싱용 함수: 하나의 경로에서 JSON → 이미지 경로 매핑
-def find_corresponding_image(annotation_json_path):
-    """
-    annotation_json_path 예시:
-      /.../라벨링데이터/A/subfolder1/subsub1/[WHITE]72526A_174119_003.json
+# 폴리곤/메타정보에 필요한 컬럼 (annotation_store "lane_violation" 스키마)
+ANNOTATION_COLUMNS = ["polygon", "violation_type", "video_id", "camera_channel", "time_info",
+                      "camera_number", "annotation", "extra_label", "extra_value",
+                      "extra_color", "object_label"]
 
-    반환값:
-      "/.../원천데이터/A/subfolder1/subsub1/[WHITE]72526A_174119_003.jpg" 등
-      이미지가 없다면 None 리턴
-    """
-    # (1) 절대 경로에서 ANNOTATION_ROOT까지의 상대 경로 (디렉터리 + 파일이름)
-    rel_path = os.path.relpath(annotation_json_path, ANNOTATION_ROOT)
-    # rel_path 예: "subfolder1/subsub1/[WHITE]72526A_174119_003.json"
+# (6) 이미지 prefetch: 현재 프레임을 그리는 동안 다음 이미지들을 스레드에서 미리 디코딩
+#     PREFETCH_DEPTH = 0이면 기존처럼 순차 처리
+PREFETCH_DEPTH   = 8     # 미리 읽어 둘 최대 프레임 수
+PREFETCH_MAX_MB  = 1024  # 미리 읽어 둔 이미지의 메모리 상한 [MB]
+PREFETCH_WORKERS = 4     # I/O 스레드 수
+
+# (7) 그리기 백엔드
+#     "matplotlib": Figure + patches + savefig(dpi=200) (기존 방식)
+#     "cv2"       : 원본 해상도 이미지 버퍼에 OpenCV로 직접 그림 (훨씬 빠름, 텍스트는 ASCII만 지원)
+RENDER_BACKEND = "matplotlib"
+
+# (8) 출력 manifest — 출력마다 입력(JSON, 이미지) 크기/mtime과 렌더 설정을 기록
+#     다시 실행하면 최신 출력은 건너뛰고 없거나 바뀐 것만 렌더링 (None이면 매번 전체 렌더링)
+MANIFEST_PATH = os.path.join(OUTPUT_ROOT, "render_manifest.json")
 
-    # (2) 확장자(.json) 떼어낸 base 이름과 하위 디렉터리 경로 분리
-    rel_dir, rel_file = os.path.split(rel_path)
-    base_name, _ = os.path.splitext(rel_file)  # → "[WHITE]72526A_174119_003"
+# (9) 짝이 없는 파일(이미지만 있거나 JSON만 있는 경우) 목록을 몇 개까지 출력할지
+ORPHAN_REPORT_LIMIT = 20
 
-    # (3) IMAGE_ROOT + rel_dir 내부에서 base_name + 확장자(.jpg/.png) 찾기
-    for ext in IMAGE_EXTENSIONS:
-        candidate = os.path.join(IMAGE_ROOT, rel_dir, base_name + ext)
-        if os.path.isfile(candidate):
-            return candidate
+# (10) 단계별 시간 trace (JSON-lines, 프레임당 한 줄) — None이면 끔
+#      parse / decode / wait(prefetch 대기) / draw / savefig 시간과 객체 수, 출력 크기를 기록하고
+#      끝나면 단계별 p50/p95와 가장 느린 프레임을 출력
+#      (decode와 캐시 없는 parse는 prefetch 스레드에서 실행 — 메인 루프가 실제로 막힌 시간은 wait)
+TRACE_PATH = None  # 예: os.path.join(OUTPUT_ROOT, "stage_trace.jsonl")
 
-    return None
+# (11) 콘택트 시트(모자이크) 모드 — 프레임별 200dpi PNG 대신 썸네일을 cols × rows 격자로 모아 저장
+#      - reduce: JPEG를 cv2.IMREAD_REDUCED_COLOR_<n>으로 디코딩 단계에서 바로 1/n 해상도로 읽음 (1, 2, 4, 8)
+#      - 폴리곤 좌표도 1/n로 줄여서 그리고, 위반 종류 태그와 프레임 id(파일 이름)만 표시
+#      - 출력: CONTACT_SHEET_DIR/sheet_0001.jpg, ... (manifest는 사용하지 않음)
+#      None이면 기존처럼 JSON마다 한 장씩 저장
+CONTACT_SHEET = None  # 예: {"cols": 6, "rows": 5, "reduce": 4, "tile_width": 480}
+CONTACT_SHEET_DIR = os.path.join(OUTPUT_ROOT, "contact_sheets")
+
+# OpenCV(cv2)는 cv2 백엔드 / 콘택트 시트 모드에서만 import
+if RENDER_BACKEND == "cv2" or CONTACT_SHEET is not None:
+    from cv_overlay import read_bgr, read_bgr_reduced, draw_polygon, draw_tag, draw_text_panel, save_bgr
+if CONTACT_SHEET is not None:
+    from contact_sheet import ContactSheetWriter
 
 # ────────────────────────────────────────────────────────────────────
-# 3) JSON 파일마다 처리하기
-count = 0
-for dirpath, _, filenames in os.walk(ANNOTATION_ROOT):
-    for fname in filenames:
-        if not fname.lower().endswith(".json"):
+# 1) 인덱싱: os.scandir로 트리를 한 번만 훑어서 (상대 폴더, base 이름) → 경로 dict 생성
+#    - 파일마다 os.path.isfile()을 확장자 수만큼 호출하지 않음 (네트워크/WSL 파일시스템에서 큰 차이)
+#    - 출력 폴더는 미리 복제하지 않고, 실제로 저장할 때 만듦
+def scan_files(top, extensions):
+    """
+    top 아래를 재귀적으로 훑어서 확장자가 extensions(소문자 비교)에 속하는 파일을 반환.
+    반환: [(rel_dir, base_name, ext, path), ...] — 폴더/파일 이름순 (rel_dir은 top 바로 아래면 "")
+    """
+    extensions = tuple(ext.lower() for ext in extensions)
+    found = []
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            with os.scandir(os.path.join(top, rel_dir)) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            print(f"[!] 폴더를 읽을 수 없습니다: {e}")
             continue
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir():
+                subdirs.append(os.path.join(rel_dir, entry.name))
+                continue
+            base_name, ext = os.path.splitext(entry.name)
+            if ext.lower() in extensions:
+                found.append((rel_dir, base_name, ext.lower(), entry.path))
+        stack.extend(reversed(subdirs))  # 이름순으로 깊이 우선 탐색
+    return found
+
+
+def build_image_index(image_root, extensions):
+    """
+    (rel_dir, base_name) → 이미지 경로.
+    같은 이름의 이미지가 여러 확장자로 있으면 extensions 앞쪽(기존 탐색 순서)을 우선
+    """
+    priority = {ext.lower(): i for i, ext in enumerate(extensions)}
+    index, best = {}, {}
+    for rel_dir, base_name, ext, path in scan_files(image_root, extensions):
+        key = (rel_dir, base_name)
+        if key not in index or priority[ext] < best[key]:
+            index[key], best[key] = path, priority[ext]
+    return index
 
-        count += 1
-        json_path = os.path.join(dirpath, fname)
 
-        # (1) JSON ↔ 이미지 경로 매핑
-        img_path = find_corresponding_image(json_path)
-        if img_path is None:
-            print(f"[!] 이미지 파일을 찾을 수 없습니다: {json_path}")
+def report_orphans(json_keys, image_index, limit=ORPHAN_REPORT_LIMIT):
+    """이미지가 없는 JSON(orphan 라벨)과 JSON이 없는 이미지(orphan 이미지)를 출력"""
+    json_key_set = set(json_keys)
+    orphan_labels = [k for k in json_keys if k not in image_index]
+    orphan_images = [k for k in image_index if k not in json_key_set]
+    for title, keys in (("이미지가 없는 JSON", orphan_labels), ("JSON이 없는 이미지", orphan_images)):
+        if not keys:
             continue
+        print(f"[!] {title}: {len(keys)}개")
+        for rel_dir, base_name in sorted(keys)[:limit]:
+            print(f"    - {os.path.join(rel_dir, base_name)}")
+        if len(keys) > limit:
+            print(f"    ... 외 {len(keys) - limit}개")
+    return orphan_labels, orphan_images
 
-        # (2) JSON 로드
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
 
-        # JSON의 최상위 구조가 [ "dataID", "data_set_info" ] 형태라고 가정
-        dataset_info = data.get("data_set_info", {})
-        objects = dataset_info.get("data", [])  # annotation 객체들이 담긴 배열
+# ────────────────────────────────────────────────────────────────────
+# 2) JSON ↔ 이미지 매핑: 인덱스 dict 조회만으로 처리
+#    annotation 예: /.../라벨링데이터/A/subfolder1/subsub1/[WHITE]72526A_174119_003.json
+#    image 예    : /.../원천데이터/A/subfolder1/subsub1/[WHITE]72526A_174119_003.jpg
+json_entries = scan_files(ANNOTATION_ROOT, [".json"])
+json_paths = [path for _, _, _, path in json_entries]
+image_index = build_image_index(IMAGE_ROOT, IMAGE_EXTENSIONS)
+print(f"[*] JSON {len(json_paths)}개, 이미지 {len(image_index)}개를 찾았습니다.")
+report_orphans([(rel_dir, base_name) for rel_dir, base_name, _, _ in json_entries], image_index)
 
-        # (3) 이미지 불러오기 (Matplotlib 전용, RGB)
-        img = plt.imread(img_path)
+store = None
+if ANNOTATION_CACHE_PATH is not None:
+    store = update_store(ANNOTATION_CACHE_PATH, json_paths, dataset="lane_violation")
 
-        # (4) Matplotlib Figure/Axis 준비
-        fig, ax = plt.subplots(1, figsize=(12, 8))
-        ax.imshow(img)
-        ax.set_axis_off()
 
-        # (5) 폴리곤 + 메타정보 그리기
-        for obj in objects:
-            # 5-1) 폴리곤 점들
-            pts = obj["value"].get("points", [])
-            if len(pts) < 3:
-                continue
-            poly_xy = [(p["x"], p["y"]) for p in pts]
+def output_path_for(rel_dir, base_name):
+    """(JSON의 상대 폴더, base 이름) → OUTPUT_ROOT + 동일한 상대 폴더 경로의 결과 PNG 경로"""
+    return os.path.join(OUTPUT_ROOT, rel_dir, base_name + "_with_meta.png")
+
+
+def load_inputs(task):
+    """
+    prefetch 스레드에서 실행: 이미지 디코딩 (+ 캐시를 안 쓰면 JSON 파싱)
+    반환: (img, columns 또는 None, timer)
+    """
+    json_path, img_path, _ = task
+    timer = tracer.frame(os.path.splitext(os.path.relpath(json_path, ANNOTATION_ROOT))[0])
+    # JSON의 최상위 구조가 [ "dataID", "data_set_info" ] 형태라고 가정 (data_set_info.data)
+    columns = None
+    if store is None:
+        with timer.stage("parse", background=True):
+            columns = read_columns(json_path, "lane_violation")
+    # 이미지 불러오기 (matplotlib 백엔드: RGB, cv2 백엔드: BGR uint8, 콘택트 시트: 축소 BGR uint8)
+    with timer.stage("decode", background=True):
+        if CONTACT_SHEET is not None:
+            img, _ = read_bgr_reduced(img_path, CONTACT_SHEET.get("reduce", 4))
+        elif RENDER_BACKEND == "cv2":
+            img = read_bgr(img_path)
+        else:
+            img = plt.imread(img_path)
+    return img, columns, timer
 
-            # 5-2) 메타정보 추출
-            metainfo = obj["value"].get("metainfo", {})
-            violation_type  = metainfo.get("violation_type", "")
-            video_id        = metainfo.get("video_id", "")
-            camera_channel  = metainfo.get("camera_channel", "")
-            time_info       = metainfo.get("time_info", "")
-            camera_number   = metainfo.get("camera_number", "")
 
-            annotation_type = obj["value"].get("annotation", "")
-            extra = obj["value"].get("extra", {})
-            extra_value = extra.get("value", "")
-            extra_label = extra.get("label", "")
-            extra_color = extra.get("color", "#ff0000")
+def lane_overlays(columns):
+    """
+    어노테이션 컬럼 → 그릴 도형 목록 (백엔드와 무관)
+    반환: [(poly_xy (V,2), extra_color, text_lines), ...] — 점이 3개 미만인 폴리곤은 제외
+    """
+    overlays = []
+    for i, poly_xy in enumerate(columns["polygon"]):
+        if len(poly_xy) < 3:
+            continue
+        text_lines = [
+            f"Violation: {columns['violation_type'][i]}",
+            f"VideoID: {columns['video_id'][i]}",
+            f"Camera: {columns['camera_channel'][i]}-{columns['camera_number'][i]}",
+            f"Time: {columns['time_info'][i]}",
+            f"Type: {columns['annotation'][i]}",
+            f"{columns['extra_label'][i]}: {columns['extra_value'][i]}",
+        ]
+        # object_Label 내부 key:value 쌍도 추가
+        for k, v in json.loads(columns["object_label"][i]).items():
+            text_lines.append(f"{k}: {v}")
+        overlays.append((poly_xy, columns["extra_color"][i], text_lines))
+    return overlays
 
-            obj_label = obj["value"].get("object_Label", {})
 
+def render_matplotlib(img, overlays, out_png, timer):
+    """Matplotlib Figure에 폴리곤 + 메타 텍스트를 그려서 저장 (dpi=200)"""
+    with timer.stage("draw"):
+        fig, ax = plt.subplots(1, figsize=(12, 8))
+        ax.imshow(img)
+        ax.set_axis_off()
+
+        for poly_xy, extra_color, text_lines in overlays:
             # 폴리곤 그리기
             poly_patch = patches.Polygon(
                 poly_xy,
@@ -125,23 +222,10 @@ for dirpath, _, filenames in os.walk(ANNOTATION_ROOT):
 
             # 메타 텍스트: 폴리곤 첫 점 기준으로 약간 오프셋
             first_x, first_y = poly_xy[0]
-            text_lines = [
-                f"Violation: {violation_type}",
-                f"VideoID: {video_id}",
-                f"Camera: {camera_channel}-{camera_number}",
-                f"Time: {time_info}",
-                f"Type: {annotation_type}",
-                f"{extra_label}: {extra_value}",
-            ]
-            # object_Label 내부 key:value 쌍도 추가
-            for k, v in obj_label.items():
-                text_lines.append(f"{k}: {v}")
-
-            text = "\n".join(text_lines)
             ax.text(
                 first_x + 3,
                 first_y + 3,
-                text,
+                "\n".join(text_lines),
                 fontsize=9,
                 color="white",
                 va="top",
@@ -149,17 +233,109 @@ for dirpath, _, filenames in os.walk(ANNOTATION_ROOT):
                 bbox=dict(facecolor=extra_color, edgecolor="none", alpha=0.7, pad=4)
             )
 
-        # (6) 결과 저장: OUTPUT_ROOT + 동일한 상대 폴더 경로
-        rel_dir = os.path.relpath(dirpath, ANNOTATION_ROOT)  # e.g. "subfolder1/subsub1"
-        out_folder = os.path.join(OUTPUT_ROOT, rel_dir)
-        os.makedirs(out_folder, exist_ok=True)
-
-        base_name, _ = os.path.splitext(fname)
-        out_png = os.path.join(out_folder, base_name + "_with_meta.png")
         plt.tight_layout()
+    # savefig = 래스터화 + PNG 인코딩
+    with timer.stage("savefig"):
         fig.savefig(out_png, dpi=200, bbox_inches="tight", pad_inches=0)
         plt.close(fig)
 
-        print(f"[{count:03d}] 저장 완료: {out_png}")
+
+def render_cv2(img, overlays, out_png, timer):
+    """원본 해상도 BGR 버퍼에 폴리곤 + 메타 텍스트를 직접 그려서 저장"""
+    with timer.stage("draw"):
+        for poly_xy, extra_color, text_lines in overlays:
+            draw_polygon(img, poly_xy, extra_color, thickness=2, alpha=0.8)
+            first_x, first_y = poly_xy[0]
+            draw_text_panel(img, text_lines, (first_x + 3, first_y + 3), extra_color, alpha=0.7)
+    with timer.stage("encode"):
+        save_bgr(out_png, img)
+
+
+def render_tile(img, overlays, scale, label, sheets, timer):
+    """축소 이미지에 폴리곤(좌표 × scale) + 위반 종류 태그를 그려서 콘택트 시트에 추가"""
+    with timer.stage("draw"):
+        for poly_xy, extra_color, text_lines in overlays:
+            poly_scaled = poly_xy * scale
+            draw_polygon(img, poly_scaled, extra_color, thickness=1)
+            draw_tag(img, text_lines[0].split(": ", 1)[-1], poly_scaled[0], extra_color, font_scale=0.35)
+    with timer.stage("tile"):  # 타일 배치 (시트가 다 차면 JPEG 인코딩 포함)
+        saved = sheets.add(img, label)
+    if saved is not None:
+        print(f"[V] 시트 저장: {saved} (타일 {sheets.num_tiles}개까지)")
+
+
+# JSON ↔ 이미지 매핑 후, manifest 기준으로 최신인 출력은 건너뜀 (콘택트 시트 모드는 항상 전체)
+manifest = None
+if MANIFEST_PATH is not None and CONTACT_SHEET is None:
+    manifest = RunManifest(MANIFEST_PATH, settings={"backend": RENDER_BACKEND})
+
+tasks = []  # (json_path, img_path, out_png)
+for rel_dir, base_name, _, json_path in json_entries:
+    img_path = image_index.get((rel_dir, base_name))
+    if img_path is None:
+        continue  # 위에서 orphan 라벨로 보고함
+    out_png = output_path_for(rel_dir, base_name)
+    if manifest is not None and manifest.is_up_to_date(out_png, [json_path, img_path]):
+        continue
+    tasks.append((json_path, img_path, out_png))
+print(f"[*] JSON {len(json_paths)}개 중 {len(tasks)}개를 렌더링합니다.")
+
+sheets = None
+if CONTACT_SHEET is not None:
+    sheets = ContactSheetWriter(CONTACT_SHEET_DIR, cols=CONTACT_SHEET.get("cols", 6),
+                                rows=CONTACT_SHEET.get("rows", 5),
+                                tile_width=CONTACT_SHEET.get("tile_width", 480))
+
+tracer = StageTracer(TRACE_PATH)
+try:
+    t_wait = time.perf_counter()
+    for count, (task, (img, columns, timer)) in enumerate(
+            prefetch(tasks, load_inputs, depth=PREFETCH_DEPTH,
+                     max_bytes=PREFETCH_MAX_MB * 1024 * 1024,
+                     num_workers=PREFETCH_WORKERS), start=1):
+        json_path, img_path, out_png = task
+        # 메인 루프가 prefetch 결과를 기다린 시간 (I/O가 병목이면 커짐)
+        timer.add_time("wait", time.perf_counter() - t_wait)
+
+        # (1) 어노테이션 컬럼 (캐시가 있으면 json.load 없이 이 파일의 행만 꺼냄)
+        if columns is None:
+            with timer.stage("parse"):
+                columns = store.rows(json_path, ANNOTATION_COLUMNS)
+                if columns is None:
+                    columns = read_columns(json_path, "lane_violation")
+
+        # (2) 폴리곤 + 메타정보 그리기 후 저장
+        overlays = lane_overlays(columns)
+        timer.count(objects=len(overlays))
+        if sheets is not None:
+            if img is None:
+                print(f"[!] 이미지를 읽을 수 없습니다: {img_path}, 스킵")
+            else:
+                label = os.path.splitext(os.path.basename(json_path))[0]
+                render_tile(img, overlays, 1.0 / CONTACT_SHEET.get("reduce", 4), label, sheets, timer)
+            tracer.record(timer)
+            t_wait = time.perf_counter()
+            continue
+        os.makedirs(os.path.dirname(out_png), exist_ok=True)
+        if RENDER_BACKEND == "cv2":
+            render_cv2(img, overlays, out_png, timer)
+        else:
+            render_matplotlib(img, overlays, out_png, timer)
+
+        if manifest is not None:
+            manifest.record(out_png, [json_path, img_path])
+        timer.add_output(out_png)
+        tracer.record(timer)
+        print(f"[{count:03d}/{len(tasks)}] 저장 완료: {out_png}")
+        t_wait = time.perf_counter()
+finally:
+    # 중간에 중단돼도 그때까지 렌더링한 출력은 기록해 둠
+    if manifest is not None:
+        manifest.save()
+        print(manifest.summary())
+    if sheets is not None:
+        sheets.close()
+        print(f"[V] 콘택트 시트 {len(sheets.paths)}장 저장: {CONTACT_SHEET_DIR} (타일 {sheets.num_tiles}개)")
+    tracer.close()
 
 print("=== 전체 작업 완료 ===")
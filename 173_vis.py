@@ -11,10 +11,24 @@ with open(json_path, "r", encoding="utf-8") as f:
 
 img_path = "/home/young/LocalDataset/173.자율주행_가상센서_시뮬레이션_데이터/01.데이터/Other/image/UR_SE_T1W1_U1_N01_RE01_125.png"
 
+# 그리기 백엔드
+#   "matplotlib": patches + ax.text로 Figure에 그림 (기존 방식)
+#   "cv2"       : 원본 해상도 이미지 버퍼에 OpenCV로 직접 그림 (픽셀 좌표 그대로, 훨씬 빠름)
+RENDER_BACKEND = "matplotlib"
+
+# 결과 저장 경로 (None이면 화면에만 표시)
+#   cv2 백엔드는 원본 해상도 그대로 저장, matplotlib 백엔드는 savefig(dpi=200)
+OUTPUT_PATH = None
+
+# OpenCV(cv2)는 cv2 백엔드에서만 import
+if RENDER_BACKEND == "cv2":
+    from cv_overlay import read_bgr, draw_rectangle, draw_tag, save_bgr
+
 # ────────────────────────────────────────────────────────────────────
-# 2) 원본 이미지 로드 (Matplotlib용으로 RGB로 읽음)
-#    OpenCV 대신 plt.imread()를 써서 바로 NumPy 배열(RGB)로 만듭니다.
-img = plt.imread(img_path)
+# 2) 원본 이미지 로드
+#    matplotlib 백엔드: plt.imread()로 바로 NumPy 배열(RGB)
+#    cv2 백엔드: cv2.imread() 결과(BGR uint8)에 그대로 그림
+img = read_bgr(img_path) if RENDER_BACKEND == "cv2" else plt.imread(img_path)
 h, w, _ = img.shape
 
 # ────────────────────────────────────────────────────────────────────
@@ -22,12 +36,6 @@ h, w, _ = img.shape
 annotations = data["annotations"]
 # 각 ann에는 "bbox": [x_min, y_min, x_max, y_max], "class": 문자열 형태로 있다고 가정
 
-# ────────────────────────────────────────────────────────────────────
-# 4) Matplotlib으로 시각화
-fig, ax = plt.subplots(1, figsize=(12, 8))
-ax.imshow(img)
-ax.set_axis_off()
-
 # 클래스별 색상을 지정하고 싶으면 아래에 맵을 정의해 주세요.
 color_map = {
     "vehicle":   "lime",   # 예: 노랑-녹색 계통
@@ -36,41 +44,65 @@ color_map = {
     # 없으면 기본 빨간색으로 사용
 }
 
-for ann in annotations:
-    bbox = ann["bbox"]  # [x_min, y_min, x_max, y_max]
-    cls  = ann["class"]
+if RENDER_BACKEND == "cv2":
+    # ────────────────────────────────────────────────────────────────
+    # 4-a) OpenCV로 원본 해상도 버퍼에 직접 그리기
+    for ann in annotations:
+        bbox = ann["bbox"]  # [x_min, y_min, x_max, y_max]
+        cls  = ann["class"]
+        edge_color = color_map.get(cls, "red")
+        draw_rectangle(img, bbox, edge_color, thickness=2)
+        draw_tag(img, cls, (bbox[0], bbox[1]), edge_color, font_scale=0.6)
 
-    x_min, y_min, x_max, y_max = bbox
-    width  = x_max - x_min
-    height = y_max - y_min
+    if OUTPUT_PATH is not None:
+        save_bgr(OUTPUT_PATH, img)
+        print(f"바운딩박스가 그려진 이미지를 저장했습니다: {OUTPUT_PATH}")
+    else:
+        plt.figure(figsize=(12, 8))
+        plt.imshow(img[:, :, ::-1])  # BGR → RGB (표시용)
+        plt.axis("off")
+        plt.tight_layout()
+        plt.show()
+else:
+    # ────────────────────────────────────────────────────────────────
+    # 4-b) Matplotlib으로 시각화
+    fig, ax = plt.subplots(1, figsize=(12, 8))
+    ax.imshow(img)
+    ax.set_axis_off()
 
-    # (1) Rectangle 그리기
-    edge_color = color_map.get(cls, "red")
-    rect = patches.Rectangle(
-        (x_min, y_min),
-        width,
-        height,
-        linewidth=2,
-        edgecolor=edge_color,
-        facecolor="none"
-    )
-    ax.add_patch(rect)
+    for ann in annotations:
+        bbox = ann["bbox"]  # [x_min, y_min, x_max, y_max]
+        cls  = ann["class"]
 
-    # (2) 클래스명 텍스트 표시 (상자 위쪽에)
-    ax.text(
-        x_min,
-        y_min - 4,
-        cls,
-        fontsize=12,
-        color="white",
-        bbox=dict(facecolor=edge_color, edgecolor="none", pad=1)
-    )
+        x_min, y_min, x_max, y_max = bbox
+        width  = x_max - x_min
+        height = y_max - y_min
 
-plt.tight_layout()
-plt.show()
+        # (1) Rectangle 그리기
+        edge_color = color_map.get(cls, "red")
+        rect = patches.Rectangle(
+            (x_min, y_min),
+            width,
+            height,
+            linewidth=2,
+            edgecolor=edge_color,
+            facecolor="none"
+        )
+        ax.add_patch(rect)
 
-# ────────────────────────────────────────────────────────────────────
-# 5) 파일로 저장하고 싶으면 아래 주석을 해제하세요.
-# out_path = "UR_SE_T1W1_U1_N01_RE01_001_with_bbox_matplotlib.png"
-# fig.savefig(out_path, dpi=200, bbox_inches="tight", pad_inches=0)
-# print(f"바운딩박스가 그려진 이미지를 저장했습니다: {out_path}")
\ No newline at end of file
+        # (2) 클래스명 텍스트 표시 (상자 위쪽에)
+        ax.text(
+            x_min,
+            y_min - 4,
+            cls,
+            fontsize=12,
+            color="white",
+            bbox=dict(facecolor=edge_color, edgecolor="none", pad=1)
+        )
+
+    plt.tight_layout()
+    if OUTPUT_PATH is not None:
+        fig.savefig(OUTPUT_PATH, dpi=200, bbox_inches="tight", pad_inches=0)
+        print(f"바운딩박스가 그려진 이미지를 저장했습니다: {OUTPUT_PATH}")
+    else:
+        plt.show()
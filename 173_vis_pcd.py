@@ -1,8 +1,9 @@
 import numpy as np
-import open3d as o3d
-import json
 import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d.art3d import Line3DCollection
+from box_geometry import add_box_collection
+from dataset_formats import load_frame
+from pcd_io import read_pcd
+from point_sampling import downsample_points
 
 # =============================================================================
 # (0) 사용자 입력: PCD/JSON 파일 경로를 여기에서 지정
@@ -11,43 +12,18 @@ from mpl_toolkits.mplot3d.art3d import Line3DCollection
 pcd_path  = "/home/young/LocalDataset/173.자율주행_가상센서_시뮬레이션_데이터/01.데이터/Other/lidar/UR_SE_T1W1_U1_N01_RE01_126.pcd"
 json_path = "/home/young/LocalDataset/173.자율주행_가상센서_시뮬레이션_데이터/01.데이터/Other/labeling/UR_SE_T1W1_U1_N01_RE01_126.json"
 
-# =============================================================================
-# (1) 3D 바운딩 박스 8개 코너 계산 함수
-# =============================================================================
-def get_3d_box_corners(center, size, yaw):
-    """
-    center: [x, y, z]
-    size:   [length, width, height]  (l, w, h)
-    yaw:    float (라디안, z축 회전 각도)
-    return: np.ndarray of shape (8, 3)
-    """
-    cx, cy, cz = center
-    l, w, h = size
-
-    # 회전 전 로컬(local) 8개 코너 (center 기준)
-    x_corners = np.array([ -l/2,  l/2,  l/2, -l/2,  -l/2,  l/2,  l/2, -l/2 ])
-    y_corners = np.array([ -w/2, -w/2,  w/2,  w/2,  -w/2, -w/2,  w/2,  w/2 ])
-    z_corners = np.array([ -h/2, -h/2, -h/2, -h/2,   h/2,  h/2,  h/2,  h/2 ])
-
-    # z축 회전 행렬
-    R = np.array([
-        [ np.cos(yaw), -np.sin(yaw), 0 ],
-        [ np.sin(yaw),  np.cos(yaw), 0 ],
-        [          0,            0, 1 ]
-    ])
-
-    corners = np.vstack((x_corners, y_corners, z_corners))  # shape=(3,8)
-    corners_rot = R @ corners                               # (3,8)
+# BEV 렌더러 사용 여부 (True: NumPy 래스터 BEV 이미지, False: Matplotlib 3D scatter)
+USE_BEV_RENDERER = True
+BEV_METERS_PER_PIXEL = 0.1  # 픽셀 하나가 덮는 거리 [m]
 
-    # 전역 좌표로 이동
-    corners_rot[0, :] += cx
-    corners_rot[1, :] += cy
-    corners_rot[2, :] += cz
-
-    return corners_rot.T  # (8,3)
+# 3D scatter 전 다운샘플링 (point_sampling.downsample_points 인자, None이면 해당 단계 생략)
+#   voxel_size: 복셀 평균 크기 [m], max_points: 최대 점 개수,
+#   lod_near_range: 이 거리 [m] 안쪽은 원본 유지 (바깥은 거리에 따라 복셀 확대, 예: 20.0)
+#                   거리는 좌표 원점 기준 → 센서 원점 sweep에서만 의미 있음, 다른 스크립트와 같이 기본은 끔
+DOWNSAMPLE = {"voxel_size": 0.1, "max_points": 200_000, "lod_near_range": None}
 
 # =============================================================================
-# (2) JSON에서 3D 바운딩 박스 정보 읽기
+# (1) JSON에서 3D 바운딩 박스 정보 읽기
 # =============================================================================
 def load_bboxes_from_json(json_path):
     """
@@ -60,48 +36,25 @@ def load_bboxes_from_json(json_path):
         ...
     ]
     """
-    with open(json_path, 'r') as f:
-        data = json.load(f)
-
-    bbox_list = []
-    for obj in data.get("annotations", []):
-        dim  = obj.get("dimension", [])
-        loc  = obj.get("location", [])
-        ori  = obj.get("orientation", [])
-
-        # 3D 정보가 없다면 건너뜀
-        if not (isinstance(dim, list) and len(dim) == 3 and
-                isinstance(loc, list) and len(loc) == 3 and
-                isinstance(ori, list) and len(ori) == 3):
-            continue
-
-        center = loc[:]      # [x, y, z]
-        size   = dim[:]      # [length, width, height]
-        yaw    = ori[2]      # orientation = [roll, pitch, yaw], 라디안
-
-        corners = get_3d_box_corners(center, size, yaw)  # (8,3)
-        bbox_list.append({
-            "class": obj.get("class", "Unknown"),
-            "corners": corners
-        })
-
-    return bbox_list
+    # dimension/location/orientation이 모두 있는 객체만 (dimension = [l, w, h] → "173" 규약)
+    frame = load_frame(json_path, fmt="173")  # dataset_formats.read_173
+    return [{"class": cls, "corners": c} for cls, c in zip(frame.box_classes, frame.boxes3d)]
 
 # =============================================================================
-# (3) PCD 파일을 NumPy 배열로 로드
+# (2) PCD 파일을 NumPy 배열로 로드
 # =============================================================================
 def load_pcd_as_numpy(pcd_path):
     """
-    Open3D를 사용해 PCD를 읽고, (N,3) 형태의 NumPy 배열을 반환
+    PCD를 읽고, (N,3) 형태의 float32 NumPy 배열을 반환
+    (순수 NumPy 로더 사용, 해석할 수 없는 파일만 Open3D로 fallback)
     """
-    pcd = o3d.io.read_point_cloud(pcd_path)
-    pts = np.asarray(pcd.points)  # (N, 3)
+    pts = read_pcd(pcd_path)  # (N, 3)
     return pts
 
 # =============================================================================
-# (4) Matplotlib 3D로 PCD + 3D 바운딩 박스 시각화
+# (3) Matplotlib 3D로 PCD + 3D 바운딩 박스 시각화
 # =============================================================================
-def visualize_pcd_and_boxes(pcd_path, json_path):
+def visualize_pcd_and_boxes(pcd_path, json_path, use_bev=False):
     # 1) PCD 로드
     points = load_pcd_as_numpy(pcd_path)
     print(f"[Info] Loaded PCD: {pcd_path} (총 점 수 = {points.shape[0]})")
@@ -110,45 +63,37 @@ def visualize_pcd_and_boxes(pcd_path, json_path):
     bboxes = load_bboxes_from_json(json_path)
     print(f"[Info] Loaded {len(bboxes)} 3D bounding boxes from JSON: {json_path}")
 
+    if use_bev:
+        show_bev(points, bboxes)
+        return
+
     # 3) Matplotlib 3D Figure 준비
     fig = plt.figure(figsize=(10, 8))
     ax = fig.add_subplot(111, projection='3d')
     ax.set_title("PCD + 3D Bounding Boxes (Matplotlib)")
 
-    # 4) 점군 산점도 그리기
+    # 4) 점군 산점도 그리기 (다운샘플링 후, 축 범위는 원본 점 기준)
+    plot_points = downsample_points(points, **DOWNSAMPLE)
     ax.scatter(
-        points[:, 0], points[:, 1], points[:, 2],
+        plot_points[:, 0], plot_points[:, 1], plot_points[:, 2],
         s=0.5,     # 점 크기 (너무 크면 느려짐)
         c='gray',  # 점 색
         alpha=0.5, # 투명도
         linewidth=0
     )
 
-    # 5) 각 바운딩 박스를 Line3DCollection으로 그리기
-    edges = [
-        (0,1), (1,2), (2,3), (3,0),  # 하단 사각형
-        (4,5), (5,6), (6,7), (7,4),  # 상단 사각형
-        (0,4), (1,5), (2,6), (3,7)   # 수직 엣지
-    ]
+    # 5) 모든 바운딩 박스의 엣지를 Line3DCollection 하나로 그리기
+    corners = np.array([bbox["corners"] for bbox in bboxes]).reshape(-1, 8, 3)
+    add_box_collection(
+        ax, corners,
+        colors='r',     # 바운딩 박스 선 색상 (빨강)
+        linewidth=1.0,
+        alpha=0.8
+    )
 
+    # (선택) 클래스명 텍스트 표시: 박스 중심에 레이블 달기
     for bbox in bboxes:
-        corners = bbox["corners"]  # shape=(8,3)
-        line_segments = []
-        for (i, j) in edges:
-            p1 = corners[i]
-            p2 = corners[j]
-            line_segments.append([p1, p2])
-
-        lc = Line3DCollection(
-            line_segments,
-            colors='r',     # 바운딩 박스 선 색상 (빨강)
-            linewidths=1.0,
-            alpha=0.8
-        )
-        ax.add_collection3d(lc)
-
-        # (선택) 클래스명 텍스트 표시: 박스 중심에 레이블 달기
-        cx, cy, cz = np.mean(corners, axis=0)
+        cx, cy, cz = np.mean(bbox["corners"], axis=0)
         ax.text(
             cx, cy, cz + 0.1,      # z축 방향으로 살짝 띄워 텍스트 충돌 방지
             bbox["class"],
@@ -156,7 +101,6 @@ def visualize_pcd_and_boxes(pcd_path, json_path):
             fontsize=8
         )
 
-
     # 6) 축 레이블 및 비율 맞추기
     ax.set_xlabel("X")
     ax.set_ylabel("Y")
@@ -181,8 +125,41 @@ def visualize_pcd_and_boxes(pcd_path, json_path):
     plt.tight_layout()
     plt.show()
 
+# =============================================================================
+# (4) NumPy BEV 래스터라이저로 PCD + 3D 바운딩 박스 시각화
+# =============================================================================
+def show_bev(points, bboxes, meters_per_pixel=BEV_METERS_PER_PIXEL):
+    """
+    3D scatter 대신 포인트/박스를 BEV 이미지 버퍼에 직접 찍어서 표시.
+    (높이(z)를 viridis 컬러맵으로 색칠, 박스는 빨간 footprint)
+    """
+    from bev_renderer import render_bev
+
+    # 3D 모드와 같은 정사각형 범위 (포인트 범위의 중심 ± max_range)
+    xy_min = points[:, :2].min(axis=0)
+    xy_max = points[:, :2].max(axis=0)
+    mid = (xy_min + xy_max) / 2
+    half = (xy_max - xy_min).max() / 2
+    x_range = (mid[0] - half, mid[0] + half)
+    y_range = (mid[1] - half, mid[1] + half)
+
+    corners = np.array([bbox["corners"] for bbox in bboxes]).reshape(-1, 8, 3)
+    bev = render_bev(points, x_range, y_range, meters_per_pixel=meters_per_pixel,
+                     color_by="z", box_corners=corners, box_colors=(255, 0, 0))
+
+    plt.figure(figsize=(10, 8))
+    plt.imshow(bev, extent=(x_range[0], x_range[1], y_range[0], y_range[1]))
+    for bbox in bboxes:
+        cx, cy, _ = np.mean(bbox["corners"], axis=0)
+        plt.text(cx, cy, bbox["class"], color='red', fontsize=8)
+    plt.title("PCD + 3D Bounding Boxes (BEV raster)")
+    plt.xlabel("X")
+    plt.ylabel("Y")
+    plt.tight_layout()
+    plt.show()
+
 # =============================================================================
 # (5) 스크립트 실행
 # =============================================================================
 if __name__ == "__main__":
-    visualize_pcd_and_boxes(pcd_path, json_path)
+    visualize_pcd_and_boxes(pcd_path, json_path, use_bev=USE_BEV_RENDERER)
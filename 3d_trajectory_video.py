@@ -1,18 +1,26 @@
 import os
 import glob
 import cv2
+from video_stream import StreamingVideoWriter
+from prefetch import prefetch
 
 def images_to_video(
     image_dir: str,
     image_ext: str,
     output_path: str,
-    fps: int = 10
+    fps: int = 10,
+    num_workers: int = 4,
+    depth: int = 16,
+    max_mb: int = 512
 ):
     """
     • image_dir: 이미지들이 들어 있는 폴더 경로
     • image_ext: 이미지 확장자 (예: "png" 또는 "jpg")
     • output_path: 생성할 비디오 파일 경로 (예: "output.mp4")
     • fps: 초당 프레임 수
+    • num_workers: 디코딩/리사이즈 스레드 수 (cv2.imread/resize는 GIL을 놓음)
+    • depth: 미리 디코딩해 둘 최대 프레임 수 (0이면 기존처럼 순차 처리)
+    • max_mb: 미리 디코딩해 둔 프레임의 메모리 상한 [MB]
     """
 
     # 1) 이미지 파일 목록 읽기 (정렬)
@@ -27,24 +35,26 @@ def images_to_video(
     if first_frame is None:
         print(f"[!] 첫 번째 이미지를 읽을 수 없습니다: {image_paths[0]}")
         return
-    height, width, channels = first_frame.shape
-    print(f"비디오 해상도: {width}x{height}, 채널: {channels}")
+    height, width = first_frame.shape[:2]
 
-    # 3) VideoWriter 생성 (코덱: mp4v → .mp4 파일)
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    video_writer = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+    # 3) VideoWriter 생성 (코덱: mp4v → .mp4 파일, 크기는 첫 프레임으로 고정)
+    video_writer = StreamingVideoWriter(output_path, fps=fps, frame_size=(width, height))
 
-    # 4) 이미지들을 순서대로 비디오에 프레임으로 추가
-    for idx, img_path in enumerate(image_paths):
-        frame = cv2.imread(img_path)
+    # 4) 디코딩 + 리사이즈는 스레드 풀에서 미리 수행하고, 결과는 정렬 순서대로 받아서 기록
+    #    (이미지 크기가 첫 프레임과 다르면 디코딩 스레드에서 리사이즈 → writer만 순차 단계로 남음)
+    def decode_frame(img_path):
+        frame = first_frame if img_path == image_paths[0] else cv2.imread(img_path)
+        if frame is not None and (frame.shape[0] != height or frame.shape[1] != width):
+            frame = cv2.resize(frame, (width, height))
+        return frame
+
+    decoded = prefetch(image_paths, decode_frame, depth=depth,
+                       max_bytes=max_mb * 1024 * 1024, num_workers=num_workers)
+    for idx, (img_path, frame) in enumerate(decoded):
         if frame is None:
             print(f"[경고] 프레임을 읽을 수 없습니다: {img_path} (스킵)")
             continue
 
-        # 이미지 크기가 첫 프레임과 다르면 리사이즈
-        if frame.shape[0] != height or frame.shape[1] != width:
-            frame = cv2.resize(frame, (width, height))
-
         video_writer.write(frame)
 
         if idx % 50 == 0:
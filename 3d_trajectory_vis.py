@@ -1,14 +1,23 @@
 import os
+import io
 import glob
-import json
+import time
+import contextlib
+import multiprocessing as mp
 import numpy as np
-import open3d as o3d
 import matplotlib
 # ───────────────────────────────────────────────────────────────
 # “Agg” 백엔드로 설정 → GUI 없이 이미지 파일로 저장
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D  # 3D 축
+from box_geometry import add_box_collection, track_color, vertices_to_corners
+from pcd_io import load_points
+from point_sampling import downsample_points, cull_to_limits
+from annotation_store import update_store, open_store, load_trajectory_objects
+from run_manifest import RunManifest
+from stage_timer import StageTracer, FrameTimer, NULL_TIMER
+from track_index import update_track_index, open_track_index, add_trail_collection
 
 # ───────────────────────────────────────────────────────────────
 # (1) JSON 파일들이 들어 있는 폴더 (사용자 환경에 맞게 수정)
@@ -23,22 +32,127 @@ OUTPUT_DIR = "/mnt/d/Dataset/05_3D_DynamicObject_Trajectory_2024/sample2"
 # (4) PCD 파일 확장자 (예: ".pcd" 혹은 ".bin")
 PCD_EXTENSION = ".pcd"
 
-# 반드시 존재하도록 출력 폴더 생성
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+# (5) 병렬 렌더링 워커 프로세스 수 (1이면 기존처럼 순차 처리, None이면 CPU 코어 수)
+NUM_WORKERS = None
+
+# (6) 워커 하나가 처리한 뒤 재시작되기까지의 프레임 수 (Matplotlib 메모리 누적 방지)
+WORKER_MAX_TASKS = 200
+
+# (7) BEV 렌더러 사용 여부 (True면 3D scatter 대신 NumPy 래스터 BEV 이미지로 저장)
+#     - 위에서 내려다본(elev=90) 축 정렬 이미지, 트랙 색상 박스 footprint 포함
+#     - 라벨 텍스트와 제목은 그리지 않음
+USE_BEV_RENDERER = False
+BEV_METERS_PER_PIXEL = 0.1
+
+# (8) 3D scatter 전 다운샘플링 (point_sampling.downsample_points 인자, None이면 해당 단계 생략)
+#     - voxel_size: 복셀 격자 평균 크기 [m]
+#     - max_points: 프레임당 최대 점 개수
+#     - lod_near_range: 지정하면 이 거리 [m] 안쪽은 원본 유지, 바깥은 거리에 따라 복셀 확대
+#     BEV 렌더러는 래스터라이즈 비용이 작으므로 원본 점을 그대로 사용
+DOWNSAMPLE = {"voxel_size": 0.1, "max_points": 200_000, "lod_near_range": None}
 
+# (9) 컬럼형 어노테이션 캐시 (.npz) — object_list를 JSON 대신 캐시에서 읽음 (바뀐 JSON만 다시 파싱)
+#     None이면 매 프레임 JSON을 직접 읽음
+ANNOTATION_CACHE_PATH = os.path.join(OUTPUT_DIR, "annotation_cache.npz")
 
-# 3D 박스를 그릴 때 연결해야 할 8개 꼭짓점의 인덱스 페어
-BOX_EDGES = [
-    (0, 1), (1, 2), (2, 3), (3, 0),  # top face (roof)
-    (4, 5), (5, 6), (6, 7), (7, 4),  # bottom face (ground)
-    (0, 4), (1, 5), (2, 6), (3, 7)   # vertical pillars
-]
+# (10) 출력 manifest — 출력 PNG마다 입력(JSON, PCD) 크기/mtime과 렌더 설정을 기록
+#      다시 실행하면 최신 PNG는 건너뛰고 없거나 바뀐 프레임만 렌더링 (None이면 매번 전체 렌더링)
+#      궤적/속도(TRAIL_LENGTH, SHOW_SPEED)를 그리면 궤적에 쓰인 이전 프레임 JSON도 입력으로 기록
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "render_manifest.json")
+
+# (11) 단계별 시간 trace (JSON-lines, 프레임당 한 줄) — None이면 끔
+#      parse / points / cull / downsample / draw / savefig 시간과 점·객체 수, 출력 크기를 기록하고
+#      끝나면 단계별 p50/p95와 가장 느린 프레임을 출력 (워커 프로세스의 기록은 메인 프로세스가 모아서 씀)
+TRACE_PATH = None  # 예: os.path.join(OUTPUT_DIR, "stage_trace.jsonl")
+
+# (12) 트랙 인덱스 (.npz) — 장면 전체의 트랙별 중심/yaw/프레임 번호를 연속 배열로 저장
+#      새로 생겼거나 바뀐 JSON만 다시 파싱해서 인덱스를 갱신 (None이면 궤적/속도 표시 안 함)
+#      - TRAIL_LENGTH: 객체마다 최근 N 프레임(현재 포함) 중심 궤적을 선으로 그림 (0이면 안 그림)
+#      - SHOW_SPEED: 라벨에 직전 프레임 대비 속도 [km/h] 표시 (FRAME_RATE: 초당 프레임 수)
+TRACK_INDEX_PATH = os.path.join(OUTPUT_DIR, "track_index.npz")
+TRAIL_LENGTH = 0
+SHOW_SPEED = False
+FRAME_RATE = 10.0
+
+# (13) 뷰 컬링 — 보이는 축 범위(박스 꼭짓점 범위 또는 포인트 범위 × zoom_scale) 밖의 점은
+#      다운샘플링/scatter 전에 제거 (Matplotlib 3D는 축 범위 밖의 점도 투영해서 축 바깥에 그림)
+#      - 확대해서 볼수록 투영/그리기 시간과 메모리가 줄고, max_points 예산이 보이는 영역에만 쓰임
+#      - 높이 컬러맵 범위는 컬링 전 프레임 전체 z 범위로 고정 (색이 확대 정도에 따라 바뀌지 않도록)
+VIEW_CULLING = True
+
+# 반드시 존재하도록 출력 폴더 생성
+os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
 # ───────────────────────────────────────────────────────────────
 # 2) 하나의 JSON + PCD를 3D로 시각화하는 함수
+def save_bev_frame(basename, pts, object_list, output_dir, zoom_scale=0.5,
+                   meters_per_pixel=BEV_METERS_PER_PIXEL, tracks=None, timer=NULL_TIMER):
+    """
+    visualize_3d_boxes()와 같은 축 범위 규칙으로 BEV 래스터 이미지를 저장.
+    (포인트 범위 × zoom_scale, 박스가 있으면 박스 꼭짓점 범위를 우선 사용)
+    • tracks: {track_id: (궤적 (K, 3), 속도)} — 있으면 박스 색으로 궤적을 함께 그림
+    """
+    from bev_renderer import render_bev, draw_polylines
+
+    boxes = [obj for obj in object_list
+             if obj.get("bbox_vertices") is not None and len(obj["bbox_vertices"]) == 8]
+    corners = vertices_to_corners([obj["bbox_vertices"] for obj in boxes])
+    colors = [track_color(obj.get("class_name", "unknown"), obj.get("track_id", "0"))
+              for obj in boxes]
+
+    if len(corners) > 0:
+        lo = corners[:, :, :2].reshape(-1, 2).min(axis=0)
+        hi = corners[:, :, :2].reshape(-1, 2).max(axis=0)
+    elif pts.shape[0] > 0:
+        mins, maxs = pts.min(axis=0), pts.max(axis=0)
+        mid = (mins + maxs) / 2
+        zoomed_range = (maxs - mins).max() / 2 * zoom_scale
+        lo, hi = mid[:2] - zoomed_range, mid[:2] + zoomed_range
+    else:
+        print(f"[!] 그릴 데이터가 없습니다: {basename}")
+        return None
+
+    with timer.stage("draw"):
+        img = render_bev(pts, (lo[0], hi[0]), (lo[1], hi[1]), meters_per_pixel=meters_per_pixel,
+                         color_by="z", cmap="viridis", box_corners=corners, box_colors=colors)
+        if tracks:
+            trails = [(tracks[str(obj.get("track_id", "0"))][0], color)
+                      for obj, color in zip(boxes, colors) if str(obj.get("track_id", "0")) in tracks]
+            draw_polylines(img, [t for t, _ in trails], [c for _, c in trails],
+                           (lo[0], hi[0]), (lo[1], hi[1]), meters_per_pixel)
+    out_path = os.path.join(output_dir, basename + "_bev.png")
+    with timer.stage("encode"):
+        plt.imsave(out_path, img)
+    print(f"저장됨: {out_path}")
+    return out_path
+
+
+def view_limits(pts, object_list, zoom_scale=0.5):
+    """
+    그림의 축 범위 (xlim, ylim, zlim).
+    (a) 포인트 범위: 가장 긴 축 기준 정육면체 × zoom_scale (중심 유지)
+    (b) 바운딩박스 꼭짓점 범위: 박스가 있으면 (a) 대신 사용
+    둘 다 없으면 None
+    """
+    corners = vertices_to_corners([obj.get("bbox_vertices") for obj in object_list])
+    if len(corners) > 0:
+        all_box_verts = corners.reshape(-1, 3)  # (8*M, 3)
+        return tuple(zip(all_box_verts.min(axis=0), all_box_verts.max(axis=0)))
+    if pts.shape[0] > 0:
+        mins = pts.min(axis=0)
+        maxs = pts.max(axis=0)
+        mid = (mins + maxs) / 2
+        zoomed_range = (maxs - mins).max() / 2 * zoom_scale
+        return tuple((m - zoomed_range, m + zoomed_range) for m in mid[:3])
+    return None
+
+
 def visualize_3d_boxes(json_path, pcd_dir, output_dir,
-                       elev=30, azim=-60, zoom_scale=0.5, point_alpha=0.6):
+                       elev=30, azim=-60, zoom_scale=0.5, point_alpha=0.6,
+                       use_bev=False, annotation_cache=None,
+                       track_index=None, trail_length=0, show_speed=False, frame_rate=FRAME_RATE,
+                       view_culling=VIEW_CULLING, timer=NULL_TIMER):
     """
     - json_path: 하나의 라벨링 JSON 파일 경로
     - pcd_dir: JSON과 같은 이름으로 된 PCD 파일들이 모여 있는 폴더
@@ -46,6 +160,13 @@ def visualize_3d_boxes(json_path, pcd_dir, output_dir,
     - elev, azim: 카메라 고도(elevation)와 방위(azimuth) 각도
     - zoom_scale: 전체 scene 범위 대비 몇 배만 보일지 결정 (0< zoom_scale <=1)
     - point_alpha: 포인트클라우드 점 투명도 (0~1)
+    - use_bev: True면 Matplotlib 3D 대신 NumPy BEV 래스터라이저로 저장
+    - annotation_cache: 컬럼형 어노테이션 캐시 경로 (있으면 JSON 대신 캐시에서 object_list 복원)
+    - track_index: 트랙 인덱스 경로 (trail_length > 0 또는 show_speed일 때 사용)
+    - trail_length: 객체별 최근 궤적 길이 [프레임] (0이면 안 그림)
+    - show_speed: 라벨에 속도 [km/h] 표시, frame_rate: 초당 프레임 수
+    - view_culling: True면 보이는 축 범위 밖의 점을 그리기 전에 제거
+    - timer: stage_timer.FrameTimer (단계별 시간 기록, 기본값은 기록하지 않음)
     """
     basename = os.path.splitext(os.path.basename(json_path))[0]
     pcd_path = os.path.join(pcd_dir, basename + PCD_EXTENSION)
@@ -53,19 +174,42 @@ def visualize_3d_boxes(json_path, pcd_dir, output_dir,
         print(f"[!] PCD 파일을 찾을 수 없습니다: {pcd_path}")
         return
 
-    # --- JSON 로드 ------------------------------------------------
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    object_list = data.get("annotation_metadata", {}).get("object_list", [])
+    # --- JSON 로드 (캐시가 있으면 json.load 없이 컬럼에서 복원) ---------
+    with timer.stage("parse"):
+        object_list = load_trajectory_objects(json_path, open_store(annotation_cache))
     if not object_list:
         print(f"[!] object_list가 비어 있습니다: {json_path}")
         return
 
     # --- PCD 로드 -------------------------------------------------
-    pcd = o3d.io.read_point_cloud(pcd_path)
-    pts = np.asarray(pcd.points)  # (N, 3) 배열
+    with timer.stage("points"):
+        pts = load_points(pcd_path)  # (N, 3) float32 배열
+    timer.count(points=pts.shape[0], objects=len(object_list))
+
+    # --- 트랙 궤적/속도: 인덱스에서 이 프레임 객체들의 최근 구간만 꺼냄 (이전 프레임 재탐색 없음) ---
+    tracks = {}
+    index = open_track_index(track_index) if (trail_length > 0 or show_speed) else None
+    if index is not None:
+        tracks = {track_id: (trail, speed) for track_id, trail, speed
+                  in index.frame_tracks(json_path, max(trail_length, 1), frame_rate)}
+
+    if use_bev:
+        return save_bev_frame(basename, pts, object_list, output_dir, zoom_scale,
+                              tracks=tracks if trail_length > 0 else None, timer=timer)
+
+    # 축 범위(zoom 기준)와 컬러맵 범위는 원본으로 계산하고, scatter에는 컬링 + 다운샘플링된 점만 사용
+    limits = view_limits(pts, object_list, zoom_scale)
+    z_range = (None, None)  # None이면 그리는 점의 z 범위
+    if view_culling and limits is not None:
+        with timer.stage("cull"):
+            if pts.shape[0] > 0:
+                z_range = (pts[:, 2].min(), pts[:, 2].max())
+            pts = cull_to_limits(pts, *limits)
+    with timer.stage("downsample"):
+        pts_plot = downsample_points(pts, **DOWNSAMPLE)
 
     # --- Matplotlib 3D 축 준비 ------------------------------------
+    t_draw = time.perf_counter()
     fig = plt.figure(figsize=(10, 8))
     ax = fig.add_subplot(111, projection='3d')
     ax.set_title(f"{basename}  |  Objects: {len(object_list)}")
@@ -92,10 +236,10 @@ def visualize_3d_boxes(json_path, pcd_dir, output_dir,
     # --- 포인트클라우드 그리기 --------------------------------------
     if pts.shape[0] > 0:
         # 높이(z) 값을 컬러맵으로
-        zs = pts[:, 2]
+        zs = pts_plot[:, 2]
         sc = ax.scatter(
-            pts[:, 0], pts[:, 1], pts[:, 2],
-            c=zs, cmap="viridis",
+            pts_plot[:, 0], pts_plot[:, 1], pts_plot[:, 2],
+            c=zs, cmap="viridis", vmin=z_range[0], vmax=z_range[1],
             s=0.5, alpha=point_alpha, linewidths=0
         )
         # cbar = plt.colorbar(sc, ax=ax, fraction=0.046, pad=0.04)
@@ -103,6 +247,8 @@ def visualize_3d_boxes(json_path, pcd_dir, output_dir,
 
     # --- 3D 바운딩박스 그리기 ---------------------------------------
     all_box_verts = []  # (M,3) 배열로 쌓을 예정
+    box_colors = []     # 박스별 색상 (엣지는 루프 뒤에 한 번에 그림)
+    trails, trail_colors = [], []
 
     for obj in object_list:
         verts = obj.get("bbox_vertices", None)
@@ -116,27 +262,19 @@ def visualize_3d_boxes(json_path, pcd_dir, output_dir,
         attrs    = obj.get("attribute", [])
 
         # 색상을 track_id 기반 해시로 뽑거나, class_name 길이에 따라 임의로 정할 수 있습니다.
-        try:
-            color_hash = (int(track_id) * 37) % 256
-        except:
-            color_hash = (len(cls) * 50) % 256
-        cmap = plt.get_cmap("tab20")
-        box_color = cmap(color_hash / 256)
-
-        # 엣지 연결하여 3D 박스를 그림
-        for i, j in BOX_EDGES:
-            xi, yi, zi = corners[i]
-            xj, yj, zj = corners[j]
-            ax.plot(
-                [xi, xj], [yi, yj], [zi, zj],
-                c=box_color, linewidth=1.5
-            )
+        box_colors.append(track_color(cls, track_id))
+        trail, speed = tracks.get(str(track_id), (None, np.nan))
+        if trail is not None and trail_length > 0:
+            trails.append(trail)
+            trail_colors.append(box_colors[-1])
 
         # 바운딩박스 중심에 레이블 표시
         center = obj.get("bbox_center", None)
         if center is not None:
             cx, cy, cz = center
             label = f"{cls.split('.')[-1]}#{track_id}"
+            if show_speed and np.isfinite(speed):
+                label += f" {speed * 3.6:.0f}km/h"
             # if attrs:
             #     label += "\n" + ",".join(attrs)
             ax.text(
@@ -148,59 +286,184 @@ def visualize_3d_boxes(json_path, pcd_dir, output_dir,
                 ha="center", va="bottom"
             )
 
-    # --- 축 비율 균일화 --------------------------------------------
-    if pts.shape[0] > 0:
-        mins = pts.min(axis=0)
-        maxs = pts.max(axis=0)
-        mid = (mins + maxs) / 2
-        max_range = (maxs - mins).max() / 2
-        
-        zoomed_range = max_range * zoom_scale
-        ax.set_xlim(mid[0] - zoomed_range, mid[0] + zoomed_range)
-        ax.set_ylim(mid[1] - zoomed_range, mid[1] + zoomed_range)
-        ax.set_zlim(mid[2] - zoomed_range, mid[2] + zoomed_range)
-    # # (a) 포인트클라우드 범위
-    # if pts.shape[0] > 0:
-    #     xmin, ymin, zmin = pts.min(axis=0)
-    #     xmax, ymax, zmax = pts.max(axis=0)
-    # else:
-    #     xmin = ymin = zmin = 0
-    #     xmax = ymax = zmax = 0
-
-    # (b) 바운딩박스 꼭짓점 범위 (있으면 포함)
+    # 모든 박스의 12개 엣지를 Line3DCollection 하나로 그림
     if all_box_verts:
-        all_box_verts = np.vstack(all_box_verts)  # 각 (8,3) → 합쳐서 (8*M, 3)
-        bxmin, bymin, bzmin = all_box_verts.min(axis=0)
-        bxmax, bymax, bzmax = all_box_verts.max(axis=0)
+        add_box_collection(ax, np.array(all_box_verts), box_colors, linewidth=1.5)
+    # 트랙 궤적도 Line3DCollection 하나로
+    add_trail_collection(ax, trails, trail_colors, linewidth=1.0, alpha=0.8)
 
-        ax.set_xlim(bxmin, bxmax)
-        ax.set_ylim(bymin, bymax)
-        ax.set_zlim(bzmin, bzmax)
+    # --- 축 범위 (view_limits()에서 미리 계산) ----------------------
+    if limits is not None:
+        ax.set_xlim(*limits[0])
+        ax.set_ylim(*limits[1])
+        ax.set_zlim(*limits[2])
 
     # --- 시점 설정 ------------------------------------------------
     ax.view_init(elev=elev, azim=azim)
+    plt.tight_layout()
+    timer.add_time("draw", time.perf_counter() - t_draw)
 
-    # --- 저장 -----------------------------------------------------
+    # --- 저장 (savefig = 래스터화 + PNG 인코딩) ----------------------
     out_path = os.path.join(output_dir, basename + "_3d.png")
-    plt.tight_layout()
-    fig.savefig(out_path, dpi=200, bbox_inches='tight', pad_inches=0)
-    plt.close(fig)
+    with timer.stage("savefig"):
+        fig.savefig(out_path, dpi=200, bbox_inches='tight', pad_inches=0)
+        plt.close(fig)
     print(f"저장됨: {out_path}")
+    return out_path
+
+
+# ───────────────────────────────────────────────────────────────
+# 3) 병렬 일괄 처리용 워커 / 배치 함수
+
+def frame_io(json_path, pcd_dir, output_dir, use_bev=False, index=None, track_window=0):
+    """
+    프레임 하나의 (출력 PNG 경로, 입력 파일 목록) — visualize_3d_boxes()의 저장 규칙과 동일.
+    index(TrackIndex)가 주어지면 궤적/속도 계산에 쓰인 이전 프레임 JSON(최근 track_window개 샘플)도 입력에 포함
+    """
+    basename = os.path.splitext(os.path.basename(json_path))[0]
+    suffix = "_bev.png" if use_bev else "_3d.png"
+    out_path = os.path.join(output_dir, basename + suffix)
+    inputs = [json_path, os.path.join(pcd_dir, basename + PCD_EXTENSION)]
+    if index is not None:
+        inputs += index.window_files(json_path, track_window)
+    return out_path, inputs
+
+
+def _render_one(task):
+    """
+    워커 프로세스에서 프레임 하나를 렌더링.
+    - 프레임마다 stdout을 따로 모아 두었다가 메인 프로세스가 입력 순서대로 출력
+      → 워커 수와 상관없이 로그 순서가 항상 동일함
+    - trace가 True면 단계별 시간을 FrameTimer에 모아 dict로 함께 돌려줌 (trace 파일은 메인 프로세스가 씀)
+    반환: (json_path, out_path 또는 None, 로그 문자열, 단계별 시간 dict 또는 None)
+    """
+    json_path, pcd_dir, output_dir, render_kwargs, trace = task
+    timer = FrameTimer(os.path.splitext(os.path.basename(json_path))[0]) if trace else NULL_TIMER
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        try:
+            out_path = visualize_3d_boxes(json_path, pcd_dir, output_dir, timer=timer, **render_kwargs)
+        except Exception as e:
+            out_path = None
+            print(f"[!] 렌더링 실패: {json_path} ({type(e).__name__}: {e})")
+    if out_path is None:
+        return json_path, out_path, buf.getvalue(), None
+    timer.add_output(out_path)
+    return json_path, out_path, buf.getvalue(), timer.to_dict()
+
+
+def render_batch(json_files, pcd_dir, output_dir, num_workers=None,
+                 max_tasks_per_child=WORKER_MAX_TASKS, manifest=None, tracer=None, **render_kwargs):
+    """
+    JSON 목록 전체를 워커 프로세스 풀에 나눠서 렌더링.
+    • json_files: 정렬된 JSON 경로 리스트 (출력 파일명/로그 순서는 이 순서를 따름)
+    • num_workers: 워커 프로세스 수 (None이면 CPU 코어 수, 1이면 풀 없이 순차 처리)
+    • max_tasks_per_child: 워커 하나가 처리할 최대 프레임 수 (이후 새 프로세스로 교체)
+    • manifest: RunManifest (있으면 출력이 최신인 프레임은 건너뛰고, 저장한 프레임을 기록)
+    • tracer: StageTracer (활성이면 저장한 프레임의 단계별 시간을 trace에 기록)
+    • render_kwargs: visualize_3d_boxes()에 그대로 전달할 인자 (elev, azim, ...)
+
+    반환: 새로 저장된 PNG 경로 리스트 (입력 순서)
+    """
+    # 궤적/속도를 그리면 출력이 이전 프레임 JSON에도 의존 → 그 프레임들도 manifest 입력으로 기록
+    index, track_window = None, 0
+    trail_length = render_kwargs.get("trail_length", 0)
+    show_speed = render_kwargs.get("show_speed", False)
+    if manifest is not None and (trail_length > 0 or show_speed):
+        index = open_track_index(render_kwargs.get("track_index"))
+        track_window = max(trail_length, 2 if show_speed else 1)  # 속도 = 직전 샘플과의 거리
+
+    def io_of(jf):
+        return frame_io(jf, pcd_dir, output_dir, render_kwargs.get("use_bev", False), index, track_window)
+
+    if manifest is not None:
+        json_files = [jf for jf in json_files if not manifest.is_up_to_date(*io_of(jf))]
+        if manifest.num_skipped:
+            print(f"[*] 출력이 최신인 {manifest.num_skipped}개 프레임은 건너뜁니다.")
+
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    num_workers = max(1, min(num_workers, len(json_files)))
+
+    trace = tracer is not None and tracer.enabled
+    tasks = [(jf, pcd_dir, output_dir, render_kwargs, trace) for jf in json_files]
+    total = len(tasks)
+    saved = []
+    t0 = time.perf_counter()
+
+    def _report(idx, result):
+        json_path, out_path, log, timings = result
+        print(f"  ({idx}/{total}) {os.path.basename(json_path)}")
+        if log:
+            print(log, end="")
+        if out_path is not None:
+            saved.append(out_path)
+            if manifest is not None:
+                manifest.record(out_path, io_of(json_path)[1])
+            if trace:
+                tracer.record(timings)
+
+    try:
+        if num_workers == 1:
+            for idx, task in enumerate(tasks, start=1):
+                _report(idx, _render_one(task))
+        else:
+            # 프레임당 렌더링 시간은 비슷하므로 작은 chunk로 나눠 부하를 고르게 분산
+            chunksize = max(1, min(8, total // (num_workers * 4)))
+            with mp.Pool(num_workers, maxtasksperchild=max_tasks_per_child) as pool:
+                # imap은 입력 순서대로 결과를 돌려주므로 로그/파일명 순서가 결정적
+                for idx, result in enumerate(pool.imap(_render_one, tasks, chunksize), start=1):
+                    _report(idx, result)
+    finally:
+        # 중간에 중단돼도 그때까지 저장한 프레임은 기록해 둠
+        if manifest is not None:
+            manifest.save()
+            print(manifest.summary())
+
+    elapsed = time.perf_counter() - t0
+    fps = total / elapsed if elapsed > 0 else 0.0
+    print(f"[*] {total}개 프레임 처리 ({len(saved)}개 저장), "
+          f"워커 {num_workers}개, {elapsed:.1f}초 → {fps:.2f} frames/sec")
+    return saved
 
 
 # ───────────────────────────────────────────────────────────────
-# 3) 전체 JSON 파일 일괄 처리
-
-json_files = sorted(glob.glob(os.path.join(JSON_DIR, "*.json")))
-print(f"[*] 총 {len(json_files)}개의 JSON 파일을 찾았습니다.")
-for idx, jf in enumerate(json_files, start=1):
-    print(f"  ({idx}/{len(json_files)}) {os.path.basename(jf)}")
-    visualize_3d_boxes(
-        jf, PCD_DIR, OUTPUT_DIR,
+# 4) 전체 JSON 파일 일괄 처리
+
+if __name__ == "__main__":
+    json_files = sorted(glob.glob(os.path.join(JSON_DIR, "*.json")))
+    print(f"[*] 총 {len(json_files)}개의 JSON 파일을 찾았습니다.")
+    store = None
+    if ANNOTATION_CACHE_PATH is not None:
+        store = update_store(ANNOTATION_CACHE_PATH, json_files, dataset="trajectory")
+    render_kwargs = dict(
         elev=90,    # 카메라 고도
         azim=-60,   # 카메라 방위
         zoom_scale=0.5,
-        point_alpha=0.6
+        point_alpha=0.6,
+        use_bev=USE_BEV_RENDERER,
+        trail_length=TRAIL_LENGTH,
+        show_speed=SHOW_SPEED,
+        frame_rate=FRAME_RATE,
+        view_culling=VIEW_CULLING,
     )
+    use_tracks = TRACK_INDEX_PATH is not None and (TRAIL_LENGTH > 0 or SHOW_SPEED)
+    if use_tracks:
+        update_track_index(TRACK_INDEX_PATH, json_files, store)
+    manifest = None
+    if MANIFEST_PATH is not None:
+        # 렌더 결과에 영향을 주는 설정이 바뀌면 전체 프레임을 다시 렌더링
+        manifest = RunManifest(MANIFEST_PATH, settings=dict(
+            render_kwargs, downsample=DOWNSAMPLE, bev_meters_per_pixel=BEV_METERS_PER_PIXEL))
+    with StageTracer(TRACE_PATH) as tracer:
+        render_batch(
+            json_files, PCD_DIR, OUTPUT_DIR,
+            num_workers=NUM_WORKERS,
+            manifest=manifest,
+            tracer=tracer,
+            annotation_cache=ANNOTATION_CACHE_PATH,
+            track_index=TRACK_INDEX_PATH if use_tracks else None,
+            **render_kwargs
+        )
 
-print("=== 완료 ===")
\ No newline at end of file
+    print("=== 완료 ===")
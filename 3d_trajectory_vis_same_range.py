@@ -1,13 +1,21 @@
 import os
 import glob
 import json
+import time
+import multiprocessing as mp
 import numpy as np
-import open3d as o3d
 import matplotlib
 # Headless 환경에서도 저장 가능하도록 Agg 백엔드 사용
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D  # 3D 축
+from box_geometry import set_box_collection, track_color, vertices_to_corners
+from pcd_io import load_points
+from point_sampling import downsample_points, cull_to_limits
+from annotation_store import update_store, open_store, load_trajectory_objects
+from video_stream import StreamingVideoWriter, figure_frame_size
+from stage_timer import StageTracer, NULL_TIMER
+from track_index import update_track_index
 
 # ───────────────────────────────────────────────────────────────────────────────
 # 1) 경로 및 전역 변수 설정 (자신의 환경에 맞게 수정하세요)
@@ -18,13 +26,6 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 PCD_EXTENSION = ".pcd"  # 또는 실제 PCD 확장자가 .bin 등이라면 ".bin"으로 수정
 
-# 3D 바운딩박스를 그릴 때 사용할 엣지 인덱스 (bbox_vertices는 8개 꼭짓점)
-BOX_EDGES = [
-    (0, 1), (1, 2), (2, 3), (3, 0),  # top face
-    (4, 5), (5, 6), (6, 7), (7, 4),  # bottom face
-    (0, 4), (1, 5), (2, 6), (3, 7)   # vertical edges
-]
-
 # 카메라 시점 설정 (원한다면 수정)
 CAM_ELEV = 90   # 고도 각도
 CAM_AZIM = -60  # 방위 각도
@@ -36,75 +37,347 @@ ZOOM_SCALE = 0.5
 # 포인트클라우드 투명도 (0~1)
 POINT_ALPHA = 0.6
 
+# 프레임별 포인트/박스 범위를 저장해 두는 사이드카 인덱스 파일
+# (None이면 인덱스 없이 매번 전체 PCD를 다시 읽음)
+BOUNDS_INDEX_PATH = os.path.join(OUTPUT_DIR, "bounds_index.json")
+BOUNDS_INDEX_VERSION = 2
+
+# 글로벌 범위 계산 워커 프로세스 수 (프레임별 PCD 스캔을 나눠서 수행하고 결과만 합침)
+#   1이면 순차 처리, None이면 CPU 코어 수
+RANGE_WORKERS = None
+
+# 강건한(robust) 포인트 범위: 포인트 좌표의 (하위, 상위) 백분위수 [%] — None이면 기존처럼 min/max
+#   - 멀리 튄 LiDAR 점 몇 개가 모든 프레임의 축을 넓히는 것을 막음
+#   - 프레임마다 축별 고정 폭 히스토그램을 범위 인덱스에 저장해 두고 합쳐서 계산
+#     (PCD는 한 번만 스캔, 메모리는 bin 수에 비례 — 설정을 바꿔도 다시 스캔하지 않음)
+#   - 바운딩박스 꼭짓점 범위는 항상 그대로 포함
+ROBUST_PERCENTILES = None   # 예: (0.5, 99.5)
+HIST_BIN_SIZE      = 0.25   # 히스토그램 bin 폭 [m] (백분위수 범위의 정밀도)
+HIST_MAX_RANGE     = 2000.0 # |좌표|가 이보다 큰 점은 양 끝 bin에 넣음 [m]
+
+# 비디오 스트리밍 모드: 렌더링한 캔버스를 PNG 없이 바로 VideoWriter에 기록
+STREAM_TO_VIDEO   = True
+VIDEO_OUTPUT_PATH = os.path.join(OUTPUT_DIR, "output.mp4")
+VIDEO_FPS         = 10
+VIDEO_DPI         = 100   # 프레임 크기 = figsize(10x8) * VIDEO_DPI → 1000x800 고정 (BEV는 래스터 크기)
+SAVE_PNG          = False  # True면 스트리밍과 함께 프레임별 PNG(200dpi)도 저장
+
+# Figure 재사용: 3D 축/스타일/아티스트를 한 번만 만들고 프레임마다 점·박스·라벨 데이터만 교체
+#   False면 기존처럼 프레임마다 Figure를 새로 만들고 닫음
+REUSE_FIGURE = True
+
+# BEV 렌더러 사용 여부 (True면 3D scatter 대신 NumPy 래스터 BEV 이미지로 렌더링)
+#   - 글로벌 범위(zoom_scale 적용)를 그대로 사용하므로 모든 프레임의 크기/축이 동일
+#   - 라벨 텍스트와 제목은 그리지 않음
+USE_BEV_RENDERER     = False
+BEV_METERS_PER_PIXEL = 0.1
+
+# 3D scatter 전 다운샘플링 (point_sampling.downsample_points 인자, None이면 해당 단계 생략)
+#   - voxel_size: 복셀 격자 평균 크기 [m]
+#   - max_points: 프레임당 최대 점 개수
+#   - lod_near_range: 지정하면 이 거리 [m] 안쪽은 원본 유지, 바깥은 거리에 따라 복셀 확대
+#   글로벌 범위 계산과 BEV 렌더러는 원본 점을 그대로 사용
+DOWNSAMPLE = {"voxel_size": 0.1, "max_points": 200_000, "lod_near_range": None}
+
+# 컬럼형 어노테이션 캐시 (.npz) — 범위 계산과 렌더링이 JSON을 두 번 파싱하지 않도록
+#   None이면 매번 JSON을 직접 읽음
+ANNOTATION_CACHE_PATH = os.path.join(OUTPUT_DIR, "annotation_cache.npz")
+
+# 단계별 시간 trace (JSON-lines, 프레임당 한 줄) — None이면 끔
+#   parse / points / cull / downsample / draw / video_write / savefig 시간과 점·객체 수를 기록하고
+#   끝나면 단계별 p50/p95와 가장 느린 프레임을 출력
+TRACE_PATH = None  # 예: os.path.join(OUTPUT_DIR, "stage_trace.jsonl")
+
+# 트랙 인덱스 (.npz) — 장면 전체의 트랙별 중심/yaw/프레임 번호 (바뀐 JSON만 다시 파싱)
+#   - TRAIL_LENGTH: 객체마다 최근 N 프레임(현재 포함) 중심 궤적을 선으로 그림 (0이면 안 그림)
+#   - SHOW_SPEED: 라벨에 직전 프레임 대비 속도 [km/h] 표시 (FRAME_RATE: 데이터의 초당 프레임 수)
+TRACK_INDEX_PATH = os.path.join(OUTPUT_DIR, "track_index.npz")
+TRAIL_LENGTH = 0
+SHOW_SPEED = False
+FRAME_RATE = 10.0
+
+# 뷰 컬링 — 보이는 축 범위(글로벌 범위 × ZOOM_SCALE) 밖의 점은 다운샘플링/scatter 전에 제거
+#   - Matplotlib 3D는 축 범위 밖의 점도 투영해서 축 바깥에 그리므로, ZOOM_SCALE < 1이면
+#     대부분의 점이 보이지 않는 곳에 그려짐 → 투영/그리기 시간과 메모리를 줄임
+#   - 높이 컬러맵 범위는 컬링 전 프레임 전체 z 범위로 고정 (기존 색과 같게)
+VIEW_CULLING = True
+
 # ───────────────────────────────────────────────────────────────────────────────
 # 2) 모든 JSON+PCD를 순회하여 “글로벌(X/Y/Z) min/max”를 계산하는 함수
+#    - 프레임별 범위는 BOUNDS_INDEX_PATH에 (경로, 크기, mtime) 기준으로 캐시
+#    - 다음 실행부터는 새로 생겼거나 바뀐 프레임만 다시 읽음
+
+def _file_signature(path):
+    """인덱스 유효성 판단용 (파일 크기, 수정 시각[ns])"""
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def load_bounds_index(index_path):
+    """
+    사이드카 인덱스(JSON)를 읽어서 {json 절대경로: 항목} 딕셔너리로 반환.
+    파일이 없거나 버전/형식이 맞지 않으면 빈 인덱스를 반환.
+    """
+    if index_path is None or not os.path.isfile(index_path):
+        return {}
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        print(f"[!] 범위 인덱스를 읽을 수 없습니다: {index_path}. 새로 만듭니다.")
+        return {}
+    if data.get("version") != BOUNDS_INDEX_VERSION:
+        return {}
+    return data.get("frames", {})
+
+
+def save_bounds_index(index_path, frames):
+    """임시 파일에 쓴 뒤 교체 → 중간에 중단돼도 인덱스가 깨지지 않음"""
+    if index_path is None:
+        return
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": BOUNDS_INDEX_VERSION, "frames": frames}, f)
+    os.replace(tmp_path, index_path)
+
+
+def axis_histograms(pts, bin_size=HIST_BIN_SIZE, max_range=HIST_MAX_RANGE):
+    """
+    포인트 좌표의 축별 고정 폭 히스토그램 (bin 번호 = floor(좌표 / bin_size)).
+    bin 경계가 모든 프레임에서 같으므로 개수를 더하기만 하면 합칠 수 있음.
+    반환: [[첫 bin 번호, [개수, ...]], ...] (x, y, z) — 점이 있는 구간만 저장
+    """
+    limit = int(np.ceil(max_range / bin_size))
+    bins = np.floor(pts / bin_size).astype(np.int64)
+    np.clip(bins, -limit, limit, out=bins)
+    hists = []
+    for axis in range(3):
+        lo = int(bins[:, axis].min())
+        hists.append([lo, np.bincount(bins[:, axis] - lo).tolist()])
+    return hists
+
+
+def merge_histograms(hist_list):
+    """axis_histograms() 결과 여러 개 → 축별 (첫 bin 번호, 합친 개수 배열) 3개 (없으면 None)"""
+    hist_list = [h for h in hist_list if h is not None]
+    if not hist_list:
+        return None
+    merged = []
+    for axis in range(3):
+        lo = min(h[axis][0] for h in hist_list)
+        hi = max(h[axis][0] + len(h[axis][1]) for h in hist_list)
+        counts = np.zeros(hi - lo, dtype=np.int64)
+        for h in hist_list:
+            start = h[axis][0] - lo
+            counts[start:start + len(h[axis][1])] += h[axis][1]
+        merged.append((lo, counts))
+    return merged
+
+
+def histogram_percentile_bounds(merged, percentiles, bin_size=HIST_BIN_SIZE):
+    """
+    합친 히스토그램에서 (하위, 상위) 백분위수가 속한 bin의 바깥쪽 경계를 범위로 사용.
+    반환: (mins(3), maxs(3)) — 정밀도는 bin_size
+    """
+    low_pct, high_pct = percentiles
+    mins, maxs = np.empty(3), np.empty(3)
+    for axis, (lo, counts) in enumerate(merged):
+        cdf = np.cumsum(counts)
+        total = cdf[-1]
+        i_low = int(np.searchsorted(cdf, total * low_pct / 100.0, side="right"))
+        i_high = int(np.searchsorted(cdf, total * high_pct / 100.0, side="left"))
+        mins[axis] = (lo + min(i_low, len(counts) - 1)) * bin_size
+        maxs[axis] = (lo + min(i_high, len(counts) - 1) + 1) * bin_size
+    return mins, maxs
+
+
+def _scan_task(task):
+    """워커 프로세스: (json_path, pcd_path, 어노테이션 캐시 경로) → scan_frame_bounds() 결과"""
+    json_path, pcd_path, store_path = task
+    return scan_frame_bounds(json_path, pcd_path, open_store(store_path))
 
-def compute_global_ranges(json_dir, pcd_dir, extension):
+
+def scan_frame_bounds(json_path, pcd_path, store=None):
+    """
+    한 프레임의 PCD/JSON을 읽어서 범위를 계산.
+    (store가 있으면 박스 꼭짓점은 JSON 대신 캐시의 vertices 컬럼에서 읽음)
+    반환: {"points": [min(3), max(3)] 또는 None,
+           "boxes":  [min(3), max(3)] 또는 None,
+           "hist":   축별 [첫 bin 번호, bin별 점 개수 리스트] 3개 또는 None}
+    """
+    bounds = {"points": None, "boxes": None, "hist": None}
+
+    pts = load_points(pcd_path)  # (N, 3) float32
+    if pts.size > 0:
+        bounds["points"] = [pts.min(axis=0).tolist(), pts.max(axis=0).tolist()]
+        bounds["hist"] = axis_histograms(pts)
+
+    columns = store.rows(json_path, ["vertices"]) if store is not None else None
+    if columns is not None:
+        verts = columns["vertices"]  # (M, 8, 3), 꼭짓점이 없는 객체는 NaN
+        verts = verts[~np.isnan(verts).any(axis=(1, 2))]
+    else:
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        object_list = data.get("annotation_metadata", {}).get("object_list", [])
+        verts = vertices_to_corners([obj.get("bbox_vertices") for obj in object_list])
+    if len(verts) > 0:
+        corners = np.asarray(verts, dtype=np.float64).reshape(-1, 3)  # (8*M, 3)
+        bounds["boxes"] = [corners.min(axis=0).tolist(), corners.max(axis=0).tolist()]
+
+    return bounds
+
+
+def compute_global_ranges(json_dir, pcd_dir, extension, index_path=BOUNDS_INDEX_PATH, store=None,
+                          num_workers=RANGE_WORKERS, percentiles=ROBUST_PERCENTILES):
     """
     • json_dir: JSON 파일들이 모여 있는 폴더
     • pcd_dir: JSON 이름과 동일한 PCD 파일들이 모여 있는 폴더
     • extension: PCD 파일 확장자 (".pcd" 또는 ".bin" 등)
+    • index_path: 프레임별 범위 캐시 파일 경로 (None이면 캐시 사용 안 함)
+    • store: 컬럼형 어노테이션 캐시 (AnnotationStore, 없으면 JSON 직접 파싱)
+    • num_workers: 프레임 스캔 워커 프로세스 수 (None이면 CPU 코어 수, 1이면 순차 처리)
+    • percentiles: (하위, 상위) 백분위수 — 주면 포인트 범위를 합친 히스토그램에서 계산
 
+    map: 인덱스에 없거나 바뀐 프레임만 워커에서 스캔 (프레임별 min/max + 히스토그램)
+    reduce: 모든 프레임의 범위/히스토그램을 메인 프로세스에서 합침
     반환: (xmin_all, xmax_all, ymin_all, ymax_all, zmin_all, zmax_all)
     """
-    # 초기값 세팅: 매우 큰/작은 값으로
-    xmin_all, ymin_all, zmin_all = np.inf, np.inf, np.inf
-    xmax_all, ymax_all, zmax_all = -np.inf, -np.inf, -np.inf
-
     json_files = sorted(glob.glob(os.path.join(json_dir, "*.json")))
     print(f"[*] 총 {len(json_files)}개의 JSON 파일을 순회하며 전역 범위를 계산합니다.")
 
-    for idx, json_path in enumerate(json_files, start=1):
+    frames = load_bounds_index(index_path)
+
+    # 1) 인덱스 항목이 최신인 프레임은 그대로 사용하고, 나머지만 스캔 목록에 넣음
+    keys, stale = [], []
+    for json_path in json_files:
         basename = os.path.splitext(os.path.basename(json_path))[0]
         pcd_path = os.path.join(pcd_dir, basename + extension)
         if not os.path.isfile(pcd_path):
             print(f"[!] PCD 파일이 없습니다: {pcd_path}. 스킵합니다.")
             continue
-
-        # 1) 포인트클라우드 범위 갱신
-        pcd = o3d.io.read_point_cloud(pcd_path)
-        pts = np.asarray(pcd.points)  # (N, 3)
-        if pts.size > 0:
-            xmin_all = min(xmin_all, float(np.min(pts[:, 0])))
-            xmax_all = max(xmax_all, float(np.max(pts[:, 0])))
-            ymin_all = min(ymin_all, float(np.min(pts[:, 1])))
-            ymax_all = max(ymax_all, float(np.max(pts[:, 1])))
-            zmin_all = min(zmin_all, float(np.min(pts[:, 2])))
-            zmax_all = max(zmax_all, float(np.max(pts[:, 2])))
-
-        # 2) 바운딩박스 범위 갱신
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        object_list = data.get("annotation_metadata", {}).get("object_list", [])
-        for obj in object_list:
-            verts = obj.get("bbox_vertices", None)
-            if verts is None or len(verts) != 8:
-                continue
-            corners = np.array(verts)  # (8,3)
-            xmin_all = min(xmin_all, float(np.min(corners[:, 0])))
-            xmax_all = max(xmax_all, float(np.max(corners[:, 0])))
-            ymin_all = min(ymin_all, float(np.min(corners[:, 1])))
-            ymax_all = max(ymax_all, float(np.max(corners[:, 1])))
-            zmin_all = min(zmin_all, float(np.min(corners[:, 2])))
-            zmax_all = max(zmax_all, float(np.max(corners[:, 2])))
-
-        if idx % 50 == 0 or idx == len(json_files):
-            print(f"  ({idx}/{len(json_files)}) 처리 중... "
-                  f"현재 범위 X[{xmin_all:.2f}, {xmax_all:.2f}] "
-                  f"Y[{ymin_all:.2f}, {ymax_all:.2f}] Z[{zmin_all:.2f}, {zmax_all:.2f}]")
+        key = os.path.abspath(json_path)
+        signature = {"json": _file_signature(json_path),
+                     "pcd": _file_signature(pcd_path),
+                     "pcd_path": os.path.abspath(pcd_path),
+                     "hist_bin": HIST_BIN_SIZE}
+        entry = frames.get(key)
+        if entry is None or entry.get("signature") != signature:
+            stale.append((key, signature, json_path, pcd_path))
+        keys.append(key)
+    num_reused = len(keys) - len(stale)
+
+    # 2) map: 바뀐 프레임 스캔 (워커 프로세스에서 PCD 파싱, 결과는 입력 순서대로 받음)
+    if stale:
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+        num_workers = max(1, min(num_workers, len(stale)))
+        store_path = store.path if store is not None else None
+        tasks = [(json_path, pcd_path, store_path) for _, _, json_path, pcd_path in stale]
+        pool = mp.Pool(num_workers) if num_workers > 1 else None
+        try:
+            if pool is None:
+                results = map(_scan_task, tasks)
+            else:
+                chunksize = max(1, min(16, len(tasks) // (num_workers * 4)))
+                results = pool.imap(_scan_task, tasks, chunksize)
+            for idx, ((key, signature, _, _), bounds) in enumerate(zip(stale, results), start=1):
+                frames[key] = {"signature": signature, **bounds}
+                if idx % 50 == 0 or idx == len(stale):
+                    print(f"  ({idx}/{len(stale)}) 스캔 중... (워커 {num_workers}개)")
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            # 중간에 중단돼도 그때까지 스캔한 프레임은 인덱스에 남김
+            save_bounds_index(index_path, frames)
+    print(f"[*] 범위 인덱스: {num_reused}개 재사용, {len(stale)}개 새로 스캔")
+
+    # 3) reduce: 포인트 범위(min/max 또는 백분위수) ∪ 바운딩박스 범위
+    entries = [frames[key] for key in keys]
+    mins_all = np.full(3, np.inf)
+    maxs_all = np.full(3, -np.inf)
+    names = ("points", "boxes")
+    merged = merge_histograms([e["hist"] for e in entries]) if percentiles is not None else None
+    if merged is not None:
+        names = ("boxes",)
+        mins_all, maxs_all = histogram_percentile_bounds(merged, percentiles)
+        # 히스토그램 경계가 실제 min/max를 넘지 않도록
+        point_bounds = [e["points"] for e in entries if e["points"] is not None]
+        mins_all = np.maximum(mins_all, np.min([b[0] for b in point_bounds], axis=0))
+        maxs_all = np.minimum(maxs_all, np.max([b[1] for b in point_bounds], axis=0))
+        print(f"[*] 포인트 범위: {percentiles[0]}~{percentiles[1]} 백분위수 "
+              f"X[{mins_all[0]:.2f}, {maxs_all[0]:.2f}] Y[{mins_all[1]:.2f}, {maxs_all[1]:.2f}] "
+              f"Z[{mins_all[2]:.2f}, {maxs_all[2]:.2f}]")
+    for entry in entries:
+        for name in names:
+            if entry[name] is not None:
+                mins_all = np.minimum(mins_all, entry[name][0])
+                maxs_all = np.maximum(maxs_all, entry[name][1])
 
     # 마지막으로 반환
+    xmin_all, ymin_all, zmin_all = (float(v) for v in mins_all)
+    xmax_all, ymax_all, zmax_all = (float(v) for v in maxs_all)
     return xmin_all, xmax_all, ymin_all, ymax_all, zmin_all, zmax_all
 
 
 # ───────────────────────────────────────────────────────────────────────────────
 # 3) “글로벌 범위”를 이용해 각 프레임을 동일 축으로 그리는 함수
 
+def zoomed_axis_limits(global_ranges, zoom_scale):
+    """글로벌 범위를 mid ± (가장 큰 half-range * zoom_scale)로 변환 → (xlim, ylim, zlim)"""
+    xmin_all, xmax_all, ymin_all, ymax_all, zmin_all, zmax_all = global_ranges
+    mids = ((xmin_all + xmax_all) / 2.0, (ymin_all + ymax_all) / 2.0, (zmin_all + zmax_all) / 2.0)
+    max_half = max(xmax_all - xmin_all, ymax_all - ymin_all, zmax_all - zmin_all) / 2.0
+    zoomed_half = max_half * zoom_scale
+    return tuple((m - zoomed_half, m + zoomed_half) for m in mids)
+
+
+def render_bev_frame(basename, pts, object_list, output_dir, global_ranges,
+                     zoom_scale=1.0, video_writer=None, save_png=True,
+                     meters_per_pixel=BEV_METERS_PER_PIXEL, tracks=None, timer=NULL_TIMER):
+    """
+    BEV 래스터라이저로 한 프레임을 렌더링 (축 범위는 3D 모드와 동일한 글로벌 범위).
+    높이 컬러맵도 글로벌 z 범위로 고정해서 프레임 간 색이 흔들리지 않게 함.
+    tracks({track_id: (궤적 (K, 3), 속도)})가 있으면 박스 색으로 궤적을 함께 그림.
+    """
+    from bev_renderer import render_bev, draw_polylines
+
+    xlim, ylim, _ = zoomed_axis_limits(global_ranges, zoom_scale)
+    boxes = [obj for obj in object_list
+             if obj.get("bbox_vertices") is not None and len(obj["bbox_vertices"]) == 8]
+    corners = vertices_to_corners([obj["bbox_vertices"] for obj in boxes])
+    colors = [track_color(obj.get("class_name", "unknown"), obj.get("track_id", "0"))
+              for obj in boxes]
+
+    with timer.stage("draw"):
+        img = render_bev(pts, xlim, ylim, meters_per_pixel=meters_per_pixel,
+                         color_by="z", value_range=(global_ranges[4], global_ranges[5]),
+                         cmap="viridis", box_corners=corners, box_colors=colors)
+        if tracks:
+            trails = [(tracks[str(obj.get("track_id", "0"))][0], color)
+                      for obj, color in zip(boxes, colors) if str(obj.get("track_id", "0")) in tracks]
+            draw_polylines(img, [t for t, _ in trails], [c for _, c in trails],
+                           xlim, ylim, meters_per_pixel)
+    if video_writer is not None:
+        with timer.stage("video_write"):
+            video_writer.write(np.ascontiguousarray(img[:, :, ::-1]))  # RGB → BGR
+    if save_png:
+        out_path = os.path.join(output_dir, basename + "_bev.png")
+        with timer.stage("encode"):
+            plt.imsave(out_path, img)
+        timer.add_output(out_path)
+        print(f"[V] 저장됨: {out_path}")
+
+
 def visualize_3d_boxes_fixed_axes(
         json_path, pcd_dir, output_dir,
         global_ranges,
         elev=30, azim=-60,
-        zoom_scale=1.0, point_alpha=0.6
+        zoom_scale=1.0, point_alpha=0.6,
+        video_writer=None, save_png=True,
+        use_bev=False, store=None, tracks=None, show_speed=False,
+        renderer=None, view_culling=VIEW_CULLING, timer=NULL_TIMER
     ):
     """
     • json_path: 하나의 라벨링 JSON 파일 경로
@@ -115,6 +388,15 @@ def visualize_3d_boxes_fixed_axes(
     • elev, azim: 카메라 고도·방위 각도
     • zoom_scale: 글로벌 범위 대비 몇 배만 보일지 (0<zoom_scale<=1)
     • point_alpha: 포인트클라우드 투명도
+    • video_writer: StreamingVideoWriter (주어지면 캔버스를 바로 비디오 프레임으로 기록)
+    • save_png: 프레임별 PNG 저장 여부
+    • use_bev: True면 Matplotlib 3D 대신 NumPy BEV 래스터라이저로 렌더링
+    • store: 컬럼형 어노테이션 캐시 (있으면 JSON 대신 캐시에서 object_list 복원)
+    • tracks: {track_id: (최근 궤적 (K, 3), 속도 [m/s])} — TrackIndex.frame_tracks() 결과 (없으면 None)
+    • show_speed: 라벨에 속도 [km/h] 표시
+    • renderer: FixedAxesRenderer (주면 Figure를 재사용, 없으면 이 프레임용으로 만들고 닫음)
+    • view_culling: True면 보이는 축 범위 밖의 점을 그리기 전에 제거
+    • timer: stage_timer.FrameTimer (단계별 시간 기록, 기본값은 기록하지 않음)
     """
     basename = os.path.splitext(os.path.basename(json_path))[0]
     pcd_path = os.path.join(pcd_dir, basename + PCD_EXTENSION)
@@ -122,146 +404,252 @@ def visualize_3d_boxes_fixed_axes(
         print(f"[!] PCD 파일이 없습니다: {pcd_path}. 스킵합니다.")
         return
 
-    xmin_all, xmax_all, ymin_all, ymax_all, zmin_all, zmax_all = global_ranges
-
     # --- JSON 로드 ------------------------------------------------------
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    object_list = data.get("annotation_metadata", {}).get("object_list", [])
+    with timer.stage("parse"):
+        object_list = load_trajectory_objects(json_path, store)
     if not object_list:
         print(f"[!] object_list가 비어 있습니다: {json_path}")
         return
 
     # --- PCD 로드 -------------------------------------------------------
-    pcd = o3d.io.read_point_cloud(pcd_path)
-    pts = np.asarray(pcd.points)  # (N,3)
-
-    # --- Matplotlib 3D 축 준비 -----------------------------------------
-    fig = plt.figure(figsize=(10, 8))
-    ax  = fig.add_subplot(111, projection='3d')
-    ax.set_title(f"{basename}  |  Objects: {len(object_list)}")
-    ax.set_xlabel("")  
-    ax.set_ylabel("")  
-    ax.set_zlabel("")
-    ax.set_xticks([]) 
-    ax.set_yticks([])
-    ax.set_zticks([])
-
-    # 격자 및 패널 배경 제거
-    ax.grid(False)
-    ax.xaxis.pane.fill = False
-    ax.yaxis.pane.fill = False
-    ax.zaxis.pane.fill = False
-    ax.xaxis.pane.set_edgecolor('none')
-    ax.yaxis.pane.set_edgecolor('none')
-    ax.zaxis.pane.set_edgecolor('none')
-    ax._axis3don = False
-
-    # --- 포인트클라우드 그리기 ------------------------------------------
-    if pts.shape[0] > 0:
-        sc = ax.scatter(
-            pts[:, 0], pts[:, 1], pts[:, 2],
-            c=pts[:, 2], cmap="viridis",
-            s=0.5, alpha=point_alpha, linewidths=0
-        )
-        # 컬러바 생략
-
-    # --- 3D 바운딩박스 그리기 --------------------------------------------
-    for obj in object_list:
-        verts = obj.get("bbox_vertices", None)
-        if verts is None or len(verts) != 8:
-            continue
-        corners = np.array(verts)  # (8,3)
-
-        cls      = obj.get("class_name", "unknown")
-        track_id = obj.get("track_id", "0")
-        attrs    = obj.get("attribute", [])
-
-        # 박스 색상: track_id 기반 해시
-        try:
-            color_hash = (int(track_id) * 37) % 256
-        except:
-            color_hash = (len(cls) * 50) % 256
-        cmap = plt.get_cmap("tab20")
-        box_color = cmap(color_hash / 256)
-
-        # 12개 엣지 연결
-        for i, j in BOX_EDGES:
-            xi, yi, zi = corners[i]
-            xj, yj, zj = corners[j]
-            ax.plot(
-                [xi, xj], [yi, yj], [zi, zj],
-                c=box_color, linewidth=1.5
-            )
-
-        # 바운딩박스 중심에 라벨 (원치 않으면 주석 처리)
-        center = obj.get("bbox_center", None)
-        if center is not None:
-            cx, cy, cz = center
-            label = f"{cls.split('.')[-1]}#{track_id}"
-            ax.text(
-                cx, cy, cz + (zmax_all - zmin_all)*0.02,
-                label,
-                fontsize=6,
-                color="black",
-                backgroundcolor="none",
-                ha="center", va="bottom"
-            )
-
-    # --- 축 범위(zoom_scale 적용) --------------------------------------
-    # 글로벌 범위를 mid ± (global_range * zoom_scale) 형태로 설정
-    mid_x = (xmin_all + xmax_all) / 2.0
-    mid_y = (ymin_all + ymax_all) / 2.0
-    mid_z = (zmin_all + zmax_all) / 2.0
-
-    half_x = (xmax_all - xmin_all) / 2.0
-    half_y = (ymax_all - ymin_all) / 2.0
-    half_z = (zmax_all - zmin_all) / 2.0
-
-    # 글로벌 기준 가장 큰 half-range 계산
-    max_half = max(half_x, half_y, half_z)
-
-    # → zoomed_half = max_half * zoom_scale
-    zoomed_half = max_half * zoom_scale
-
-    ax.set_xlim(mid_x - zoomed_half, mid_x + zoomed_half)
-    ax.set_ylim(mid_y - zoomed_half, mid_y + zoomed_half)
-    ax.set_zlim(mid_z - zoomed_half, mid_z + zoomed_half)
+    with timer.stage("points"):
+        pts = load_points(pcd_path)  # (N,3) float32
+    timer.count(points=pts.shape[0], objects=len(object_list))
+
+    if use_bev:
+        render_bev_frame(basename, pts, object_list, output_dir, global_ranges,
+                         zoom_scale=zoom_scale, video_writer=video_writer, save_png=save_png,
+                         tracks=tracks, timer=timer)
+        return
 
-    # --- 시점 설정 ------------------------------------------------------
-    ax.view_init(elev=elev, azim=azim)
+    z_range = None  # None이면 그리는 점의 z 범위
+    if view_culling:
+        with timer.stage("cull"):
+            if pts.shape[0] > 0:
+                z_range = (pts[:, 2].min(), pts[:, 2].max())
+            pts = cull_to_limits(pts, *zoomed_axis_limits(global_ranges, zoom_scale))
+    with timer.stage("downsample"):
+        pts = downsample_points(pts, **DOWNSAMPLE)
+
+    # --- 그리기: renderer가 없으면 이 프레임만 쓰고 닫음 --------------------
+    t_draw = time.perf_counter()
+    owned = renderer is None
+    if owned:
+        renderer = FixedAxesRenderer(global_ranges, elev=elev, azim=azim,
+                                     zoom_scale=zoom_scale, point_alpha=point_alpha)
+    renderer.draw_frame(basename, pts, object_list, tracks=tracks, show_speed=show_speed,
+                        z_range=z_range)
+    timer.add_time("draw", time.perf_counter() - t_draw)
+
+    # --- 비디오 프레임 기록 / 파일 저장 ----------------------------------
+    fig = renderer.fig
+    if video_writer is not None:
+        # 고정 크기 캔버스 버퍼를 그대로 인코딩 (PNG 인코딩/디코딩 없음) — 래스터화 시간 포함
+        with timer.stage("video_write"):
+            video_writer.write_figure(fig)
+    if save_png:
+        out_path = os.path.join(output_dir, basename + "_3d.png")
+        with timer.stage("savefig"):
+            fig.savefig(out_path, dpi=200, bbox_inches='tight', pad_inches=0)
+        timer.add_output(out_path)
+        print(f"[V] 저장됨: {out_path}")
+    if owned:
+        renderer.close()
+
+
+class FixedAxesRenderer:
+    """
+    동일 축 시퀀스용 3D 렌더러: Figure, 3D 축, 패널/격자 설정, 축 범위, 시점과
+    scatter/박스/궤적 아티스트를 한 번만 만들고, 프레임마다 데이터만 교체.
+    • scatter: _offsets3d + set_array (컬러 범위는 프레임별 z min/max — 기존과 동일)
+    • 박스/궤적: Line3DCollection.set_segments / set_color
+    • 라벨: 개수가 프레임마다 달라서 Text만 지우고 다시 만듦
+    그리기(래스터화)는 video_writer.write_figure() / savefig()가 Agg 캔버스에서 수행.
+    """
 
-    # --- 파일 저장 ------------------------------------------------------
-    out_path = os.path.join(output_dir, basename + "_3d.png")
-    plt.tight_layout()
-    fig.savefig(out_path, dpi=200, bbox_inches='tight', pad_inches=0)
-    plt.close(fig)
-    print(f"[V] 저장됨: {out_path}")
+    def __init__(self, global_ranges, elev=30, azim=-60, zoom_scale=1.0, point_alpha=0.6):
+        from mpl_toolkits.mplot3d.art3d import Line3DCollection
+
+        self.fig = plt.figure(figsize=(10, 8), dpi=VIDEO_DPI)
+        ax = self.ax = self.fig.add_subplot(111, projection='3d')
+        self.title = ax.set_title("")
+        ax.set_xlabel("")
+        ax.set_ylabel("")
+        ax.set_zlabel("")
+        ax.set_xticks([])
+        ax.set_yticks([])
+        ax.set_zticks([])
+
+        # 격자 및 패널 배경 제거
+        ax.grid(False)
+        ax.xaxis.pane.fill = False
+        ax.yaxis.pane.fill = False
+        ax.zaxis.pane.fill = False
+        ax.xaxis.pane.set_edgecolor('none')
+        ax.yaxis.pane.set_edgecolor('none')
+        ax.zaxis.pane.set_edgecolor('none')
+        ax._axis3don = False
+
+        # 포인트클라우드 / 박스 / 궤적 아티스트 (데이터는 draw_frame에서 채움)
+        self.scatter = ax.scatter([], [], [], c=[], cmap="viridis",
+                                  s=0.5, alpha=point_alpha, linewidths=0)
+        #   (축 범위는 아래에서 고정하므로 데이터 범위 자동 계산은 끔 — 빈 collection도 추가 가능)
+        self.boxes = Line3DCollection([], linewidths=1.5)
+        ax.add_collection(self.boxes, autolim=False)
+        self.trails = Line3DCollection([], linewidths=1.0, alpha=0.8)
+        ax.add_collection(self.trails, autolim=False)
+        self.labels = []
+
+        # 축 범위(zoom_scale 적용): 글로벌 범위를 mid ± (global_range * zoom_scale) 형태로 설정
+        xlim, ylim, zlim = zoomed_axis_limits(global_ranges, zoom_scale)
+        ax.set_xlim(*xlim)
+        ax.set_ylim(*ylim)
+        ax.set_zlim(*zlim)
+        self.label_dz = (global_ranges[5] - global_ranges[4]) * 0.02
+
+        # 시점 설정
+        ax.view_init(elev=elev, azim=azim)
+        self._laid_out = False
+
+    def draw_frame(self, basename, pts, object_list, tracks=None, show_speed=False, z_range=None):
+        """
+        한 프레임의 점/박스/궤적/라벨/제목으로 아티스트 데이터를 교체.
+        z_range: 높이 컬러맵 범위 (None이면 pts의 z min/max)
+        """
+        self.title.set_text(f"{basename}  |  Objects: {len(object_list)}")
+
+        # --- 포인트클라우드 ---------------------------------------------
+        self.scatter._offsets3d = (pts[:, 0], pts[:, 1], pts[:, 2])
+        self.scatter.set_array(pts[:, 2])
+        if z_range is not None:
+            self.scatter.set_clim(*z_range)
+        elif pts.shape[0] > 0:
+            self.scatter.set_clim(pts[:, 2].min(), pts[:, 2].max())
+
+        # --- 3D 바운딩박스 + 궤적 + 라벨 ----------------------------------
+        for text in self.labels:
+            text.remove()
+        self.labels = []
+        box_corners, box_colors = [], []
+        trails, trail_colors = [], []
+        tracks = tracks or {}
+        for obj in object_list:
+            verts = obj.get("bbox_vertices", None)
+            if verts is None or len(verts) != 8:
+                continue
+            cls      = obj.get("class_name", "unknown")
+            track_id = obj.get("track_id", "0")
+
+            # 박스 색상: track_id 기반 해시
+            box_corners.append(np.asarray(verts, dtype=np.float64))
+            box_colors.append(track_color(cls, track_id))
+            trail, speed = tracks.get(str(track_id), (None, np.nan))
+            if trail is not None and len(trail) >= 2:
+                trails.append(trail)
+                trail_colors.append(box_colors[-1])
+
+            # 바운딩박스 중심에 라벨 (원치 않으면 주석 처리)
+            center = obj.get("bbox_center", None)
+            if center is not None:
+                cx, cy, cz = center
+                label = f"{cls.split('.')[-1]}#{track_id}"
+                if show_speed and np.isfinite(speed):
+                    label += f" {speed * 3.6:.0f}km/h"
+                self.labels.append(self.ax.text(
+                    cx, cy, cz + self.label_dz,
+                    label,
+                    fontsize=6,
+                    color="black",
+                    backgroundcolor="none",
+                    ha="center", va="bottom"
+                ))
+
+        # 모든 박스의 12개 엣지 / 모든 궤적을 각각 Line3DCollection 하나로
+        set_box_collection(self.boxes, np.array(box_corners).reshape(-1, 8, 3), box_colors)
+        self.trails.set_segments(trails)
+        if trails:
+            self.trails.set_color(trail_colors)
+
+        # 여백 계산은 첫 프레임에서 한 번만 (축 범위/시점/제목 위치가 모든 프레임에서 같음)
+        if not self._laid_out:
+            self.fig.tight_layout()
+            self._laid_out = True
+
+    def close(self):
+        plt.close(self.fig)
 
 
 # ───────────────────────────────────────────────────────────────────────────────
 # 4) 메인: 글로벌 범위 계산 후, 각 파일에 대해 동일 축으로 시각화
 
 if __name__ == "__main__":
+    # 0) 어노테이션 캐시 갱신 (바뀐 JSON만 다시 파싱)
+    json_files = sorted(glob.glob(os.path.join(JSON_DIR, "*.json")))
+    store = None
+    if ANNOTATION_CACHE_PATH is not None:
+        store = update_store(ANNOTATION_CACHE_PATH, json_files, dataset="trajectory")
+
     # 1) 글로벌 min/max 범위 계산
-    global_ranges = compute_global_ranges(JSON_DIR, PCD_DIR, PCD_EXTENSION)
+    global_ranges = compute_global_ranges(JSON_DIR, PCD_DIR, PCD_EXTENSION, store=store)
     xmin_all, xmax_all, ymin_all, ymax_all, zmin_all, zmax_all = global_ranges
     print(f"\n==> 최종 글로벌 범위:")
     print(f"   X: [{xmin_all:.2f}, {xmax_all:.2f}]")
     print(f"   Y: [{ymin_all:.2f}, {ymax_all:.2f}]")
     print(f"   Z: [{zmin_all:.2f}, {zmax_all:.2f}]\n")
 
+    # 트랙 인덱스 (궤적/속도를 그릴 때만)
+    track_index = None
+    if TRACK_INDEX_PATH is not None and (TRAIL_LENGTH > 0 or SHOW_SPEED):
+        track_index = update_track_index(TRACK_INDEX_PATH, json_files, store)
+
     # 2) 각 JSON 파일을 동일한 축 범위로 시각화
-    json_files = sorted(glob.glob(os.path.join(JSON_DIR, "*.json")))
     print(f"[*] 총 {len(json_files)}개의 JSON 파일을 동일 축으로 시각화합니다.")
-    for idx, jf in enumerate(json_files, start=1):
-        print(f"  ({idx}/{len(json_files)}) {os.path.basename(jf)}")
-        visualize_3d_boxes_fixed_axes(
-            jf, PCD_DIR, OUTPUT_DIR,
-            global_ranges=global_ranges,
-            elev=CAM_ELEV, azim=CAM_AZIM,
-            zoom_scale=ZOOM_SCALE,
-            point_alpha=POINT_ALPHA
+    tracer = StageTracer(TRACE_PATH)
+    renderer = None
+    if REUSE_FIGURE and not USE_BEV_RENDERER:
+        renderer = FixedAxesRenderer(global_ranges, elev=CAM_ELEV, azim=CAM_AZIM,
+                                     zoom_scale=ZOOM_SCALE, point_alpha=POINT_ALPHA)
+    video_writer = None
+    if STREAM_TO_VIDEO:
+        # 재사용 Figure가 있으면 그 캔버스 크기로 고정, 없으면 첫 프레임 크기로 정함
+        # (프레임별 Figure도 같은 figsize/dpi, BEV는 래스터 크기)
+        video_writer = StreamingVideoWriter(
+            VIDEO_OUTPUT_PATH, fps=VIDEO_FPS,
+            frame_size=figure_frame_size(renderer.fig) if renderer is not None else None
         )
+    try:
+        for idx, jf in enumerate(json_files, start=1):
+            print(f"  ({idx}/{len(json_files)}) {os.path.basename(jf)}")
+            timer = tracer.frame(os.path.splitext(os.path.basename(jf))[0])
+            tracks = None
+            if track_index is not None:
+                # 궤적은 그리지 않고 속도만 표시할 때는 현재 샘플만 꺼냄
+                tracks = {track_id: (trail if TRAIL_LENGTH > 0 else trail[:0], speed)
+                          for track_id, trail, speed
+                          in track_index.frame_tracks(jf, max(TRAIL_LENGTH, 1), FRAME_RATE)}
+            visualize_3d_boxes_fixed_axes(
+                jf, PCD_DIR, OUTPUT_DIR,
+                global_ranges=global_ranges,
+                elev=CAM_ELEV, azim=CAM_AZIM,
+                zoom_scale=ZOOM_SCALE,
+                point_alpha=POINT_ALPHA,
+                video_writer=video_writer,
+                save_png=SAVE_PNG or not STREAM_TO_VIDEO,
+                use_bev=USE_BEV_RENDERER,
+                store=store,
+                tracks=tracks,
+                show_speed=SHOW_SPEED,
+                renderer=renderer,
+                view_culling=VIEW_CULLING,
+                timer=timer
+            )
+            tracer.record(timer)
+    finally:
+        if renderer is not None:
+            renderer.close()
+        if video_writer is not None:
+            video_writer.release()
+            print(f"[V] 비디오 저장됨: {VIDEO_OUTPUT_PATH} ({video_writer.num_frames} 프레임)")
+        tracer.close()
 
     print("=== 모든 프레임 시각화 완료 ===")
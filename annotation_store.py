@@ -0,0 +1,336 @@
+import os
+import json
+import numpy as np
+
+# ───────────────────────────────────────────────────────────────
+# 라벨링 JSON 트리 → 컬럼형 어노테이션 캐시 (.npz 한 파일)
+#   - 한 번 ingest 해두면 다음 실행부터는 json.load 없이 필요한 컬럼만 읽음
+#   - 컬럼 종류
+#       • numeric:     고정 폭 배열 (예: 박스 중심 (N,3), 꼭짓점 (N,8,3))
+#       • categorical: 문자열 → <name>_codes (int32) + <name>_categories
+#       • ragged:      가변 길이 배열 (예: 폴리곤) → <name>_values (평탄화) + <name>_offsets
+#   - 파일별 (크기, mtime_ns)를 같이 저장해서 바뀐 JSON만 다시 파싱
+#
+# 사용 예)
+#   store = update_store("cache.npz", json_paths, dataset="trajectory")
+#   vertices = store.column("vertices")            # (N, 8, 3) — 이 컬럼만 로드됨
+#   rows = store.rows(json_path, ["class_name"])   # 한 JSON 파일의 행들
+
+STORE_VERSION = 1
+
+
+# ───────────────────────────────────────────────────────────────
+# 1) 데이터셋별 추출기: JSON dict → 컬럼 dict (한 행 = 객체 하나)
+
+def _extract_trajectory(data):
+    """3D 동적객체 궤적: annotation_metadata.object_list (객체 하나 = 박스 하나)"""
+    objects = data.get("annotation_metadata", {}).get("object_list", [])
+    n = len(objects)
+    center = np.full((n, 3), np.nan)
+    vertices = np.full((n, 8, 3), np.nan)  # 꼭짓점이 없거나 8개가 아니면 NaN
+    for i, obj in enumerate(objects):
+        c = obj.get("bbox_center")
+        if c is not None and len(c) == 3:
+            center[i] = c
+        v = obj.get("bbox_vertices")
+        if v is not None and len(v) == 8:
+            vertices[i] = v
+    return {
+        "center": center,
+        "vertices": vertices,
+        "class_name": [obj.get("class_name", "unknown") for obj in objects],
+        "track_id": [str(obj.get("track_id", "0")) for obj in objects],
+    }
+
+
+_LANE_META_FIELDS = ("violation_type", "video_id", "camera_channel", "time_info", "camera_number")
+
+
+def _extract_lane_violation(data):
+    """134 차로 위반: data_set_info.data (객체 하나 = 폴리곤 하나 + 메타정보)"""
+    objects = data.get("data_set_info", {}).get("data", [])
+    columns = {name: [] for name in _LANE_META_FIELDS}
+    columns.update(polygon=[], annotation=[], extra_label=[], extra_value=[],
+                   extra_color=[], object_label=[])
+    for obj in objects:
+        value = obj["value"]
+        pts = value.get("points", [])
+        columns["polygon"].append(
+            np.array([(p["x"], p["y"]) for p in pts], dtype=np.float32).reshape(-1, 2))
+        metainfo = value.get("metainfo", {})
+        for name in _LANE_META_FIELDS:
+            columns[name].append(str(metainfo.get(name, "")))
+        extra = value.get("extra", {})
+        columns["annotation"].append(str(value.get("annotation", "")))
+        columns["extra_label"].append(str(extra.get("label", "")))
+        columns["extra_value"].append(str(extra.get("value", "")))
+        columns["extra_color"].append(str(extra.get("color", "#ff0000")))
+        # object_Label은 key 순서를 유지한 JSON 문자열로 저장 (종류가 적어서 categorical로 충분)
+        columns["object_label"].append(json.dumps(value.get("object_Label", {}), ensure_ascii=False))
+    return columns
+
+
+# 데이터셋별 스키마: 추출기 + 컬럼 종류/dtype/행 하나의 shape
+DATASETS = {
+    "trajectory": {
+        "extract": _extract_trajectory,
+        "numeric": {"center": (np.float64, (3,)), "vertices": (np.float64, (8, 3))},
+        "categorical": ("class_name", "track_id"),
+        "ragged": {},
+    },
+    "lane_violation": {
+        "extract": _extract_lane_violation,
+        "numeric": {},
+        "categorical": _LANE_META_FIELDS + ("annotation", "extra_label", "extra_value",
+                                            "extra_color", "object_label"),
+        "ragged": {"polygon": (np.float32, (2,))},
+    },
+}
+
+
+# ───────────────────────────────────────────────────────────────
+# 2) 저장소 읽기
+
+class AnnotationStore:
+    """
+    컬럼형 캐시 파일(.npz) 읽기 전용 래퍼.
+    • 컬럼은 처음 접근할 때만 로드 (np.load의 npz는 키 단위 lazy 로드)
+    • files: 원본 JSON 절대 경로 배열, file_row_offsets[i]:file_row_offsets[i+1] = i번 파일의 행
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._npz = np.load(path, allow_pickle=False)
+        self._cache = {}
+        self.dataset = str(self._npz["dataset"])
+        self.version = int(self._npz["version"])
+        self.files = self._npz["files"]
+        self.file_row_offsets = self._npz["file_row_offsets"]
+        self._file_index = {str(p): i for i, p in enumerate(self.files)}
+
+    @property
+    def num_rows(self):
+        return int(self.file_row_offsets[-1])
+
+    def _get(self, key):
+        if key not in self._cache:
+            self._cache[key] = self._npz[key]
+        return self._cache[key]
+
+    def column(self, name):
+        """numeric 컬럼 전체 (N, ...) 배열"""
+        return self._get(name)
+
+    def categorical(self, name):
+        """categorical 컬럼 → (codes (N,) int32, categories (K,) 문자열 배열)"""
+        return self._get(name + "_codes"), self._get(name + "_categories")
+
+    def ragged(self, name):
+        """ragged 컬럼 → (values (V, ...) 평탄화 배열, offsets (N+1,))"""
+        return self._get(name + "_values"), self._get(name + "_offsets")
+
+    def file_rows(self, json_path):
+        """JSON 파일 하나에 해당하는 행 범위 slice (캐시에 없으면 None)"""
+        i = self._file_index.get(os.path.abspath(json_path))
+        if i is None:
+            return None
+        return slice(int(self.file_row_offsets[i]), int(self.file_row_offsets[i + 1]))
+
+    def rows(self, json_path, columns):
+        """
+        JSON 파일 하나의 행들을 컬럼별로 반환 (캐시에 없으면 None).
+        • numeric → 배열 슬라이스, categorical → 문자열 리스트, ragged → 배열 리스트
+        """
+        rows = self.file_rows(json_path)
+        if rows is None:
+            return None
+        schema = DATASETS[self.dataset]
+        out = {}
+        for name in columns:
+            if name in schema["numeric"]:
+                out[name] = self.column(name)[rows]
+            elif name in schema["categorical"]:
+                codes, categories = self.categorical(name)
+                out[name] = categories[codes[rows]].tolist()
+            else:
+                values, offsets = self.ragged(name)
+                bounds = offsets[rows.start:rows.stop + 1]
+                out[name] = [values[s:e] for s, e in zip(bounds[:-1], bounds[1:])]
+        return out
+
+    def close(self):
+        self._npz.close()
+
+
+# ───────────────────────────────────────────────────────────────
+# 3) 저장소 만들기 / 갱신 (바뀐 파일만 다시 파싱)
+
+def _file_signature(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _empty_part(schema):
+    part = {name: np.empty((0,) + shape, dtype=dtype)
+            for name, (dtype, shape) in schema["numeric"].items()}
+    part.update({name: [] for name in schema["categorical"]})
+    part.update({name: [] for name in schema["ragged"]})
+    return part
+
+
+def read_columns(json_path, dataset):
+    """
+    캐시 없이 JSON 하나를 바로 컬럼 형태로 읽음 (AnnotationStore.rows()와 같은 형식).
+    • numeric → 배열, categorical → 문자열 리스트, ragged → 배열 리스트
+    """
+    schema = DATASETS[dataset]
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    part = _empty_part(schema)
+    part.update(schema["extract"](data))
+    for name, (dtype, shape) in schema["numeric"].items():
+        part[name] = np.asarray(part[name], dtype=dtype).reshape((-1,) + shape)
+    return part
+
+
+def _reuse_part(store, i, schema):
+    """기존 캐시에서 i번 파일의 행들을 컬럼 파트로 꺼냄 (JSON을 다시 읽지 않음)"""
+    s, e = int(store.file_row_offsets[i]), int(store.file_row_offsets[i + 1])
+    part = {name: store.column(name)[s:e] for name in schema["numeric"]}
+    for name in schema["categorical"]:
+        codes, categories = store.categorical(name)
+        part[name] = categories[codes[s:e]]
+    for name in schema["ragged"]:
+        values, offsets = store.ragged(name)
+        bounds = offsets[s:e + 1]
+        part[name] = [values[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+    return part
+
+
+def _open_existing(store_path, dataset):
+    """캐시 파일이 있고 버전/데이터셋이 맞으면 AnnotationStore, 아니면 None"""
+    if store_path is None or not os.path.isfile(store_path):
+        return None
+    try:
+        store = AnnotationStore(store_path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[!] 어노테이션 캐시를 읽을 수 없어 새로 만듭니다: {store_path} ({e})")
+        return None
+    if store.version != STORE_VERSION or store.dataset != dataset:
+        store.close()
+        return None
+    return store
+
+
+def update_store(store_path, json_paths, dataset):
+    """
+    JSON 파일 목록으로 컬럼형 캐시를 만들거나 갱신.
+    • store_path: 캐시 파일 경로 (.npz)
+    • json_paths: 대상 JSON 파일 목록 (이 목록에 없는 파일은 캐시에서 제거)
+    • dataset: DATASETS 키 ("trajectory", "lane_violation")
+    • (크기, mtime_ns)가 같은 파일은 기존 행을 재사용하고, 새로 생겼거나 바뀐 파일만 파싱
+
+    반환: AnnotationStore
+    """
+    schema = DATASETS[dataset]
+    json_paths = [os.path.abspath(p) for p in json_paths]
+    signatures = np.array([_file_signature(p) for p in json_paths], dtype=np.int64).reshape(-1, 2)
+
+    old = _open_existing(store_path, dataset)
+    old_sigs = {}
+    if old is not None:
+        old_sigs = {str(p): (int(size), int(mtime), i) for i, (p, size, mtime) in
+                    enumerate(zip(old.files, old.column("file_size"), old.column("file_mtime_ns")))}
+
+    parts, num_parsed = [], 0
+    for path, (size, mtime) in zip(json_paths, signatures):
+        hit = old_sigs.get(path)
+        if hit is not None and hit[:2] == (int(size), int(mtime)):
+            parts.append(_reuse_part(old, hit[2], schema))
+        else:
+            parts.append(read_columns(path, dataset))
+            num_parsed += 1
+    num_reused = len(json_paths) - num_parsed
+
+    if old is not None:
+        if num_parsed == 0 and len(old_sigs) == len(json_paths):
+            print(f"[*] 어노테이션 캐시: {num_reused}개 파일 모두 최신 ({store_path})")
+            return old
+        old.close()
+
+    # 컬럼 파트 이어 붙이기
+    lengths = [len(next(iter(part.values()))) for part in parts]  # 파트의 모든 컬럼은 행 수가 같음
+    arrays = {
+        "version": np.array(STORE_VERSION),
+        "dataset": np.array(dataset),
+        "files": np.array(json_paths, dtype=str),
+        "file_size": signatures[:, 0],
+        "file_mtime_ns": signatures[:, 1],
+        "file_row_offsets": np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+    }
+    for name, (dtype, shape) in schema["numeric"].items():
+        arrays[name] = np.concatenate([np.empty((0,) + shape, dtype=dtype)] + [p[name] for p in parts])
+    for name in schema["categorical"]:
+        labels = np.concatenate([np.array([], dtype=str)] + [np.asarray(p[name], dtype=str) for p in parts])
+        categories, codes = np.unique(labels, return_inverse=True)
+        arrays[name + "_codes"] = codes.astype(np.int32)
+        arrays[name + "_categories"] = categories
+    for name, (dtype, shape) in schema["ragged"].items():
+        pieces = [np.empty((0,) + shape, dtype=dtype)] + [v for p in parts for v in p[name]]
+        arrays[name + "_values"] = np.concatenate(pieces).astype(dtype, copy=False)
+        arrays[name + "_offsets"] = np.concatenate(
+            [[0], np.cumsum([len(v) for v in pieces[1:]])]).astype(np.int64)
+
+    # 임시 파일에 쓴 뒤 교체 (중간에 끊겨도 기존 캐시가 깨지지 않도록)
+    os.makedirs(os.path.dirname(os.path.abspath(store_path)), exist_ok=True)
+    tmp_path = store_path + ".tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, store_path)
+    print(f"[*] 어노테이션 캐시 저장: {store_path} "
+          f"({num_reused}개 재사용, {num_parsed}개 새로 파싱, 총 {int(arrays['file_row_offsets'][-1])}행)")
+    return AnnotationStore(store_path)
+
+
+# ───────────────────────────────────────────────────────────────
+# 4) 스크립트용 헬퍼
+
+_OPEN_STORES = {}
+
+
+def open_store(store_path):
+    """
+    프로세스마다 한 번만 여는 AnnotationStore (워커 프로세스에서 프레임마다 다시 열지 않도록).
+    캐시 파일이 없으면 None.
+    """
+    if store_path is None or not os.path.isfile(store_path):
+        return None
+    if store_path not in _OPEN_STORES:
+        _OPEN_STORES[store_path] = AnnotationStore(store_path)
+    return _OPEN_STORES[store_path]
+
+
+def load_trajectory_objects(json_path, store=None):
+    """
+    궤적 JSON 하나의 object_list를 반환.
+    • store에 이 파일이 있으면 json.load 없이 컬럼에서 객체 dict를 복원
+        {"class_name", "track_id", "bbox_center" (3,), "bbox_vertices" (8,3)} — 값이 없으면 None
+    • 없으면 JSON을 직접 읽어서 원본 object_list 그대로 반환
+    """
+    columns = None
+    if store is not None:
+        columns = store.rows(json_path, ["class_name", "track_id", "center", "vertices"])
+    if columns is None:
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data.get("annotation_metadata", {}).get("object_list", [])
+
+    has_center = ~np.isnan(columns["center"]).any(axis=1)
+    has_vertices = ~np.isnan(columns["vertices"]).any(axis=(1, 2))
+    return [
+        {"class_name": cls, "track_id": track_id,
+         "bbox_center": center if ok_c else None,
+         "bbox_vertices": vertices if ok_v else None}
+        for cls, track_id, center, vertices, ok_c, ok_v in zip(
+            columns["class_name"], columns["track_id"], columns["center"],
+            columns["vertices"], has_center, has_vertices)
+    ]
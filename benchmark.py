@@ -0,0 +1,356 @@
+import io
+import os
+import json
+import time
+import shutil
+import contextlib
+import platform
+import tempfile
+import subprocess
+import numpy as np
+import synthetic_data as synth
+
+# ───────────────────────────────────────────────────────────────
+# 시각화 파이프라인 단계별 벤치마크 (합성 데이터 사용, 실제 데이터셋 불필요)
+#   - 단계: parse(JSON) / points(포인트 로드) / geometry / render / encode / video
+#   - 스케일(점 개수, 객체 수, 이미지 크기)마다 합성 데이터를 만든 뒤 단계별로 따로 시간 측정
+#   - 결과는 JSON으로 저장 → COMPARE_WITH에 이전 결과를 지정하면 단계별 배율을 출력
+#
+# 실행: python benchmark.py
+
+# (1) 실행할 스케일 (SCALES 키)
+RUN_SCALES = ["small", "medium"]
+
+SCALES = {
+    "small":  {"num_points": 100_000,   "num_objects": 10,  "image_size": (960, 540),   "num_frames": 5},
+    "medium": {"num_points": 1_000_000, "num_objects": 50,  "image_size": (1920, 1080), "num_frames": 5},
+    "large":  {"num_points": 4_000_000, "num_objects": 200, "image_size": (3840, 2160), "num_frames": 3},
+}
+
+# (2) 단계별 반복 횟수 (결과는 min / median / mean 저장, 비교는 median 기준)
+REPEATS = 5
+
+# (3) 실행할 단계 이름 접두사 (None이면 전체), 예: ["points/", "render/bev"]
+STAGE_FILTER = None
+
+# (4) 결과 JSON 저장 폴더와 비교 대상 (이전 결과 JSON 경로, None이면 비교 생략)
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_results")
+COMPARE_WITH = None
+
+# ascii PCD는 생성/파싱이 느리므로 점 개수 상한
+ASCII_PCD_MAX_POINTS = 200_000
+
+# 단계 이름 → 준비 함수 (등록 순서대로 실행)
+#   준비 함수 fn(ctx)는 측정할 인자 없는 함수를 반환 (준비 시간은 측정에서 제외)
+STAGES = {}
+
+
+def stage(name):
+    def decorator(fn):
+        STAGES[name] = fn
+        return fn
+    return decorator
+
+
+# ───────────────────────────────────────────────────────────────
+# 1) 스케일별 합성 데이터 준비
+
+def prepare_context(scale, work_dir):
+    """스케일 설정으로 합성 데이터를 만들고 단계들이 공유할 경로/배열을 dict로 반환"""
+    n_pts, n_obj = scale["num_points"], scale["num_objects"]
+    size, n_frames = tuple(scale["image_size"]), scale["num_frames"]
+    ctx = dict(scale, work_dir=work_dir)
+    ctx["kitti_bin"] = synth.write_kitti_bin(os.path.join(work_dir, "points.bin"), n_pts)
+    ctx["pcd_binary"] = synth.write_pcd(os.path.join(work_dir, "binary.pcd"), n_pts, "binary")
+    ctx["pcd_compressed"] = synth.write_pcd(os.path.join(work_dir, "compressed.pcd"), n_pts, "binary_compressed")
+    ctx["pcd_ascii"] = synth.write_pcd(os.path.join(work_dir, "ascii.pcd"),
+                                       min(n_pts, ASCII_PCD_MAX_POINTS), "ascii")
+    for kind in ("102_lidar", "173", "trajectory", "lane_violation", "102_camera"):
+        ctx[kind] = synth.make_dataset(os.path.join(work_dir, kind), kind, num_frames=1,
+                                       num_objects=n_obj, num_points=1000, image_size=size)[0]
+    ctx["taillight"] = synth.make_dataset(os.path.join(work_dir, "taillight"), "taillight",
+                                          num_frames=n_frames * 20, num_objects=n_obj, image_size=size)[0]
+    ctx["image"] = synth.write_image(os.path.join(work_dir, "image.png"), size)
+    ctx["points"] = synth.random_points(n_pts)
+    ctx["boxes"] = synth.random_boxes(n_obj)
+    return ctx
+
+
+def _read_image(ctx):
+    import cv2
+    return cv2.imread(ctx["image"])
+
+
+# ───────────────────────────────────────────────────────────────
+# 2) 단계 정의
+
+def _json_load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@stage("parse/trajectory_json")
+def bench_parse_trajectory_json(ctx):
+    return lambda: _json_load(ctx["trajectory"])
+
+
+@stage("parse/lane_violation_json")
+def bench_parse_lane_violation_json(ctx):
+    return lambda: _json_load(ctx["lane_violation"])
+
+
+@stage("parse/taillight_tables")
+def bench_parse_taillight_tables(ctx):
+    tables = [os.path.join(ctx["taillight"], t) for t in ("frame_data.json", "frame_annotation.json", "instance.json")]
+    return lambda: [_json_load(t) for t in tables]
+
+
+@stage("parse/load_frame_all_formats")
+def bench_parse_load_frame_all_formats(ctx):
+    from dataset_formats import load_frame, iter_frames
+    paths = [ctx[k] for k in ("102_lidar", "173", "trajectory", "lane_violation", "102_camera")]
+    return lambda: ([load_frame(p) for p in paths], iter_frames(ctx["taillight"]))
+
+
+@stage("points/kitti_bin")
+def bench_points_kitti_bin(ctx):
+    from pcd_io import read_kitti_bin
+    return lambda: read_kitti_bin(ctx["kitti_bin"], with_intensity=True)
+
+
+@stage("points/pcd_binary")
+def bench_points_pcd_binary(ctx):
+    from pcd_io import read_pcd
+    return lambda: read_pcd(ctx["pcd_binary"], with_intensity=True)
+
+
+@stage("points/pcd_binary_compressed")
+def bench_points_pcd_binary_compressed(ctx):
+    from pcd_io import read_pcd
+    return lambda: read_pcd(ctx["pcd_compressed"], with_intensity=True)
+
+
+@stage("points/pcd_ascii")
+def bench_points_pcd_ascii(ctx):
+    from pcd_io import read_pcd
+    return lambda: read_pcd(ctx["pcd_ascii"], with_intensity=True)
+
+
+@stage("geometry/boxes_to_corners")
+def bench_geometry_boxes_to_corners(ctx):
+    from box_geometry import boxes_to_corners
+    centers, sizes, yaws, _ = ctx["boxes"]
+    return lambda: boxes_to_corners(centers, sizes, yaws, convention="173")
+
+
+@stage("geometry/voxel_downsample")
+def bench_geometry_voxel_downsample(ctx):
+    from point_sampling import downsample_points
+    return lambda: downsample_points(ctx["points"], voxel_size=0.1, max_points=200_000)
+
+
+@stage("geometry/distance_lod_downsample")
+def bench_geometry_distance_lod_downsample(ctx):
+    from point_sampling import downsample_points
+    return lambda: downsample_points(ctx["points"], voxel_size=0.1, max_points=200_000, lod_near_range=20.0)
+
+
+@stage("geometry/points_in_boxes")
+def bench_geometry_points_in_boxes(ctx):
+    from box_points import box_frames_from_params, count_points_in_boxes
+    centers, sizes, yaws, _ = ctx["boxes"]
+    frames = box_frames_from_params(centers, sizes, yaws, convention="173")
+    return lambda: count_points_in_boxes(ctx["points"], *frames)
+
+
+@stage("render/bev")
+def bench_render_bev(ctx):
+    from bev_renderer import render_bev
+    from box_geometry import boxes_to_corners
+    centers, sizes, yaws, _ = ctx["boxes"]
+    corners = boxes_to_corners(centers, sizes, yaws, convention="173")
+    xyz = ctx["points"][:, :3]
+    return lambda: render_bev(xyz, (-80, 80), (-80, 80), meters_per_pixel=0.1, box_corners=corners)
+
+
+@stage("render/mpl_3d_scatter")
+def bench_render_mpl_3d_scatter(ctx):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from box_geometry import boxes_to_corners, add_box_collection
+    from point_sampling import downsample_points
+    centers, sizes, yaws, _ = ctx["boxes"]
+    corners = boxes_to_corners(centers, sizes, yaws, convention="173")
+    pts = downsample_points(ctx["points"], voxel_size=0.1, max_points=200_000)
+
+    def run():
+        fig = plt.figure(figsize=(12, 9))
+        ax = fig.add_subplot(111, projection="3d")
+        ax.scatter(pts[:, 0], pts[:, 1], pts[:, 2], c="gray", s=0.5, alpha=0.5)
+        add_box_collection(ax, corners, "r", linewidth=1.0)
+        fig.canvas.draw()
+        plt.close(fig)
+    return run
+
+
+@stage("render/seg_mask")
+def bench_render_seg_mask(ctx):
+    from seg_mask import LabelTable, rasterize_shapes, blend_mask
+    data = _json_load(ctx["102_camera"])
+    table = LabelTable({"sky": (128, 64, 128), "road": (128, 64, 128), "car": (0, 0, 142),
+                        "truck": (0, 0, 70), "pole": (153, 153, 153), "vegetation": (60, 179, 75)})
+    img = _read_image(ctx)
+    h, w = img.shape[:2]
+
+    def run():
+        mask = rasterize_shapes(data["shapes"], table, h, w)
+        blend_mask(img.copy(), mask, table.lut, 0.5)
+    return run
+
+
+@stage("render/cv2_overlay")
+def bench_render_cv2_overlay(ctx):
+    from cv_overlay import draw_polygon, draw_text_panel
+    from dataset_formats import load_frame
+    frame = load_frame(ctx["lane_violation"])
+    img = _read_image(ctx)
+
+    def run():
+        canvas = img.copy()
+        for poly, attrs in zip(frame.polygons, frame.attributes):
+            draw_polygon(canvas, poly, attrs["extra_color"], thickness=2, alpha=0.8)
+            lines = [f"{k}: {v}" for k, v in attrs.items() if k != "object_label"]
+            draw_text_panel(canvas, lines, (poly[0][0] + 3, poly[0][1] + 3), attrs["extra_color"], alpha=0.7)
+    return run
+
+
+@stage("encode/png")
+def bench_encode_png(ctx):
+    import cv2
+    img = _read_image(ctx)
+    return lambda: cv2.imencode(".png", img)
+
+
+@stage("encode/jpg")
+def bench_encode_jpg(ctx):
+    import cv2
+    img = _read_image(ctx)
+    return lambda: cv2.imencode(".jpg", img)
+
+
+@stage("video/write")
+def bench_video_write(ctx):
+    from video_stream import StreamingVideoWriter
+    img = _read_image(ctx)
+    out_path = os.path.join(ctx["work_dir"], "video.mp4")
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):  # 반복마다 찍히는 해상도 로그 숨김
+            with StreamingVideoWriter(out_path, fps=10) as writer:
+                for _ in range(ctx["num_frames"]):
+                    writer.write(img)
+    return run
+
+
+# ───────────────────────────────────────────────────────────────
+# 3) 실행 / 저장 / 비교
+
+def time_stage(fn, repeats):
+    """fn을 repeats번 실행한 시간 통계 [초] (첫 실행 전에 한 번 워밍업)"""
+    fn()
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {"min": min(times), "median": float(np.median(times)), "mean": float(np.mean(times)),
+            "repeats": repeats}
+
+
+def _selected(name):
+    return STAGE_FILTER is None or any(name.startswith(p) for p in STAGE_FILTER)
+
+
+def _environment():
+    env = {"python": platform.python_version(), "platform": platform.platform(),
+           "cpu_count": os.cpu_count(), "numpy": np.__version__}
+    try:
+        import cv2
+        env["opencv"] = cv2.__version__
+    except ImportError:
+        pass
+    try:
+        env["git_commit"] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return env
+
+
+def run_benchmarks(scale_names=RUN_SCALES, repeats=REPEATS):
+    """선택한 스케일 × 단계를 모두 측정해서 결과 dict 반환"""
+    results = {"created": time.strftime("%Y-%m-%d %H:%M:%S"), "environment": _environment(),
+               "scales": {}, "results": {}}
+    for scale_name in scale_names:
+        scale = SCALES[scale_name]
+        results["scales"][scale_name] = scale
+        work_dir = tempfile.mkdtemp(prefix=f"bench_{scale_name}_")
+        try:
+            t0 = time.perf_counter()
+            ctx = prepare_context(scale, work_dir)
+            print(f"[*] [{scale_name}] 합성 데이터 생성 {time.perf_counter() - t0:.1f}초 ({work_dir})")
+            scale_results = results["results"].setdefault(scale_name, {})
+            for name, prepare in STAGES.items():
+                if not _selected(name):
+                    continue
+                try:
+                    scale_results[name] = time_stage(prepare(ctx), repeats)
+                except Exception as e:  # 한 단계가 실패해도 나머지는 측정
+                    scale_results[name] = {"error": f"{type(e).__name__}: {e}"}
+                    print(f"[!] [{scale_name}] {name} 실패: {e}")
+                    continue
+                print(f"    {name:<36s} median {scale_results[name]['median'] * 1e3:9.2f} ms")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def save_results(results, output_dir=OUTPUT_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, time.strftime("bench_%Y%m%d_%H%M%S.json"))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"[*] 벤치마크 결과 저장: {path}")
+    return path
+
+
+def compare_results(old, new):
+    """
+    두 결과(dict 또는 JSON 경로)의 같은 스케일/단계 median을 비교해서 출력.
+    배율 = old / new (1보다 크면 빨라짐)
+    """
+    if isinstance(old, str):
+        old = _json_load(old)
+    if isinstance(new, str):
+        new = _json_load(new)
+    print(f"[*] 비교: {old.get('environment', {}).get('git_commit', '?')} → "
+          f"{new.get('environment', {}).get('git_commit', '?')} (배율 > 1 이면 빨라짐)")
+    for scale_name, stages in new["results"].items():
+        old_stages = old.get("results", {}).get(scale_name, {})
+        for name, res in stages.items():
+            prev = old_stages.get(name)
+            if not prev or "median" not in prev or "median" not in res:
+                continue
+            ratio = prev["median"] / res["median"] if res["median"] > 0 else float("inf")
+            mark = "  ▲" if ratio > 1.1 else ("  ▼" if ratio < 0.9 else "")
+            print(f"    [{scale_name}] {name:<36s} {prev['median'] * 1e3:9.2f} → "
+                  f"{res['median'] * 1e3:9.2f} ms  ×{ratio:.2f}{mark}")
+
+
+if __name__ == "__main__":
+    results = run_benchmarks()
+    save_results(results)
+    if COMPARE_WITH is not None:
+        compare_results(COMPARE_WITH, results)
@@ -0,0 +1,220 @@
+import numpy as np
+from box_geometry import BOX_EDGES, is_single_color
+
+# ───────────────────────────────────────────────────────────────
+# NumPy 기반 BEV(Bird's-Eye-View) 래스터라이저
+#   - Matplotlib 3D scatter + view_init(elev=90) 대신 포인트를 이미지 버퍼에 직접 찍음
+#   - 한 픽셀에 여러 점이 떨어지면 가장 높은(z가 큰) 점의 색을 사용
+#   - 박스 윤곽선도 같은 버퍼에 벡터 연산으로 그림
+#   - 좌표계: 오른쪽 = +X, 위쪽 = +Y (view_init(elev=90, azim=-90)과 동일)
+
+# 박스 윗면/아랫면 중 첫 사각형 (BEV에서는 한 면의 윤곽만 그려도 footprint가 됨)
+BEV_BOX_EDGES = BOX_EDGES[:4]
+
+_LUT_CACHE = {}
+
+
+def colormap_lut(cmap="viridis", n=256):
+    """
+    Matplotlib 컬러맵을 (n, 3) uint8 RGB 룩업 테이블로 변환 (결과는 캐시).
+    matplotlib은 이 함수가 처음 호출될 때만 import 됨.
+    """
+    key = (cmap, n)
+    if key not in _LUT_CACHE:
+        import matplotlib
+        rgba = matplotlib.colormaps[cmap](np.linspace(0.0, 1.0, n))
+        _LUT_CACHE[key] = (rgba[:, :3] * 255).round().astype(np.uint8)
+    return _LUT_CACHE[key]
+
+
+def _to_rgb255(color):
+    """(r, g, b[, a]) 또는 Matplotlib 색상 이름("r", "lime" 등)을 0~255 uint8 RGB로 변환"""
+    if isinstance(color, str):
+        from matplotlib.colors import to_rgb
+        color = to_rgb(color)
+    c = np.asarray(color, dtype=np.float64)[:3]
+    if c.max() <= 1.0:
+        c = c * 255.0
+    return np.clip(c.round(), 0, 255).astype(np.uint8)
+
+
+def bev_canvas_shape(x_range, y_range, meters_per_pixel):
+    """BEV 이미지 크기 (height, width)"""
+    width = int(np.ceil((x_range[1] - x_range[0]) / meters_per_pixel))
+    height = int(np.ceil((y_range[1] - y_range[0]) / meters_per_pixel))
+    return max(height, 1), max(width, 1)
+
+
+def world_to_pixel(xy, x_range, y_range, meters_per_pixel):
+    """(N, 2) 월드 좌표 → (N, 2) 정수 픽셀 좌표 (col, row)"""
+    xy = np.asarray(xy)
+    col = np.floor((xy[:, 0] - x_range[0]) / meters_per_pixel)
+    row = np.floor((y_range[1] - xy[:, 1]) / meters_per_pixel)
+    return np.stack([col, row], axis=1).astype(np.int64)
+
+
+def splat_points(image, points, x_range, y_range, meters_per_pixel,
+                 values=None, value_range=None, cmap="viridis", point_radius=0):
+    """
+    포인트를 image(H, W, 3, uint8 RGB)에 직접 찍음 (in-place).
+    • points: (N, >=3) 배열, 앞 3열이 x, y, z
+    • values: 색상에 쓸 값 (None이면 z). 예: intensity 열
+    • value_range: (vmin, vmax). None이면 values의 min/max
+    • cmap: 컬러맵 이름 (LUT로 변환해서 사용)
+    • point_radius: 0이면 1픽셀, r이면 (2r+1)x(2r+1) 사각형으로 찍음
+    """
+    if points.shape[0] == 0:
+        return image
+    height, width = image.shape[:2]
+
+    xyz = points[:, :3]
+    values = xyz[:, 2] if values is None else np.asarray(values)
+    pix = world_to_pixel(xyz[:, :2], x_range, y_range, meters_per_pixel)
+    inside = (pix[:, 0] >= 0) & (pix[:, 0] < width) & (pix[:, 1] >= 0) & (pix[:, 1] < height)
+    pix, z, values = pix[inside], xyz[inside, 2], values[inside]
+    if pix.shape[0] == 0:
+        return image
+
+    # 값 → LUT 인덱스
+    lut = colormap_lut(cmap)
+    vmin, vmax = (values.min(), values.max()) if value_range is None else value_range
+    scale = (len(lut) - 1) / max(float(vmax) - float(vmin), 1e-12)
+    lut_idx = np.clip(((values - vmin) * scale).astype(np.int64), 0, len(lut) - 1)
+
+    # 같은 픽셀에 떨어진 점 중 z가 가장 큰 점만 남김 (정렬 후 그룹의 마지막 원소)
+    flat = pix[:, 1] * width + pix[:, 0]
+    order = np.lexsort((z, flat))
+    flat_sorted = flat[order]
+    last = np.ones(flat_sorted.shape[0], dtype=bool)
+    last[:-1] = flat_sorted[1:] != flat_sorted[:-1]
+    keep = order[last]
+
+    colors = lut[lut_idx[keep]]
+    rows, cols = pix[keep, 1], pix[keep, 0]
+    if point_radius <= 0:
+        image[rows, cols] = colors
+    else:
+        for dr in range(-point_radius, point_radius + 1):
+            for dc in range(-point_radius, point_radius + 1):
+                r = np.clip(rows + dr, 0, height - 1)
+                c = np.clip(cols + dc, 0, width - 1)
+                image[r, c] = colors
+    return image
+
+
+def _world_to_pixel_float(xy, x_range, y_range, meters_per_pixel):
+    """반올림 전 실수 픽셀 좌표 (픽셀 중심 기준, splat_points의 floor 매핑과 일치)"""
+    col = (xy[:, 0] - x_range[0]) / meters_per_pixel - 0.5
+    row = (y_range[1] - xy[:, 1]) / meters_per_pixel - 0.5
+    return np.stack([col, row], axis=1)
+
+
+def draw_segments(image, p0, p1, colors, thickness=1):
+    """
+    픽셀 좌표 선분들을 한 번에 image에 그림 (in-place).
+    • p0, p1: (M, 2) 선분 시작/끝 픽셀 좌표 (col, row)
+    • colors: (M, 3) uint8 RGB
+    • thickness: 선 두께(픽셀)
+    """
+    if len(p0) == 0:
+        return image
+    height, width = image.shape[:2]
+    p0 = np.asarray(p0, dtype=np.float64)
+    p1 = np.asarray(p1, dtype=np.float64)
+
+    # 선분마다 필요한 샘플 수 = 긴 축 방향 픽셀 수 + 1
+    n = (np.abs(p1 - p0).max(axis=1).astype(np.int64) + 1)
+    seg_id = np.repeat(np.arange(len(n)), n)
+    starts = np.cumsum(n) - n
+    t = (np.arange(n.sum()) - starts[seg_id]) / np.maximum(n[seg_id] - 1, 1)
+    pts = p0[seg_id] + (p1 - p0)[seg_id] * t[:, None]
+    cols = pts[:, 0].round().astype(np.int64)
+    rows = pts[:, 1].round().astype(np.int64)
+    seg_colors = colors[seg_id]
+
+    half = thickness // 2
+    for dr in range(-half, thickness - half):
+        for dc in range(-half, thickness - half):
+            r, c = rows + dr, cols + dc
+            ok = (r >= 0) & (r < height) & (c >= 0) & (c < width)
+            image[r[ok], c[ok]] = seg_colors[ok]
+    return image
+
+
+def draw_boxes(image, box_corners, box_colors, x_range, y_range, meters_per_pixel,
+               thickness=2):
+    """
+    (N, 8, 3) 박스 코너 배열의 BEV footprint를 image에 그림 (in-place).
+    • box_colors: 색상 하나 또는 박스별 색상 리스트 ((r,g,b) 0~255 또는 0~1)
+    """
+    box_corners = np.asarray(box_corners, dtype=np.float64).reshape(-1, 8, 3)
+    num_boxes = box_corners.shape[0]
+    if num_boxes == 0:
+        return image
+
+    # 색상 하나("r" 또는 (r, g, b))면 모든 박스에 같은 색 적용
+    if is_single_color(box_colors):
+        box_colors = [box_colors] * num_boxes
+    rgb = np.stack([_to_rgb255(c) for c in box_colors])  # (N, 3)
+
+    i, j = np.array(BEV_BOX_EDGES).T
+    xy0 = box_corners[:, i, :2].reshape(-1, 2)
+    xy1 = box_corners[:, j, :2].reshape(-1, 2)
+
+    p0 = _world_to_pixel_float(xy0, x_range, y_range, meters_per_pixel)
+    p1 = _world_to_pixel_float(xy1, x_range, y_range, meters_per_pixel)
+    colors = np.repeat(rgb, len(BEV_BOX_EDGES), axis=0)
+    return draw_segments(image, p0, p1, colors, thickness=thickness)
+
+
+def draw_polylines(image, polylines, colors, x_range, y_range, meters_per_pixel, thickness=1):
+    """
+    월드 좌표 폴리라인들(예: 트랙 궤적)을 image에 그림 (in-place).
+    • polylines: [(K, >=2) 배열, ...] — 앞 2열이 x, y. 점이 2개 미만이면 건너뜀
+    • colors: 폴리라인별 색상 리스트 ((r,g,b) 0~255 또는 0~1, 또는 Matplotlib 색상 이름)
+    """
+    lines = [(np.asarray(line, dtype=np.float64)[:, :2], _to_rgb255(color))
+             for line, color in zip(polylines, colors) if len(line) >= 2]
+    if not lines:
+        return image
+    xy0 = np.concatenate([xy[:-1] for xy, _ in lines])
+    xy1 = np.concatenate([xy[1:] for xy, _ in lines])
+    seg_colors = np.concatenate([np.repeat(rgb[None], len(xy) - 1, axis=0) for xy, rgb in lines])
+    p0 = _world_to_pixel_float(xy0, x_range, y_range, meters_per_pixel)
+    p1 = _world_to_pixel_float(xy1, x_range, y_range, meters_per_pixel)
+    return draw_segments(image, p0, p1, seg_colors, thickness=thickness)
+
+
+def render_bev(points, x_range, y_range, meters_per_pixel=0.1,
+               color_by="z", value_range=None, cmap="viridis",
+               box_corners=None, box_colors=(255, 0, 0), box_thickness=2,
+               point_radius=0, background=(255, 255, 255)):
+    """
+    포인트클라우드 + 3D 박스를 BEV 이미지 한 장으로 렌더링.
+    • points: (N, 3) xyz 또는 (N, 4) xyz+intensity
+    • x_range, y_range: 보여줄 월드 범위 (min, max) [m]
+    • meters_per_pixel: 픽셀 하나가 덮는 거리 [m]
+    • color_by: "z" (높이) 또는 "intensity" (4번째 열)
+    • value_range: 컬러맵 정규화 범위 (None이면 프레임별 min/max)
+    • box_corners: (M, 8, 3) 박스 코너 (없으면 None)
+    • box_colors: 박스 색상 하나 또는 박스별 색상 리스트
+
+    반환: (H, W, 3) uint8 RGB 이미지
+    """
+    height, width = bev_canvas_shape(x_range, y_range, meters_per_pixel)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = _to_rgb255(background)
+
+    points = np.asarray(points)
+    if color_by == "intensity" and points.ndim == 2 and points.shape[1] >= 4:
+        values = points[:, 3]
+    else:
+        values = None  # z
+    splat_points(image, points, x_range, y_range, meters_per_pixel,
+                 values=values, value_range=value_range, cmap=cmap,
+                 point_radius=point_radius)
+
+    if box_corners is not None:
+        draw_boxes(image, box_corners, box_colors, x_range, y_range, meters_per_pixel,
+                   thickness=box_thickness)
+    return image
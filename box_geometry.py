@@ -0,0 +1,152 @@
+import numpy as np
+
+# ───────────────────────────────────────────────────────────────
+# 3D 바운딩박스 기하 연산 (여러 박스를 한 번에 벡터 연산으로 처리)
+#   - boxes_to_corners(): 중심/크기/yaw 배열 → (N, 8, 3) 코너 배열
+#   - vertices_to_corners(): JSON의 bbox_vertices 리스트 → (N, 8, 3)
+#   - corners_to_yaws(): (N, 8, 3) 코너 → (N,) yaw
+#   - add_box_collection(): 모든 박스의 모든 엣지를 Line3DCollection 하나로 그림
+#   - set_box_collection(): 기존 collection의 박스만 교체 (Figure 재사용)
+#   - track_color(): track_id → 박스 색상 (trajectory 스크립트 공용)
+
+# 8개 꼭짓점을 잇는 12개 엣지 (윗면/아랫면 사각형 4개씩 + 수직 엣지 4개)
+# 모든 데이터셋의 코너 순서가 이 연결 구조를 따름
+BOX_EDGES = [
+    (0, 1), (1, 2), (2, 3), (3, 0),
+    (4, 5), (5, 6), (6, 7), (7, 4),
+    (0, 4), (1, 5), (2, 6), (3, 7)
+]
+_EDGE_I, _EDGE_J = np.array(BOX_EDGES).T
+
+# 데이터셋별 규약
+#   • size_order: JSON 크기 배열에서 (length, width, height)의 위치
+#   • corners: 단위 박스(±1) 코너 부호 (8, 3) — 순서가 데이터셋마다 다름
+BOX_CONVENTIONS = {
+    # 102 (고정밀 악천후): 3dbbox.dimension = [length, height, width], 윗면(z=+h/2) 먼저
+    "102": {
+        "size_order": (0, 2, 1),
+        "corners": np.array([
+            [ 1,  1,  1], [ 1, -1,  1], [-1, -1,  1], [-1,  1,  1],
+            [ 1,  1, -1], [ 1, -1, -1], [-1, -1, -1], [-1,  1, -1],
+        ], dtype=np.float64),
+    },
+    # 173 (가상센서 시뮬레이션): dimension = [length, width, height], 아랫면(z=-h/2) 먼저
+    "173": {
+        "size_order": (0, 1, 2),
+        "corners": np.array([
+            [-1, -1, -1], [ 1, -1, -1], [ 1,  1, -1], [-1,  1, -1],
+            [-1, -1,  1], [ 1, -1,  1], [ 1,  1,  1], [-1,  1,  1],
+        ], dtype=np.float64),
+    },
+}
+
+
+def boxes_to_corners(centers, sizes, yaws, convention="173"):
+    """
+    여러 박스의 8개 코너를 한 번에 계산.
+    • centers: (N, 3) [x, y, z]
+    • sizes:   (N, 3) 데이터셋 규약 순서의 크기 (102: [l, h, w], 173: [l, w, h])
+    • yaws:    (N,) z축 기준 회전 (라디안)
+    • convention: BOX_CONVENTIONS 키 ("102" 또는 "173")
+
+    반환: (N, 8, 3) 코너 좌표
+    """
+    conv = BOX_CONVENTIONS[convention]
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    sizes = np.asarray(sizes, dtype=np.float64).reshape(-1, 3)
+    yaws = np.asarray(yaws, dtype=np.float64).reshape(-1)
+
+    half_lwh = sizes[:, conv["size_order"]] / 2.0               # (N, 3)
+    local = conv["corners"][None, :, :] * half_lwh[:, None, :]  # (N, 8, 3)
+
+    cos = np.cos(yaws)[:, None]
+    sin = np.sin(yaws)[:, None]
+    corners = np.empty_like(local)
+    corners[:, :, 0] = cos * local[:, :, 0] - sin * local[:, :, 1]
+    corners[:, :, 1] = sin * local[:, :, 0] + cos * local[:, :, 1]
+    corners[:, :, 2] = local[:, :, 2]
+    corners += centers[:, None, :]
+    return corners
+
+
+def vertices_to_corners(vertices_list):
+    """
+    bbox_vertices(8개 꼭짓점) 리스트를 (N, 8, 3) 배열로 변환.
+    꼭짓점이 없거나 8개가 아닌 항목은 건너뜀.
+    """
+    valid = [v for v in vertices_list if v is not None and len(v) == 8]
+    return np.asarray(valid, dtype=np.float64).reshape(-1, 8, 3)
+
+
+def corners_to_yaws(corners):
+    """
+    (N, 8, 3) 코너 → (N,) yaw [rad].
+    꼭짓점 0→1 엣지를 length(진행) 방향으로 봄 (173 / trajectory 규약, 102 규약은 3→0 엣지).
+    """
+    corners = np.asarray(corners, dtype=np.float64).reshape(-1, 8, 3)
+    d = corners[:, 1, :2] - corners[:, 0, :2]
+    return np.arctan2(d[:, 1], d[:, 0])
+
+
+def box_edge_segments(corners):
+    """(N, 8, 3) 코너 → (N*12, 2, 3) 선분 배열 (박스 순서대로 12개씩)"""
+    corners = np.asarray(corners).reshape(-1, 8, 3)
+    return np.stack([corners[:, _EDGE_I], corners[:, _EDGE_J]], axis=2).reshape(-1, 2, 3)
+
+
+def is_single_color(color):
+    """색상 하나인지 판별: 색상 이름 문자열 또는 숫자 3~4개짜리 (r, g, b[, a]) — 색상 이름 리스트는 박스별 색상"""
+    if isinstance(color, str):
+        return True
+    return (np.ndim(color) == 1 and len(color) in (3, 4)
+            and all(isinstance(v, (int, float, np.number)) for v in color))
+
+
+def track_color(cls, track_id):
+    """track_id 기반 해시로 tab20 색상 선택 (숫자가 아니면 class_name 길이 사용)"""
+    try:
+        color_hash = (int(track_id) * 37) % 256
+    except (TypeError, ValueError):
+        color_hash = (len(cls) * 50) % 256
+    import matplotlib
+    return matplotlib.colormaps["tab20"](color_hash / 256)
+
+
+def add_box_collection(ax, corners, colors, linewidth=1.0, alpha=None):
+    """
+    모든 박스의 엣지를 Line3DCollection 하나로 3D 축에 추가.
+    • corners: (N, 8, 3) 코너 배열
+    • colors: 색상 하나 또는 박스별 색상 리스트 (Matplotlib 색상 형식)
+    반환: 추가된 Line3DCollection (박스가 없으면 None)
+    """
+    from mpl_toolkits.mplot3d.art3d import Line3DCollection
+
+    segments = box_edge_segments(corners)
+    if len(segments) == 0:
+        return None
+    edge_colors = _edge_colors(colors, len(segments) // len(BOX_EDGES))
+    lc = Line3DCollection(segments, colors=edge_colors, linewidths=linewidth, alpha=alpha)
+    ax.add_collection3d(lc)
+    return lc
+
+
+def set_box_collection(lc, corners, colors):
+    """
+    이미 추가된 Line3DCollection의 박스를 교체 (Figure를 재사용하는 시퀀스 렌더링용).
+    박스가 없으면 빈 collection이 됨.
+    """
+    segments = box_edge_segments(corners)
+    lc.set_segments(segments)
+    if len(segments) > 0:
+        lc.set_color(_edge_colors(colors, len(segments) // len(BOX_EDGES)))
+    return lc
+
+
+def _edge_colors(colors, num_boxes):
+    """박스 색상(하나 또는 박스별 리스트) → Line3DCollection 엣지 색상"""
+    from matplotlib.colors import to_rgba, to_rgba_array
+
+    # 색상 하나("r" 또는 (r, g, b))면 모든 엣지에 같은 색 적용
+    if is_single_color(colors):
+        return to_rgba(colors)
+    return np.repeat(to_rgba_array(colors)[:num_boxes], len(BOX_EDGES), axis=0)
@@ -0,0 +1,130 @@
+import os
+import glob
+import json
+import time
+import numpy as np
+from dataset_formats import iter_frames
+from box_points import box_stats
+from prefetch import prefetch
+
+# ───────────────────────────────────────────────────────────────
+# 3D 박스별 LiDAR 점 개수 QA (102 LiDAR / 173 / trajectory)
+#   - 라벨 폴더 아래 JSON을 모두 찾아 dataset_formats로 읽고, 프레임마다 모든 박스의 점 개수를 한 번에 계산
+#   - 결과: 프레임 하나 = JSON 한 줄 (박스별 클래스/트랙/점 개수/부피/밀도/거리)
+#       {"frame": "...", "source": "...", "dataset": "trajectory", "num_points": 120000,
+#        "boxes": [{"index": 0, "class": "car", "track_id": "3", "points": 412,
+#                   "volume": 18.2, "density": 22.6, "distance": 14.1}, ...]}
+#   - 끝나면 점이 MIN_POINTS개 미만인(비었거나 잘못 그려졌을 가능성이 있는) 박스를 클래스별로 요약
+#
+# 실행: python box_point_stats.py
+
+# (1) 라벨 폴더 (하위 폴더까지 *.json 검색) / 결과 파일
+LABEL_DIR = "/mnt/d/Dataset/05_3D_DynamicObject_Trajectory_2024/scene_001/json"
+OUTPUT_PATH = os.path.join(LABEL_DIR, "box_point_stats.jsonl")
+
+# (2) 데이터셋 형식 (dataset_formats.FORMATS 키: "102_lidar", "173", "trajectory", None이면 파일마다 자동 판별)
+DATASET = None
+
+# (3) 판정 설정
+CELL_SIZE = 1.0   # 후보 제한용 격자 셀 크기 [m]
+BOX_MARGIN = 0.0  # 박스를 축마다 이만큼 키워서 판정 [m]
+MIN_POINTS = 5    # 점이 이보다 적은 박스를 의심 박스로 요약
+
+# (4) 다음 프레임의 JSON/포인트를 미리 읽어 둘 개수 (0이면 순차 처리)
+PREFETCH_DEPTH = 4
+
+# 요약에 표시할 점이 가장 적은 박스 수
+SHOW_LOWEST = 20
+
+
+def load_frames(json_path):
+    """라벨 JSON → 3D 박스와 포인트클라우드가 있는 (Frame, points) 리스트"""
+    loaded = []
+    for frame in iter_frames(json_path, DATASET):
+        if len(frame.boxes3d) == 0 or frame.points_path is None:
+            continue
+        loaded.append((frame, frame.points))
+    return loaded
+
+
+def frame_record(frame, points):
+    """Frame 하나의 박스별 통계 → trace와 같은 한 줄짜리 dict"""
+    stats = box_stats(points, frame.boxes3d, cell_size=CELL_SIZE, margin=BOX_MARGIN)
+    track_ids = frame.track_ids if frame.track_ids is not None else [None] * len(frame.boxes3d)
+    boxes = []
+    for i, (cls, track_id) in enumerate(zip(frame.box_classes, track_ids)):
+        boxes.append({
+            "index": i,
+            "class": cls,
+            "track_id": track_id,
+            "points": int(stats["points"][i]),
+            "volume": round(float(stats["volume"][i]), 3),
+            "density": round(float(np.nan_to_num(stats["density"][i])), 3),
+            "distance": round(float(stats["distance"][i]), 2),
+        })
+    return {"frame": frame.frame_id, "source": frame.source, "dataset": frame.dataset,
+            "num_points": int(points.shape[0]), "boxes": boxes}
+
+
+def summarize(records, min_points=MIN_POINTS, show_lowest=SHOW_LOWEST):
+    """프레임 기록 리스트 → 클래스별 박스 수/점 개수 분포/의심 박스 표 (문자열)"""
+    boxes = [(rec["frame"], box) for rec in records for box in rec["boxes"]]
+    if not boxes:
+        return "[*] 3D 박스가 있는 프레임이 없습니다."
+    lines = [f"[*] 박스별 점 개수 ({len(records)}개 프레임, 박스 {len(boxes)}개, 기준 {min_points}점 미만)",
+             f"    {'class':<20s}{'boxes':>8s}{'empty':>8s}{'<min':>8s}{'p50':>8s}{'p95':>8s}"]
+    classes = sorted({box["class"] for _, box in boxes})
+    for cls in classes:
+        counts = np.array([box["points"] for _, box in boxes if box["class"] == cls])
+        p50, p95 = np.percentile(counts, [50, 95])
+        lines.append(f"    {cls:<20s}{len(counts):8d}{(counts == 0).sum():8d}"
+                     f"{(counts < min_points).sum():8d}{p50:8.0f}{p95:8.0f}")
+
+    lowest = sorted((fb for fb in boxes if fb[1]["points"] < min_points),
+                    key=lambda fb: (fb[1]["points"], -fb[1]["volume"]))[:show_lowest]
+    if lowest:
+        lines.append(f"[!] 점이 {min_points}개 미만인 박스 (적은 순 {len(lowest)}개)")
+        for frame_id, box in lowest:
+            track = f" #{box['track_id']}" if box["track_id"] is not None else ""
+            lines.append(f"    {frame_id} [{box['index']}] {box['class']}{track}: 점 {box['points']}, "
+                         f"부피 {box['volume']:.1f} m³, 거리 {box['distance']:.1f} m")
+    return "\n".join(lines)
+
+
+def run(label_dir=LABEL_DIR, output_path=OUTPUT_PATH):
+    json_paths = sorted(glob.glob(os.path.join(label_dir, "**", "*.json"), recursive=True))
+    if not json_paths:
+        print(f"[!] '{label_dir}' 폴더에 JSON 파일이 없습니다.")
+        return []
+    print(f"[*] {len(json_paths)}개의 라벨 파일에서 박스별 점 개수를 계산합니다.")
+
+    def safe_load(json_path):
+        try:
+            return load_frames(json_path)
+        except (ValueError, KeyError, OSError) as e:
+            print(f"[!] 읽을 수 없어 스킵합니다: {json_path} ({e})")
+            return []
+
+    records = []
+    elapsed = 0.0
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        for idx, (json_path, loaded) in enumerate(prefetch(json_paths, safe_load, depth=PREFETCH_DEPTH), start=1):
+            for frame, points in loaded:
+                t0 = time.perf_counter()
+                rec = frame_record(frame, points)
+                elapsed += time.perf_counter() - t0
+                records.append(rec)
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            if idx % 100 == 0 or idx == len(json_paths):
+                print(f"  ({idx}/{len(json_paths)}) 처리 중...")
+
+    print(summarize(records))
+    if records:
+        print(f"[*] 판정 시간: 프레임당 평균 {elapsed / len(records) * 1e3:.1f} ms")
+    print(f"[V] 저장됨: {output_path}")
+    return records
+
+
+if __name__ == "__main__":
+    run()
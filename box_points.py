@@ -0,0 +1,228 @@
+import numpy as np
+from box_geometry import BOX_CONVENTIONS
+
+# ───────────────────────────────────────────────────────────────
+# 포인트 ↔ 3D 박스 포함 판정 (모든 박스를 한 번에 벡터 연산으로 처리)
+#   - 박스 = 중심 + 로컬 축 3개(회전) + 축별 반길이 → 점을 박스 로컬 좌표로 옮겨 |로컬 좌표| <= 반길이 판정
+#   - 박스 프레임은 bbox_vertices(8개 꼭짓점) 또는 중심/크기/yaw에서 만듦
+#   - 후보 제한: 점을 셀 크기 격자(voxel hash)로 정렬해 두고, 박스의 AABB가 덮는 셀의 점만 정밀 판정
+#     (셀 키 정렬 한 번 + searchsorted — 파이썬 루프는 메모리 상한용 청크 단위뿐)
+#   - 겹친 박스에 동시에 속한 점은 양쪽 모두에 셈
+#
+# 사용 예)
+#   centers, half_sizes, axes = box_frames_from_corners(frame.boxes3d)
+#   counts = count_points_in_boxes(points, centers, half_sizes, axes)   # (N,) 박스별 점 개수
+#   stats = box_stats(points, frame.boxes3d)                            # 개수 + 부피/밀도/거리
+
+# 정밀 판정을 한 번에 처리할 최대 (박스, 점) 후보 쌍 수 (메모리 상한, 쌍당 수십 바이트)
+# 박스 AABB가 덮는 (박스, 셀) 나열도 같은 상한으로 나눠서 처리
+MAX_PAIRS = 1 << 21
+
+# 박스 하나가 덮을 수 있는 최대 셀 수 (cell_size가 박스보다 훨씬 작으면 이 값에 맞게 키움)
+# 셀이 박스보다 작아도 후보는 거의 줄지 않고 (박스, 셀) 나열만 커짐
+MAX_CELLS_PER_BOX = 1 << 15
+
+
+def box_frames_from_corners(corners):
+    """
+    (N, 8, 3) 코너 → 박스 프레임 (centers (N, 3), half_sizes (N, 3), axes (N, 3, 3)).
+    꼭짓점 0에서 나가는 세 엣지(0→1, 0→3, 0→4)를 로컬 축으로 사용
+    → BOX_EDGES 연결 순서를 따르는 모든 데이터셋 규약(102/173/trajectory)에 그대로 적용.
+    axes[i, k]는 박스 i의 k번째 로컬 축 단위 벡터 (월드 좌표).
+    """
+    corners = np.asarray(corners, dtype=np.float64).reshape(-1, 8, 3)
+    centers = corners.mean(axis=1)
+    edges = corners[:, [1, 3, 4], :] - corners[:, :1, :]  # (N, 3, 3)
+    lengths = np.linalg.norm(edges, axis=2)                # (N, 3)
+    axes = edges / np.where(lengths > 0, lengths, 1.0)[:, :, None]
+    return centers, lengths / 2.0, axes
+
+
+def box_frames_from_params(centers, sizes, yaws, convention="173"):
+    """
+    중심/크기/yaw → 박스 프레임 (box_frames_from_corners와 같은 형식).
+    • sizes: 데이터셋 규약 순서의 크기 (102: [l, h, w], 173: [l, w, h])
+    • convention: box_geometry.BOX_CONVENTIONS 키
+    """
+    conv = BOX_CONVENTIONS[convention]
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    sizes = np.asarray(sizes, dtype=np.float64).reshape(-1, 3)
+    yaws = np.asarray(yaws, dtype=np.float64).reshape(-1)
+
+    half_sizes = sizes[:, conv["size_order"]] / 2.0  # (l, w, h) / 2
+    cos, sin = np.cos(yaws), np.sin(yaws)
+    axes = np.zeros((len(yaws), 3, 3))
+    axes[:, 0, 0], axes[:, 0, 1] = cos, sin   # length 방향
+    axes[:, 1, 0], axes[:, 1, 1] = -sin, cos  # width 방향
+    axes[:, 2, 2] = 1.0
+    return centers, half_sizes, axes
+
+
+def _cell_hash(xyz, cell_size):
+    """
+    점 → 셀 격자 해시.
+    반환: (order, cell_keys, cell_starts, cell_counts, origin, dims)
+      • order: 셀 키 순으로 정렬한 점 인덱스
+      • cell_keys: 점이 있는 셀의 키 (오름차순), cell_starts/counts: order 안의 구간
+      • origin, dims: 셀 좌표 → 키 변환용 (키 = ((ix * dy) + iy) * dz + iz, 셀 좌표는 origin 기준)
+    """
+    origin = np.empty(3, dtype=np.int64)
+    dims = np.empty(3, dtype=np.int64)
+    keys = None
+    # 축(3개) 단위 루프 — 열 하나씩 계산하는 편이 (N,3) 배열의 axis=0 reduce보다 빠름
+    for axis in range(3):
+        idx = np.floor(xyz[:, axis] / cell_size).astype(np.int64)
+        origin[axis] = idx.min()
+        idx -= origin[axis]
+        dims[axis] = int(idx.max()) + 1
+        keys = idx if keys is None else keys * dims[axis] + idx
+
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    is_start = np.empty(sorted_keys.shape[0], dtype=bool)
+    is_start[0] = True
+    np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=is_start[1:])
+    cell_starts = np.flatnonzero(is_start)
+    cell_counts = np.diff(np.append(cell_starts, sorted_keys.shape[0]))
+    return order, sorted_keys[cell_starts], cell_starts, cell_counts, origin, dims
+
+
+def _aabb_extents(half_sizes, axes):
+    """회전된 박스의 AABB 반폭 (N, 3) = Σ_k |axes[k]| * half[k]"""
+    return np.einsum("nkj,nk->nj", np.abs(axes), half_sizes)
+
+
+def _min_cell_size(extent, max_cells):
+    """박스 하나가 덮는 셀 수가 max_cells를 넘지 않는 최소 셀 크기 ((2e/c + 2)^3 <= max_cells)"""
+    per_axis = max(np.cbrt(max_cells) - 2.0, 1.0)
+    return 2.0 * float(extent.max(initial=0.0)) / per_axis
+
+
+def _candidate_cells(centers, extent, cell_size, origin, dims, cell_keys, max_cells=MAX_PAIRS):
+    """
+    박스별 AABB(반폭 extent)가 덮는 셀 중 점이 있는 셀 목록.
+    (박스, 셀) 나열은 max_cells개 단위로 박스를 묶어서 처리 (임시 메모리 상한)
+    반환: (box_idx (M,), cell_idx (M,)) — cell_idx는 cell_keys 안의 위치
+    """
+    lo = np.floor((centers - extent) / cell_size).astype(np.int64) - origin
+    hi = np.floor((centers + extent) / cell_size).astype(np.int64) - origin
+    np.clip(lo, 0, None, out=lo)
+    np.minimum(hi, dims - 1, out=hi)
+    shape = np.maximum(hi - lo + 1, 0)  # 포인트 범위 밖이면 0
+    num_cells = shape.prod(axis=1)
+
+    box_out, cell_out = [], []
+    cum = np.cumsum(num_cells)
+    if len(cum) == 0 or cum[-1] == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    bounds = np.searchsorted(cum, np.arange(max_cells, cum[-1], max_cells), side="right")
+    for s, e in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(centers)]])):
+        if s >= e:
+            continue
+        # 박스마다 (nx, ny, nz) 셀 블록을 펼쳐서 한 번에 나열
+        counts = num_cells[s:e]
+        box_idx = np.repeat(np.arange(s, e), counts)
+        local = np.arange(box_idx.shape[0]) - np.repeat(np.cumsum(counts) - counts, counts)
+        ny, nz = shape[box_idx, 1], shape[box_idx, 2]
+        ix = lo[box_idx, 0] + local // (ny * nz)
+        iy = lo[box_idx, 1] + (local // nz) % ny
+        iz = lo[box_idx, 2] + local % nz
+        keys = (ix * dims[1] + iy) * dims[2] + iz
+
+        pos = np.searchsorted(cell_keys, keys)
+        pos_clipped = np.minimum(pos, len(cell_keys) - 1)
+        hit = cell_keys[pos_clipped] == keys
+        box_out.append(box_idx[hit])
+        cell_out.append(pos_clipped[hit])
+    return np.concatenate(box_out), np.concatenate(cell_out)
+
+
+def points_in_boxes(points, centers, half_sizes, axes, cell_size=1.0, margin=0.0, max_pairs=MAX_PAIRS):
+    """
+    모든 박스에 대해 안에 든 점을 찾음.
+    • points: (P, >=3) 배열 (앞 3열 x, y, z, 유한하지 않은 점은 어느 박스에도 넣지 않음)
+    • centers, half_sizes, axes: box_frames_from_corners() / box_frames_from_params() 결과
+    • cell_size: 후보 제한용 격자 셀 크기 [m] (박스 크기 정도가 적당)
+      — 박스 하나가 MAX_CELLS_PER_BOX개보다 많은 셀을 덮을 만큼 작으면 그 최소 크기로 올려서 사용
+    • margin: 박스를 축마다 이만큼 키워서 판정 [m] (경계에 걸친 점 포함용)
+    • max_pairs: 한 번에 나열할 (박스, 셀) / 정밀 판정할 (박스, 점) 후보 쌍 수 상한
+    반환: (box_idx (K,), point_idx (K,)) 박스 안에 든 (박스, 점) 쌍 (박스 순)
+    """
+    xyz = np.asarray(points)[:, :3]
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+    # NaN/inf 점 제외 (floor(NaN) → INT64_MIN이 셀 키를 깨뜨림), point_idx는 원래 번호로 돌려줌
+    finite = np.isfinite(xyz[:, 0])  # 축(3개) 단위 — (N,3) 배열의 all(axis=1)보다 빠름
+    finite &= np.isfinite(xyz[:, 1])
+    finite &= np.isfinite(xyz[:, 2])
+    valid = None
+    if not finite.all():
+        valid = np.flatnonzero(finite)
+        xyz = xyz[valid]
+    if xyz.shape[0] == 0 or centers.shape[0] == 0:
+        return empty
+    half_sizes = np.asarray(half_sizes, dtype=np.float64).reshape(-1, 3) + margin
+    axes = np.asarray(axes, dtype=np.float64).reshape(-1, 3, 3)
+
+    # 1) voxel hash: 셀 키 순으로 점 정렬 (셀이 너무 작으면 박스당 셀 수가 max_pairs 이하가 되도록 키움)
+    #    (셀 키 = 축별 셀 수의 곱이 int64를 넘지 않도록 포인트 범위 기준 하한도 적용)
+    extent = _aabb_extents(half_sizes, axes)
+    span = max(float(np.ptp(xyz[:, axis])) for axis in range(3))
+    cell_size = max(cell_size, _min_cell_size(extent, min(MAX_CELLS_PER_BOX, max_pairs)), span / (1 << 20))
+    order, cell_keys, cell_starts, cell_counts, origin, dims = _cell_hash(xyz, cell_size)
+
+    # 2) 박스 AABB가 덮는 셀 → (박스, 셀) 후보
+    cand_box, cand_cell = _candidate_cells(centers, extent, cell_size, origin, dims, cell_keys, max_pairs)
+    if cand_box.shape[0] == 0:
+        return empty
+    cand_counts = cell_counts[cand_cell]
+
+    # 3) 후보 셀의 점을 (박스, 점) 쌍으로 펼쳐서 로컬 좌표 판정 (쌍 수가 max_pairs를 넘지 않게 나눔)
+    box_out, point_out = [], []
+    cum = np.cumsum(cand_counts)
+    bounds = np.searchsorted(cum, np.arange(max_pairs, cum[-1], max_pairs), side="right")
+    for s, e in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(cand_box)]])):
+        if s >= e:
+            continue
+        counts = cand_counts[s:e]
+        pair_box = np.repeat(cand_box[s:e], counts)
+        offsets = np.repeat(cell_starts[cand_cell[s:e]] - (np.cumsum(counts) - counts), counts)
+        pair_point = order[offsets + np.arange(pair_box.shape[0])]
+
+        d = xyz[pair_point] - centers[pair_box]
+        inside = np.ones(pair_box.shape[0], dtype=bool)
+        for k in range(3):  # 로컬 축(3개) 단위 루프
+            proj = np.einsum("nj,nj->n", d, axes[pair_box, k])
+            inside &= np.abs(proj) <= half_sizes[pair_box, k]
+        box_out.append(pair_box[inside])
+        point_out.append(pair_point[inside])
+
+    box_idx = np.concatenate(box_out)
+    point_idx = np.concatenate(point_out)
+    sort = np.argsort(box_idx, kind="stable")
+    point_idx = point_idx[sort]
+    return box_idx[sort], point_idx if valid is None else valid[point_idx]
+
+
+def count_points_in_boxes(points, centers, half_sizes, axes, cell_size=1.0, margin=0.0):
+    """박스별 안에 든 점 개수 (N,) int64"""
+    box_idx, _ = points_in_boxes(points, centers, half_sizes, axes, cell_size, margin)
+    return np.bincount(box_idx, minlength=len(np.asarray(centers).reshape(-1, 3)))
+
+
+def box_stats(points, corners, cell_size=1.0, margin=0.0):
+    """
+    QA용 박스별 통계 ((N, 8, 3) 코너 기준).
+    반환: {"points": 점 개수 (N,), "volume": 부피 [m³], "density": 점/m³,
+           "distance": 원점(센서)에서 박스 중심까지 수평 거리 [m]}
+    """
+    centers, half_sizes, axes = box_frames_from_corners(corners)
+    counts = count_points_in_boxes(points, centers, half_sizes, axes, cell_size, margin)
+    volume = 8.0 * half_sizes.prod(axis=1)
+    return {
+        "points": counts,
+        "volume": volume,
+        "density": counts / np.where(volume > 0, volume, np.nan),
+        "distance": np.linalg.norm(centers[:, :2], axis=1),
+    }
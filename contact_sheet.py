@@ -0,0 +1,111 @@
+import os
+import cv2
+import numpy as np
+from cv_overlay import to_bgr, draw_text_panel, save_bgr
+
+# ───────────────────────────────────────────────────────────────
+# 콘택트 시트(모자이크): 썸네일 타일을 cols × rows 격자로 모아 시트 한 장씩 저장
+#   - 프레임마다 200dpi PNG를 만드는 대신 QA용으로 한 번에 많은 프레임을 훑어볼 때 사용
+#   - 타일 크기는 첫 타일의 비율로 고정 (비율이 다른 이미지는 레터박스)
+#   - 타일마다 왼쪽 위에 라벨(프레임 id) 표시
+#   - 시트가 다 차면 바로 저장하므로 메모리는 시트 한 장 분량
+#
+# 사용 예)
+#   with ContactSheetWriter(out_dir, cols=6, rows=5, tile_width=480) as sheets:
+#       img, scale = read_bgr_reduced(path, 4)   # cv_overlay — 좌표 × scale로 오버레이
+#       sheets.add(img, frame_id)
+
+
+def fit_tile(img, tile_size, background=(32, 32, 32)):
+    """이미지를 tile_size (width, height) 안에 비율 유지로 맞추고 남는 부분은 배경색으로 채움"""
+    tw, th = tile_size
+    h, w = img.shape[:2]
+    if (w, h) == (tw, th):
+        return img
+    scale = min(tw / w, th / h)
+    nw, nh = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+    resized = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+    tile = np.empty((th, tw, 3), dtype=np.uint8)
+    tile[:] = to_bgr(background)
+    x0, y0 = (tw - nw) // 2, (th - nh) // 2
+    tile[y0:y0 + nh, x0:x0 + nw] = resized
+    return tile
+
+
+class ContactSheetWriter:
+    """
+    타일을 순서대로 받아서 격자 시트로 저장.
+    • out_dir: 시트 저장 폴더 (<prefix>_0001<ext>, <prefix>_0002<ext>, ...)
+    • cols, rows: 시트 한 장의 타일 열/행 수
+    • tile_width: 타일 너비 [px] (높이는 첫 타일의 비율로 결정)
+    • gap: 타일 사이 간격 [px], background: 배경색
+    • label_scale: 라벨 글자 크기 (cv2 font scale)
+    """
+
+    def __init__(self, out_dir, cols=6, rows=5, tile_width=480, gap=4,
+                 background=(32, 32, 32), label_scale=0.4, prefix="sheet", ext=".jpg"):
+        self.out_dir = out_dir
+        self.cols, self.rows = cols, rows
+        self.tile_width = tile_width
+        self.gap = gap
+        self.background = background
+        self.label_scale = label_scale
+        self.prefix, self.ext = prefix, ext
+        self.tile_size = None
+        self.paths = []      # 저장한 시트 경로
+        self.num_tiles = 0   # 지금까지 받은 타일 수
+        self._sheet = None
+        self._count = 0      # 현재 시트에 채운 타일 수
+        os.makedirs(out_dir, exist_ok=True)
+
+    def add(self, img, label=None):
+        """
+        타일 하나 추가 (img: BGR uint8, 원본 또는 축소 해상도).
+        반환: 이번에 시트가 다 차서 저장했으면 그 경로, 아니면 None
+        """
+        if self.tile_size is None:
+            h, w = img.shape[:2]
+            self.tile_size = (self.tile_width, max(1, int(round(self.tile_width * h / w))))
+        tw, th = self.tile_size
+        if self._sheet is None:
+            sheet_w = self.cols * tw + (self.cols + 1) * self.gap
+            sheet_h = self.rows * th + (self.rows + 1) * self.gap
+            self._sheet = np.empty((sheet_h, sheet_w, 3), dtype=np.uint8)
+            self._sheet[:] = to_bgr(self.background)
+
+        tile = fit_tile(img, self.tile_size, self.background)
+        if tile is img:
+            tile = img.copy()  # 라벨을 입력 이미지에 그리지 않도록
+        if label:
+            draw_text_panel(tile, [str(label)], (0, 0), "black", alpha=0.6,
+                            font_scale=self.label_scale, pad=3)
+        row, col = divmod(self._count, self.cols)
+        x = self.gap + col * (tw + self.gap)
+        y = self.gap + row * (th + self.gap)
+        self._sheet[y:y + th, x:x + tw] = tile
+        self._count += 1
+        self.num_tiles += 1
+        if self._count == self.cols * self.rows:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """채우던 시트를 저장 (빈 칸은 배경색) — 반환: 저장 경로 또는 None"""
+        if self._sheet is None or self._count == 0:
+            return None
+        path = os.path.join(self.out_dir, f"{self.prefix}_{len(self.paths) + 1:04d}{self.ext}")
+        save_bgr(path, self._sheet)
+        self.paths.append(path)
+        self._sheet = None
+        self._count = 0
+        return path
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
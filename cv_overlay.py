@@ -0,0 +1,159 @@
+import cv2
+import numpy as np
+
+# ───────────────────────────────────────────────────────────────
+# OpenCV 2D 오버레이 렌더러 (Matplotlib figure + savefig 대신 원본 해상도 픽셀 버퍼에 직접 그림)
+#   - 폴리곤 외곽선, 사각형, 클래스 태그, 여러 줄 텍스트 패널
+#   - 좌표는 원본 이미지 픽셀 그대로 사용 (리샘플링 없음)
+#   - 이미지는 BGR uint8 (cv2.imread 결과 그대로), 색상은 Matplotlib 색상 이름/hex 문자열도 허용
+#   - 투명도(alpha)는 해당 도형의 bounding rect 영역에서만 블렌딩
+#   - Hershey 폰트는 ASCII만 지원하므로 그 밖의 문자는 '?'로 표시됨
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+_COLOR_CACHE = {}
+
+
+def to_bgr(color):
+    """
+    색상 → (b, g, r) 0~255 정수 튜플.
+    • "#rrggbb", Matplotlib 색상 이름("lime", "r" 등), (r, g, b) 0~1 또는 0~255
+    """
+    key = color if isinstance(color, str) else tuple(color)
+    if key not in _COLOR_CACHE:
+        if isinstance(color, str):
+            from matplotlib.colors import to_rgb
+            rgb = np.array(to_rgb(color)) * 255.0
+        else:
+            rgb = np.asarray(color, dtype=np.float64)[:3]
+            if rgb.max() <= 1.0:
+                rgb = rgb * 255.0
+        r, g, b = (int(round(v)) for v in np.clip(rgb, 0, 255))
+        _COLOR_CACHE[key] = (b, g, r)
+    return _COLOR_CACHE[key]
+
+
+def _blend_roi(img, x0, y0, x1, y1, draw_fn, alpha):
+    """img[y0:y1, x0:x1] 영역에서만 draw_fn을 그린 뒤 alpha로 섞음 (in-place)"""
+    h, w = img.shape[:2]
+    x0, y0 = max(int(x0), 0), max(int(y0), 0)
+    x1, y1 = min(int(x1), w), min(int(y1), h)
+    if x0 >= x1 or y0 >= y1:
+        return img
+    roi = img[y0:y1, x0:x1]
+    layer = roi.copy()
+    draw_fn(layer, (x0, y0))
+    cv2.addWeighted(layer, alpha, roi, 1.0 - alpha, 0, dst=roi)
+    return img
+
+
+def draw_polygon(img, points, color, thickness=2, alpha=1.0):
+    """
+    닫힌 폴리곤 외곽선을 그림 (in-place).
+    • points: (V, 2) 픽셀 좌표 (실수 가능, 반올림)
+    """
+    pts = np.round(np.asarray(points, dtype=np.float64)).astype(np.int32).reshape(-1, 1, 2)
+    bgr = to_bgr(color)
+    if alpha >= 1.0:
+        cv2.polylines(img, [pts], True, bgr, thickness, lineType=cv2.LINE_AA)
+        return img
+    x0, y0 = pts[:, 0].min(axis=0) - thickness
+    x1, y1 = pts[:, 0].max(axis=0) + thickness + 1
+    return _blend_roi(img, x0, y0, x1, y1,
+                      lambda layer, o: cv2.polylines(layer, [pts - np.array(o, np.int32)], True, bgr,
+                                                     thickness, lineType=cv2.LINE_AA),
+                      alpha)
+
+
+def draw_rectangle(img, xyxy, color, thickness=2):
+    """[x_min, y_min, x_max, y_max] 사각형 외곽선 (in-place)"""
+    x_min, y_min, x_max, y_max = (int(round(v)) for v in xyxy)
+    cv2.rectangle(img, (x_min, y_min), (x_max, y_max), to_bgr(color), thickness)
+    return img
+
+
+LINE_GAP = 4  # 줄 간격 [px]
+
+
+def text_panel_size(lines, font_scale=0.5, thickness=1, pad=4):
+    """여러 줄 텍스트 패널의 (width, height)와 줄 높이 (baseline 위쪽 글자 높이)"""
+    sizes = [cv2.getTextSize(line, FONT, font_scale, thickness) for line in lines]
+    text_h = max(size[1] for size, _ in sizes)
+    descent = max(baseline for _, baseline in sizes)  # g, y 등 baseline 아래로 내려가는 부분
+    width = max(size[0] for size, _ in sizes) + 2 * pad
+    height = (text_h + LINE_GAP) * len(lines) - LINE_GAP + descent + 2 * pad
+    return width, height, text_h
+
+
+def draw_text_panel(img, lines, org, bg_color, text_color="white", alpha=0.7,
+                    font_scale=0.5, thickness=1, pad=4, anchor="top"):
+    """
+    배경 박스가 있는 여러 줄 텍스트를 그림 (in-place).
+    • lines: 문자열 또는 문자열 리스트
+    • org: 기준점 (x, y) — anchor="top"이면 패널 왼쪽 위, "bottom"이면 왼쪽 아래
+    • bg_color: 배경색 (alpha로 블렌딩), text_color: 글자색
+    반환: 패널이 차지한 영역 (x0, y0, x1, y1)
+    """
+    if isinstance(lines, str):
+        lines = lines.split("\n")
+    lines = [line.encode("ascii", "replace").decode("ascii") for line in lines]
+    if not lines:
+        return None
+    width, height, text_h = text_panel_size(lines, font_scale, thickness, pad)
+    x0 = int(round(org[0]))
+    y0 = int(round(org[1])) - (height if anchor == "bottom" else 0)
+    x1, y1 = x0 + width, y0 + height
+
+    bg = to_bgr(bg_color)
+    if alpha >= 1.0:
+        cv2.rectangle(img, (x0, y0), (x1, y1), bg, -1)
+    else:
+        _blend_roi(img, x0, y0, x1, y1,
+                   lambda layer, o: cv2.rectangle(layer, (x0 - o[0], y0 - o[1]),
+                                                  (x1 - o[0], y1 - o[1]), bg, -1),
+                   alpha)
+
+    fg = to_bgr(text_color)
+    for i, line in enumerate(lines):
+        baseline_y = y0 + pad + text_h + i * (text_h + LINE_GAP)
+        cv2.putText(img, line, (x0 + pad, baseline_y), FONT, font_scale, fg, thickness, cv2.LINE_AA)
+    return x0, y0, x1, y1
+
+
+def draw_tag(img, text, org, bg_color, font_scale=0.5):
+    """박스 위쪽 클래스 태그 (org = 박스 왼쪽 위, 태그는 그 바로 위에 붙음)"""
+    return draw_text_panel(img, [text], (org[0], org[1] - 2), bg_color, alpha=1.0,
+                           font_scale=font_scale, pad=2, anchor="bottom")
+
+
+def read_bgr(path):
+    """이미지를 BGR uint8로 읽음 (읽을 수 없으면 None)"""
+    return cv2.imread(path, cv2.IMREAD_COLOR)
+
+
+# 축소 디코딩 배율 → imread 플래그 (JPEG는 DCT 단계에서 바로 축소되므로 전체 해상도 디코딩보다 훨씬 빠름,
+#   PNG 등은 전체를 디코딩한 뒤 줄임)
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def read_bgr_reduced(path, factor=4):
+    """
+    이미지를 1/factor 해상도 BGR uint8로 읽음.
+    • factor: 1, 2, 4, 8 중 하나
+    반환: (이미지 또는 None, 좌표 배율 1/factor) — 원본 픽셀 좌표 × 배율 = 축소 이미지 좌표
+    """
+    if factor not in _REDUCED_FLAGS:
+        raise ValueError(f"factor는 {', '.join(map(str, _REDUCED_FLAGS))} 중 하나여야 합니다: {factor}")
+    return cv2.imread(path, _REDUCED_FLAGS[factor]), 1.0 / factor
+
+
+def save_bgr(path, img):
+    """BGR 버퍼를 그대로 저장 (확장자에 맞는 형식으로 인코딩)"""
+    if not cv2.imwrite(path, img):
+        raise IOError(f"이미지를 저장할 수 없습니다: {path}")
+    return path
@@ -0,0 +1,332 @@
+import os
+import json
+import numpy as np
+from box_geometry import boxes_to_corners
+from annotation_store import DATASETS
+
+# ───────────────────────────────────────────────────────────────
+# 데이터셋 형식 레지스트리: 라벨 파일 하나 → 공통 Frame 구조
+#   - 형식마다 detect(path, data) + read(path, data)를 등록해 두고, load_frame()이 자동으로 골라 읽음
+#   - Frame: 3D 박스 코너, 2D 박스, 폴리곤, 이미지/포인트클라우드 경로 (포인트는 처음 접근할 때 로드)
+#   - 이 모듈은 json + NumPy만 import (open3d, cv2, matplotlib은 실제로 필요한 경로에서만 import)
+#     → 개수 집계/통계 같은 단순 조회는 무거운 라이브러리 로딩 없이 바로 시작
+#
+# 사용 예)
+#   frame = load_frame(".../02.라벨링데이터/Clip_000/Lidar/Lidar_Roof/375_ND_000_LR_007.json")
+#   frame.boxes3d.shape   # (N, 8, 3)
+#   frame.points          # 이때 .bin을 읽음
+#   for frame in iter_frames(".../meta"):  # 여러 프레임이 든 테이블형 데이터셋 (taillight)
+#       ...
+
+# 등록된 형식: 이름 → {"detect": fn(path, data) → bool, "read": fn(path, data) → [Frame, ...]}
+#   등록 순서대로 detect를 시도 (앞쪽이 우선)
+FORMATS = {}
+
+# 같은 폴더 구조에서 라벨 ↔ 원천 데이터 경로를 바꿀 때 쓰는 폴더 이름
+LABEL_DIR_NAMES = ("02.라벨링데이터", "라벨링데이터")
+SOURCE_DIR_NAMES = ("01.원천데이터", "원천데이터")
+IMAGE_EXTENSIONS = (".jpg", ".png")
+
+# taillight 테이블형 데이터셋: meta 폴더 기준 이미지 폴더 (상대 경로)
+TAILLIGHT_TABLES = ("frame_data.json", "frame_annotation.json", "instance.json")
+TAILLIGHT_IMAGE_DIR = os.path.join("..", "sensor", "camera(00)")
+
+
+class Frame:
+    """
+    데이터셋과 무관한 프레임 하나.
+    • dataset: 형식 이름 (FORMATS 키), source: 라벨 파일 경로, frame_id: 프레임 식별자
+    • boxes3d: (N, 8, 3) 코너 (box_geometry.BOX_EDGES 연결 순서), box_classes: N개 클래스명
+    • track_ids: N개 트랙 ID (없으면 None)
+    • boxes2d: (M, 4) [x_min, y_min, x_max, y_max], box2d_classes: M개 클래스명
+    • polygons: [(V, 2) 배열, ...], polygon_labels: 폴리곤별 라벨
+    • attributes: 2D 박스/폴리곤별 추가 정보 dict 리스트 (형식마다 다름, 없으면 빈 리스트)
+    • image_path / points_path: 대응되는 원천 파일 (찾지 못하면 None)
+    """
+
+    def __init__(self, dataset, source, frame_id=None):
+        self.dataset = dataset
+        self.source = source
+        self.frame_id = frame_id if frame_id is not None else os.path.splitext(os.path.basename(source))[0]
+        self.boxes3d = np.zeros((0, 8, 3))
+        self.box_classes = []
+        self.track_ids = None
+        self.boxes2d = np.zeros((0, 4))
+        self.box2d_classes = []
+        self.polygons = []
+        self.polygon_labels = []
+        self.attributes = []
+        self.image_path = None
+        self.points_path = None
+        self._points = None
+
+    @property
+    def points(self):
+        """포인트클라우드 (N, 3) float32 — 처음 접근할 때 points_path에서 로드 (없으면 None)"""
+        if self._points is None and self.points_path is not None:
+            from pcd_io import load_points
+            self._points = load_points(self.points_path)
+        return self._points
+
+    def __repr__(self):
+        return (f"Frame({self.dataset!r}, {self.frame_id!r}, boxes3d={len(self.boxes3d)}, "
+                f"boxes2d={len(self.boxes2d)}, polygons={len(self.polygons)})")
+
+
+def register_format(name, detect):
+    """
+    형식 등록 데코레이터.
+    • detect(path, data): 이 형식이면 True (data는 파싱한 JSON, 폴더 경로면 None)
+    • 데코레이트되는 함수 read(path, data)는 Frame 리스트를 반환
+    """
+    def decorator(read_fn):
+        FORMATS[name] = {"detect": detect, "read": read_fn}
+        return read_fn
+    return decorator
+
+
+# ───────────────────────────────────────────────────────────────
+# 1) 경로 도우미
+
+def _swap_dir(path, old_names, new_names):
+    """경로 안의 폴더 이름 하나를 바꿈 (old_names 중 처음 찾은 것 → 같은 위치의 new_names)"""
+    parts = os.path.normpath(path).split(os.sep)
+    for old, new in zip(old_names, new_names):
+        if old in parts:
+            parts[parts.index(old)] = new
+            return os.sep.join(parts)
+    return None
+
+
+def _existing(base_path, extensions):
+    """base_path + 확장자 후보 중 처음 존재하는 파일 (없으면 None)"""
+    if base_path is None:
+        return None
+    for ext in extensions:
+        if os.path.isfile(base_path + ext):
+            return base_path + ext
+    return None
+
+
+def _source_base(json_path):
+    """라벨 JSON 경로 → 같은 상대 경로의 원천 데이터 경로 (확장자 제외)"""
+    swapped = _swap_dir(json_path, LABEL_DIR_NAMES, SOURCE_DIR_NAMES)
+    return os.path.splitext(swapped)[0] if swapped is not None else None
+
+
+def _sibling_base(json_path, label_dir, source_dir):
+    """.../<label_dir>/X.json → .../<source_dir>/X (확장자 제외)"""
+    folder, fname = os.path.split(json_path)
+    if os.path.basename(folder) != label_dir:
+        return None
+    return os.path.join(os.path.dirname(folder), source_dir, os.path.splitext(fname)[0])
+
+
+# ───────────────────────────────────────────────────────────────
+# 2) 형식별 reader
+
+def _is_102_lidar(path, data):
+    anns = data.get("annotations") if isinstance(data, dict) else None
+    return bool(anns) and isinstance(anns, list) and "3dbbox.location" in anns[0]
+
+
+@register_format("102_lidar", _is_102_lidar)
+def read_102_lidar(path, data):
+    """102 악천후 LiDAR: annotations[*]["3dbbox.location/dimension/rotation_y/category"]"""
+    anns = data["annotations"]
+    frame = Frame("102_lidar", path)
+    frame.boxes3d = boxes_to_corners(
+        [ann["3dbbox.location"] for ann in anns],    # [x, y, z]
+        [ann["3dbbox.dimension"] for ann in anns],   # [length, height, width]
+        [ann["3dbbox.rotation_y"] for ann in anns],  # 라디안
+        convention="102")
+    frame.box_classes = [ann.get("3dbbox.category", "unknown") for ann in anns]
+    frame.points_path = _existing(_source_base(path), (".bin",))
+    return [frame]
+
+
+def _is_102_camera(path, data):
+    return isinstance(data, dict) and isinstance(data.get("shapes"), list)
+
+
+@register_format("102_camera", _is_102_camera)
+def read_102_camera(path, data):
+    """102 악천후 카메라 (labelme): shapes[*]["label", "points"] + imagePath/imageHeight/imageWidth"""
+    frame = Frame("102_camera", path)
+    for shape in data["shapes"]:
+        frame.polygons.append(np.asarray(shape.get("points") or [], dtype=np.float64).reshape(-1, 2))
+        frame.polygon_labels.append(shape["label"])
+        frame.attributes.append({})
+    image_path = data.get("imagePath")
+    if image_path and not os.path.isabs(image_path):
+        image_path = os.path.join(os.path.dirname(path), image_path)
+    if not (image_path and os.path.isfile(image_path)):
+        image_path = _existing(_source_base(path), IMAGE_EXTENSIONS)
+    frame.image_path = image_path
+    return [frame]
+
+
+def _is_173(path, data):
+    anns = data.get("annotations") if isinstance(data, dict) else None
+    return isinstance(anns, list) and not _is_102_lidar(path, data)
+
+
+def _has_3d(obj):
+    return all(isinstance(obj.get(k), list) and len(obj[k]) == 3
+               for k in ("dimension", "location", "orientation"))
+
+
+@register_format("173", _is_173)
+def read_173(path, data):
+    """
+    173 가상센서 시뮬레이션: annotations[*]
+      • 2D: "bbox" [x_min, y_min, x_max, y_max] + "class"
+      • 3D: "location" [x,y,z], "dimension" [l,w,h], "orientation" [roll,pitch,yaw] (있는 객체만)
+    라벨 폴더 labeling/ ↔ 원천 폴더 image/(.png), lidar/(.pcd)
+    """
+    anns = data["annotations"]
+    frame = Frame("173", path)
+    with_3d = [obj for obj in anns if _has_3d(obj)]
+    frame.boxes3d = boxes_to_corners(
+        [obj["location"] for obj in with_3d],
+        [obj["dimension"] for obj in with_3d],
+        [obj["orientation"][2] for obj in with_3d],
+        convention="173")
+    frame.box_classes = [obj.get("class", "Unknown") for obj in with_3d]
+    with_2d = [obj for obj in anns if isinstance(obj.get("bbox"), list) and len(obj["bbox"]) == 4]
+    frame.boxes2d = np.asarray([obj["bbox"] for obj in with_2d], dtype=np.float64).reshape(-1, 4)
+    frame.box2d_classes = [obj.get("class", "Unknown") for obj in with_2d]
+    frame.attributes = [{} for _ in with_2d]
+    frame.image_path = _existing(_sibling_base(path, "labeling", "image"), (".png", ".jpg"))
+    frame.points_path = _existing(_sibling_base(path, "labeling", "lidar"), (".pcd",))
+    return [frame]
+
+
+def _is_lane_violation(path, data):
+    return isinstance(data, dict) and "data_set_info" in data
+
+
+@register_format("lane_violation", _is_lane_violation)
+def read_lane_violation(path, data):
+    """134 차로 위반: data_set_info.data (annotation_store와 같은 추출기 사용)"""
+    columns = DATASETS["lane_violation"]["extract"](data)
+    frame = Frame("lane_violation", path)
+    frame.polygons = [np.asarray(p, dtype=np.float64) for p in columns["polygon"]]
+    frame.polygon_labels = list(columns["violation_type"])
+    meta_names = [name for name in columns if name not in ("polygon", "object_label")]
+    frame.attributes = [
+        dict({name: columns[name][i] for name in meta_names},
+             object_label=json.loads(columns["object_label"][i]))
+        for i in range(len(frame.polygons))
+    ]
+    frame.image_path = _existing(_source_base(path), IMAGE_EXTENSIONS)
+    return [frame]
+
+
+def _is_trajectory(path, data):
+    return isinstance(data, dict) and "object_list" in data.get("annotation_metadata", {})
+
+
+@register_format("trajectory", _is_trajectory)
+def read_trajectory(path, data):
+    """
+    3D 동적객체 궤적: annotation_metadata.object_list[*]["bbox_vertices", "class_name", "track_id"]
+    라벨 폴더 json/ ↔ 포인트클라우드 lidar/stitched/(.pcd)
+    """
+    columns = DATASETS["trajectory"]["extract"](data)
+    valid = ~np.isnan(columns["vertices"]).any(axis=(1, 2))  # 꼭짓점이 8개인 객체만
+    frame = Frame("trajectory", path)
+    frame.boxes3d = columns["vertices"][valid]
+    frame.box_classes = [c for c, ok in zip(columns["class_name"], valid) if ok]
+    frame.track_ids = [t for t, ok in zip(columns["track_id"], valid) if ok]
+    frame.points_path = _existing(_sibling_base(path, "json", os.path.join("lidar", "stitched")),
+                                  (".pcd", ".bin"))
+    return [frame]
+
+
+def _taillight_dir(path):
+    """taillight meta 폴더 (폴더 자체 또는 그 안의 테이블 JSON 경로) → 폴더, 아니면 None"""
+    folder = path if os.path.isdir(path) else os.path.dirname(path)
+    if os.path.isdir(path) or os.path.basename(path) in TAILLIGHT_TABLES:
+        if all(os.path.isfile(os.path.join(folder, t)) for t in TAILLIGHT_TABLES):
+            return folder
+    return None
+
+
+@register_format("taillight", lambda path, data: _taillight_dir(path) is not None)
+def read_taillight(path, data):
+    """
+    taillight: meta 폴더의 연결된 테이블 (frame_data ↔ frame_annotation ↔ instance)
+    frame_data 하나 = Frame 하나 (annotation이 있는 프레임만, annotation 파일 순서)
+    """
+    meta_dir = _taillight_dir(path)
+
+    def table(name):
+        with open(os.path.join(meta_dir, name), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    frame_data_by_uuid = {fd["uuid"]: fd for fd in table("frame_data.json")}
+    instance_info = {inst["uuid"]: inst for inst in table("instance.json")}
+    annotations_by_frame = {}
+    for ann in table("frame_annotation.json"):
+        annotations_by_frame.setdefault(ann["frame_data_uuid"], []).append(ann)
+
+    image_dir = os.path.normpath(os.path.join(meta_dir, TAILLIGHT_IMAGE_DIR))
+    frames = []
+    for fd_uuid, anns in annotations_by_frame.items():
+        frame = Frame("taillight", meta_dir, frame_id=fd_uuid)
+        frame.boxes2d = np.asarray([ann["geometry"]["bbox_image2d"] for ann in anns],
+                                   dtype=np.float64).reshape(-1, 4)
+        frame.box2d_classes = [instance_info.get(ann["instance_uuid"], {}).get("category_name", "unknown")
+                               for ann in anns]
+        frame.attributes = [dict(ann.get("attribute", {})) for ann in anns]
+        fd = frame_data_by_uuid.get(fd_uuid)
+        if fd is not None:
+            frame.image_path = os.path.join(image_dir, f"{fd['file_name']}.{fd['file_format']}")
+        frames.append(frame)
+    return frames
+
+
+# ───────────────────────────────────────────────────────────────
+# 3) 공개 API
+
+def detect_format(path, data=None):
+    """등록된 형식 중 path(+ 파싱한 JSON)에 맞는 첫 형식 이름 (없으면 None)"""
+    for name, fmt in FORMATS.items():
+        if fmt["detect"](path, data):
+            return name
+    return None
+
+
+def iter_frames(path, fmt=None):
+    """
+    라벨 파일(또는 테이블형 데이터셋 폴더)에 든 모든 프레임을 Frame 리스트로 반환.
+    • fmt: 형식 이름 (None이면 자동 판별)
+    """
+    data = None
+    if not os.path.isdir(path) and _taillight_dir(path) is None:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    if fmt is None:
+        fmt = detect_format(path, data)
+        if fmt is None:
+            raise ValueError(f"알 수 없는 데이터셋 형식입니다: {path}")
+    elif fmt not in FORMATS:
+        raise KeyError(f"등록되지 않은 형식: {fmt} (가능: {', '.join(FORMATS)})")
+    return FORMATS[fmt]["read"](path, data)
+
+
+def load_frame(path, fmt=None, frame_id=None):
+    """
+    라벨 파일 하나 → Frame.
+    • 테이블형(taillight)처럼 파일 하나에 프레임이 여러 개면 frame_id로 고름 (없으면 ValueError)
+    """
+    frames = iter_frames(path, fmt)
+    if frame_id is not None:
+        for frame in frames:
+            if frame.frame_id == frame_id:
+                return frame
+        raise KeyError(f"프레임을 찾을 수 없습니다: {frame_id} ({path})")
+    if len(frames) != 1:
+        raise ValueError(f"프레임이 {len(frames)}개입니다. frame_id를 지정하거나 iter_frames()를 사용하세요: {path}")
+    return frames[0]
@@ -0,0 +1,330 @@
+import os
+import numpy as np
+
+# ───────────────────────────────────────────────────────────────
+# Open3D 없이 PCD 파일을 읽는 순수 NumPy 로더
+#   - 헤더만 파싱한 뒤 데이터 영역을 바로 배열로 해석
+#       • DATA binary            → np.memmap (파일 전체를 메모리로 복사하지 않음)
+#       • DATA ascii             → np.fromstring 한 번으로 파싱
+#       • DATA binary_compressed → LZF 해제 후 필드별(column-major) 버퍼를 np.frombuffer
+#   - 반환은 float32 xyz (N, 3), intensity가 있으면 (N, 4)까지 지원
+#   - 해석할 수 없는 파일(잘린 파일 포함)만 Open3D로 fallback (이때만 open3d import, 없으면 PCDFormatError)
+
+try:
+    import lzf as _lzf  # python-lzf (선택 사항, 있으면 C 구현으로 빠르게 해제)
+except ImportError:
+    _lzf = None
+
+# PCD TYPE/SIZE → NumPy dtype 문자
+_PCD_TYPES = {
+    ("F", 4): "f4", ("F", 8): "f8",
+    ("I", 1): "i1", ("I", 2): "i2", ("I", 4): "i4", ("I", 8): "i8",
+    ("U", 1): "u1", ("U", 2): "u2", ("U", 4): "u4", ("U", 8): "u8",
+}
+
+# intensity로 인식할 필드 이름 후보
+INTENSITY_FIELDS = ("intensity", "i", "reflectivity")
+
+
+class PCDFormatError(ValueError):
+    """순수 NumPy 로더로 해석할 수 없는 PCD 파일"""
+
+
+def read_pcd_header(f):
+    """
+    열린 바이너리 파일 객체에서 PCD 헤더를 읽어 dict로 반환.
+    반환: {"fields": [...], "size": [...], "type": [...], "count": [...],
+           "points": int, "data": "ascii"|"binary"|"binary_compressed",
+           "data_offset": 헤더 끝(데이터 시작) 바이트 위치}
+    """
+    header = {}
+    while True:
+        line = f.readline()
+        if not line:
+            raise PCDFormatError("DATA 줄을 찾을 수 없습니다 (PCD 헤더가 아님)")
+        line = line.decode("ascii", errors="replace").strip()
+        if not line or line.startswith("#"):
+            continue
+        key, _, value = line.partition(" ")
+        key = key.upper()
+        header[key] = value.split()
+        if key == "DATA":
+            break
+
+    try:
+        fields = header["FIELDS"]
+        num_fields = len(fields)
+        parsed = {
+            "fields": fields,
+            "size": [int(v) for v in header["SIZE"]],
+            "type": [v.upper() for v in header["TYPE"]],
+            "count": [int(v) for v in header.get("COUNT", ["1"] * num_fields)],
+            "data": header["DATA"][0].lower(),
+            "data_offset": f.tell(),
+        }
+        if "POINTS" in header:
+            parsed["points"] = int(header["POINTS"][0])
+        else:
+            parsed["points"] = int(header["WIDTH"][0]) * int(header.get("HEIGHT", ["1"])[0])
+    except (KeyError, IndexError, ValueError) as e:
+        raise PCDFormatError(f"PCD 헤더 형식 오류: {e}") from e
+    return parsed
+
+
+def _record_dtype(header):
+    """헤더 필드 정보를 NumPy structured dtype으로 변환 (중복/패딩 필드 이름은 고유화)"""
+    names, formats = [], []
+    for idx, (name, size, typ, count) in enumerate(
+            zip(header["fields"], header["size"], header["type"], header["count"])):
+        if (typ, size) not in _PCD_TYPES:
+            raise PCDFormatError(f"지원하지 않는 필드 타입: {name} TYPE={typ} SIZE={size}")
+        if name in names or name == "_":
+            name = f"_pad{idx}"
+        names.append(name)
+        fmt = "<" + _PCD_TYPES[(typ, size)]
+        formats.append(fmt if count == 1 else (fmt, (count,)))
+    return np.dtype({"names": names, "formats": formats})
+
+
+def lzf_decompress(data, out_size):
+    """
+    LZF 압축 해제. python-lzf가 있으면 사용하고, 없으면 순수 파이썬 구현으로 처리.
+    • data: 압축된 bytes
+    • out_size: 해제 후 바이트 수 (PCD 헤더에 기록됨)
+    """
+    if _lzf is not None:
+        try:
+            out = _lzf.decompress(bytes(data), out_size)
+        except ValueError as e:
+            raise PCDFormatError(f"LZF 압축 해제 실패: {e}") from e
+        if out is None or len(out) != out_size:
+            raise PCDFormatError("LZF 압축 해제 실패")
+        return out
+
+    out = bytearray(out_size)
+    ip, op, n = 0, 0, len(data)
+    while ip < n:
+        ctrl = data[ip]
+        ip += 1
+        if ctrl < 32:
+            # literal run: ctrl+1 바이트를 그대로 복사
+            length = ctrl + 1
+            out[op:op + length] = data[ip:ip + length]
+            ip += length
+            op += length
+        else:
+            # back reference: 이미 해제된 구간을 다시 복사
+            length = ctrl >> 5
+            ref = op - ((ctrl & 0x1F) << 8) - 1
+            if length == 7:
+                length += data[ip]
+                ip += 1
+            ref -= data[ip]
+            ip += 1
+            length += 2
+            if ref < 0:
+                raise PCDFormatError("LZF 데이터가 손상되었습니다")
+            if ref + length <= op:
+                out[op:op + length] = out[ref:ref + length]
+            else:
+                # 겹치는 복사: 짧은 패턴의 반복
+                for k in range(length):
+                    out[op + k] = out[ref + k]
+            op += length
+    if op != out_size:
+        raise PCDFormatError("LZF 해제 크기가 헤더와 다릅니다")
+    return bytes(out)
+
+
+def _columns_binary(path, header, dtype):
+    """DATA binary: 파일을 memmap으로 열어 structured 배열 뷰 반환"""
+    expected = header["data_offset"] + header["points"] * dtype.itemsize
+    actual = os.path.getsize(path)
+    if actual < expected:
+        raise PCDFormatError(f"binary 데이터가 헤더보다 짧습니다 (잘린 파일?): "
+                             f"{actual} < {expected} bytes (POINTS {header['points']} × {dtype.itemsize})")
+    return np.memmap(path, dtype=dtype, mode="r",
+                     offset=header["data_offset"], shape=(header["points"],))
+
+
+def _columns_ascii(f, header, dtype):
+    """DATA ascii: 남은 텍스트를 한 번에 float로 파싱 → 필드 이름별 열 dict"""
+    text = f.read().decode("ascii", errors="replace")
+    values_per_point = sum(header["count"])
+    flat = np.fromstring(text, dtype=np.float64, sep=" ")
+    if values_per_point == 0 or flat.size % values_per_point != 0:
+        raise PCDFormatError("ascii 데이터 열 개수가 헤더와 맞지 않습니다")
+    table = flat.reshape(-1, values_per_point)
+
+    columns, col = {}, 0
+    for name, count in zip(dtype.names, header["count"]):
+        columns[name] = table[:, col] if count == 1 else table[:, col:col + count]
+        col += count
+    return columns
+
+
+def _columns_compressed(f, header, dtype):
+    """DATA binary_compressed: LZF 해제 후 필드별로 연속된 버퍼를 np.frombuffer로 해석"""
+    sizes = np.frombuffer(f.read(8), dtype="<u4")
+    if sizes.size != 2:
+        raise PCDFormatError("binary_compressed 크기 정보가 없습니다")
+    compressed_size, uncompressed_size = int(sizes[0]), int(sizes[1])
+    compressed = f.read(compressed_size)
+    if len(compressed) < compressed_size:
+        raise PCDFormatError(f"binary_compressed 데이터가 헤더보다 짧습니다 (잘린 파일?): "
+                             f"{len(compressed)} < {compressed_size} bytes")
+    raw = lzf_decompress(compressed, uncompressed_size)
+
+    # 압축 데이터는 필드 단위(column-major)로 저장됨: [x x x ... y y y ... z z z ...]
+    num_points = header["points"]
+    if len(raw) < num_points * dtype.itemsize:
+        raise PCDFormatError("binary_compressed 데이터가 헤더의 POINTS보다 짧습니다")
+    columns, offset = {}, 0
+    for name in dtype.names:
+        field_dtype = dtype.fields[name][0]
+        nbytes = field_dtype.itemsize * num_points
+        columns[name] = np.frombuffer(raw, dtype=field_dtype, count=num_points, offset=offset)
+        offset += nbytes
+    return columns
+
+
+def _read_with_open3d(path, with_intensity=False):
+    """
+    순수 NumPy 로더가 처리하지 못한 파일만 Open3D로 읽음 (반환 열 구성은 read_pcd와 같음).
+    legacy API(o3d.io)는 intensity를 버리므로 with_intensity일 때는 tensor API(o3d.t.io)로 읽음
+    """
+    import open3d as o3d
+    if not with_intensity:
+        pcd = o3d.io.read_point_cloud(path)
+        return np.asarray(pcd.points, dtype=np.float32)
+
+    pcd = o3d.t.io.read_point_cloud(path)
+    xyz = pcd.point["positions"].numpy().astype(np.float32)
+    for name in INTENSITY_FIELDS:
+        if name in pcd.point:
+            intensity = pcd.point[name].numpy().astype(np.float32).reshape(-1, 1)
+            return np.hstack([xyz, intensity])
+    return xyz
+
+
+def read_pcd(path, with_intensity=False):
+    """
+    PCD 파일을 float32 배열로 읽음.
+    • path: .pcd 파일 경로
+    • with_intensity: True이고 intensity 계열 필드가 있으면 (N, 4) [x, y, z, intensity] 반환
+
+    반환: (N, 3) float32 xyz (또는 (N, 4))
+    """
+    try:
+        with open(path, "rb") as f:
+            header = read_pcd_header(f)
+            dtype = _record_dtype(header)
+            if not {"x", "y", "z"} <= set(dtype.names):
+                raise PCDFormatError("x/y/z 필드가 없습니다")
+
+            if header["points"] == 0:
+                columns = {name: np.empty(0, dtype=np.float32) for name in dtype.names}
+            elif header["data"] == "binary":
+                columns = _columns_binary(path, header, dtype)
+            elif header["data"] == "ascii":
+                columns = _columns_ascii(f, header, dtype)
+            elif header["data"] == "binary_compressed":
+                columns = _columns_compressed(f, header, dtype)
+            else:
+                raise PCDFormatError(f"지원하지 않는 DATA 형식: {header['data']}")
+    except PCDFormatError as e:
+        try:
+            import open3d  # noqa: F401 (fallback 가능 여부만 확인)
+        except ImportError:
+            raise PCDFormatError(f"{path}: {e} (Open3D가 없어 fallback할 수 없습니다)") from e
+        print(f"[!] NumPy PCD 로더 실패 → Open3D 사용: {path} ({e})")
+        return _read_with_open3d(path, with_intensity)
+
+    names = ["x", "y", "z"]
+    if with_intensity:
+        names += [n for n in INTENSITY_FIELDS if n in dtype.names][:1]
+
+    # 필요한 열만 float32 (N, k) 배열 하나로 모음 (memmap에서는 이때 처음 디스크를 읽음)
+    out = np.empty((header["points"], len(names)), dtype=np.float32)
+    for col, name in enumerate(names):
+        out[:, col] = columns[name]
+    return out
+
+
+# ───────────────────────────────────────────────────────────────
+# KITTI .bin (float32 x, y, z, intensity) memmap 로더 + ROI 크롭
+#   - 파일을 memmap으로 열고 chunk 단위로 ROI 마스크를 계산
+#   - ROI 안의 점만 복사 → 최대 메모리 사용량이 sweep 크기가 아니라 ROI 크기에 비례
+
+def roi_mask(points, min_range=None, max_range=None, z_range=None,
+             fov_deg=None, fov_center_deg=0.0):
+    """
+    ROI 안에 있는 점의 bool 마스크.
+    • min_range, max_range: 센서 원점으로부터의 수평 거리 범위 [m]
+    • z_range: (z_min, z_max) 높이 범위 [m]
+    • fov_deg: 수평 시야각 전체 폭 [deg] (None이면 360도)
+    • fov_center_deg: 시야각 중심 방향 [deg] (0 = +X 방향)
+    """
+    x, y = points[:, 0], points[:, 1]
+    mask = np.ones(points.shape[0], dtype=bool)
+    if min_range is not None or max_range is not None:
+        r2 = x * x + y * y
+        if min_range is not None:
+            mask &= r2 >= min_range * min_range
+        if max_range is not None:
+            mask &= r2 <= max_range * max_range
+    if z_range is not None:
+        z = points[:, 2]
+        mask &= (z >= z_range[0]) & (z <= z_range[1])
+    if fov_deg is not None and fov_deg < 360:
+        azimuth = np.degrees(np.arctan2(y, x)) - fov_center_deg
+        azimuth = (azimuth + 180.0) % 360.0 - 180.0  # [-180, 180)
+        mask &= np.abs(azimuth) <= fov_deg / 2.0
+    return mask
+
+
+def read_kitti_bin(path, with_intensity=True, chunk_points=1 << 20, **roi):
+    """
+    KITTI 형식 .bin을 memmap으로 열고 ROI 크롭을 적용한 뒤 필요한 점만 복사.
+    • with_intensity: True면 (N, 4), False면 (N, 3) 반환
+    • chunk_points: 한 번에 마스크를 계산할 점 개수 (임시 메모리 상한)
+    • roi: roi_mask()에 넘길 크롭 조건 (min_range, max_range, z_range, fov_deg, ...)
+    """
+    num_cols = 4 if with_intensity else 3
+    if os.path.getsize(path) < 4 * 4:  # 점이 하나도 없는 파일은 memmap할 수 없음
+        return np.empty((0, num_cols), dtype=np.float32)
+    sweep = np.memmap(path, dtype=np.float32, mode="r")
+    sweep = sweep[: sweep.size - sweep.size % 4].reshape(-1, 4)
+
+    pieces = []
+    for start in range(0, sweep.shape[0], chunk_points):
+        block = sweep[start:start + chunk_points]   # memmap 뷰 (복사 없음)
+        if roi:
+            block = block[roi_mask(block, **roi)]   # ROI 안의 점만 복사
+        pieces.append(np.array(block[:, :num_cols], dtype=np.float32))
+    del sweep  # memmap 핸들 해제
+
+    if not pieces:
+        return np.empty((0, num_cols), dtype=np.float32)
+    return pieces[0] if len(pieces) == 1 else np.concatenate(pieces)
+
+
+def iter_kitti_sweeps(bin_paths, with_intensity=True, **roi):
+    """
+    .bin 경로 목록을 하나씩 ROI 크롭해서 yield → (bin_path, points)
+    한 번에 한 sweep의 ROI만 메모리에 올라가므로 데이터셋 전체를 스트리밍할 수 있음.
+    """
+    for bin_path in bin_paths:
+        yield bin_path, read_kitti_bin(bin_path, with_intensity=with_intensity, **roi)
+
+
+def load_points(path, with_intensity=False):
+    """
+    확장자에 따라 포인트클라우드를 float32 배열로 로드.
+    • .pcd → read_pcd()
+    • .bin → KITTI 형식 (float32 x, y, z, intensity), read_kitti_bin()
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".bin":
+        return read_kitti_bin(path, with_intensity=with_intensity)
+    return read_pcd(path, with_intensity=with_intensity)
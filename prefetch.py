@@ -0,0 +1,88 @@
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# ───────────────────────────────────────────────────────────────
+# 스레드 풀 기반 prefetch 큐 (입력 순서 유지)
+#   - 현재 프레임을 그리는 동안 다음 K개 항목의 I/O(이미지 디코딩, JSON 파싱)를 미리 수행
+#   - 큐 깊이(depth)와 메모리 상한(max_bytes)으로 미리 읽어 두는 양을 제한
+#   - 이미지 디코더(PIL/cv2)와 파일 읽기는 GIL을 놓으므로 스레드로 충분
+#
+# 사용 예)
+#   for path, img in prefetch(paths, plt.imread, depth=8):
+#       ...  # img는 paths 순서대로 전달됨
+
+
+def result_nbytes(obj):
+    """결과 객체가 차지하는 대략적인 메모리 (ndarray 크기 합, tuple/list/dict는 재귀)"""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (tuple, list)):
+        return sum(result_nbytes(o) for o in obj)
+    if isinstance(obj, dict):
+        return sum(result_nbytes(o) for o in obj.values())
+    return 0
+
+
+def prefetch(items, load_fn, depth=8, max_bytes=None, num_workers=4):
+    """
+    items를 load_fn으로 미리 읽어서 (item, result)를 입력 순서대로 yield.
+    • depth: 미리 읽어 둘 최대 항목 수 (0이면 스레드 없이 순차 처리)
+    • max_bytes: 미리 읽어 둔 결과의 메모리 상한 [bytes] (None이면 depth만 적용)
+        → 완료된 결과 크기 + 진행 중인 항목 수 × 평균 크기로 추정, 상한을 넘으면 새로 제출하지 않음
+        → 최소 1개는 항상 진행하므로 항목 하나가 상한보다 커도 멈추지 않음
+    • num_workers: I/O 스레드 수
+    • load_fn에서 난 예외는 해당 항목을 꺼낼 때 다시 발생
+    """
+    if depth <= 0:
+        for item in items:
+            yield item, load_fn(item)
+        return
+
+    it = iter(items)
+    pending = collections.deque()  # (item, future) — 제출 순서 = 출력 순서
+    num_done, done_bytes = 0, 0    # 지금까지 전달한 결과 수 / 크기 합 (평균 크기 추정용)
+    exhausted = False
+
+    def _over_budget():
+        if max_bytes is None or not pending:
+            return False
+        if num_done == 0:
+            return True  # 결과 크기를 아직 모르면 첫 항목이 끝날 때까지 하나만 진행
+        avg = done_bytes / num_done
+        total = 0
+        for _, f in pending:
+            if f.done() and f.exception() is None:
+                total += result_nbytes(f.result())
+            else:
+                total += avg
+        return total >= max_bytes
+
+    executor = ThreadPoolExecutor(max_workers=max(1, num_workers), thread_name_prefix="prefetch")
+    try:
+        while True:
+            # 1) 큐 깊이 / 메모리 상한 안에서 최대한 미리 제출
+            while not exhausted and len(pending) < depth:
+                if _over_budget():
+                    break
+                try:
+                    item = next(it)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.append((item, executor.submit(load_fn, item)))
+
+            if not pending:
+                return
+
+            # 2) 가장 먼저 제출한 항목을 기다렸다가 순서대로 전달
+            item, future = pending.popleft()
+            result = future.result()
+            num_done += 1
+            done_bytes += result_nbytes(result)
+            yield item, result
+    finally:
+        # 중간에 루프를 빠져나가면 아직 시작하지 않은 작업은 취소
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
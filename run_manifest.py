@@ -0,0 +1,118 @@
+import os
+import json
+import hashlib
+
+# ───────────────────────────────────────────────────────────────
+# 출력 manifest (중단된 배치 작업을 이어서 실행하기 위한 기록)
+#   - 출력 파일마다 입력 파일들의 시그니처와 렌더 설정을 저장
+#       시그니처: (크기, mtime_ns) 또는 use_hash=True면 내용 해시(blake2b)
+#   - 다시 실행하면 출력이 있고 입력/설정이 그대로인 항목은 건너뛰고,
+#     없거나 오래된(stale) 항목만 다시 렌더링
+#   - 중간에 죽어도 그때까지의 기록이 남도록 save_every개마다 저장 (임시 파일 → os.replace)
+#
+# 사용 예)
+#   manifest = RunManifest(os.path.join(OUTPUT_ROOT, "render_manifest.json"), settings={"dpi": 200})
+#   if manifest.is_up_to_date(out_png, [json_path, img_path]):
+#       continue
+#   ... 렌더링 ...
+#   manifest.record(out_png, [json_path, img_path])
+#   manifest.save()
+
+MANIFEST_VERSION = 1
+
+
+def _content_hash(path, chunk_size=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class RunManifest:
+    """
+    출력 파일 → (입력 시그니처, 렌더 설정) 기록.
+    • path: manifest JSON 경로 (출력 경로는 이 파일이 있는 폴더 기준 상대 경로로 저장)
+    • settings: 렌더 결과에 영향을 주는 설정 dict (JSON으로 직렬화 가능해야 함) — 바뀌면 전체가 stale
+    • use_hash: True면 mtime 대신 입력 파일 내용 해시로 비교 (느리지만 파일 복사/touch에도 안전)
+    • save_every: record()가 이 횟수만큼 쌓이면 자동 저장
+    """
+
+    def __init__(self, path, settings=None, use_hash=False, save_every=50):
+        self.path = path
+        self.root = os.path.dirname(os.path.abspath(path))
+        self.settings = json.loads(json.dumps(settings or {}, sort_keys=True))
+        self.use_hash = use_hash
+        self.save_every = save_every
+        self.num_skipped = 0
+        self.num_recorded = 0
+        self._unsaved = 0
+        self.outputs = self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[!] manifest를 읽을 수 없어 새로 만듭니다: {self.path} ({e})")
+            return {}
+        if data.get("version") != MANIFEST_VERSION:
+            return {}
+        return data.get("outputs", {})
+
+    def _key(self, out_path):
+        return os.path.relpath(os.path.abspath(out_path), self.root)
+
+    def signature(self, input_path):
+        """입력 파일 하나의 시그니처 ([크기, mtime_ns] 또는 [크기, 해시])"""
+        st = os.stat(input_path)
+        if self.use_hash:
+            return [st.st_size, _content_hash(input_path)]
+        return [st.st_size, st.st_mtime_ns]
+
+    def _input_signatures(self, input_paths):
+        return {os.path.abspath(p): self.signature(p) for p in input_paths}
+
+    def is_up_to_date(self, out_path, input_paths):
+        """
+        출력 파일이 존재하고, 기록된 입력 시그니처/설정이 현재와 같으면 True (건너뛴 개수 집계).
+        입력 파일이 없어졌으면 False.
+        """
+        entry = self.outputs.get(self._key(out_path))
+        if entry is None or entry.get("settings") != self.settings or not os.path.isfile(out_path):
+            return False
+        try:
+            current = self._input_signatures(input_paths)
+        except OSError:
+            return False
+        if entry.get("inputs") != current:
+            return False
+        self.num_skipped += 1
+        return True
+
+    def record(self, out_path, input_paths):
+        """렌더링이 끝난 출력을 기록 (save_every개마다 자동 저장)"""
+        self.outputs[self._key(out_path)] = {
+            "inputs": self._input_signatures(input_paths),
+            "settings": self.settings,
+        }
+        self.num_recorded += 1
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self.save()
+
+    def save(self):
+        """임시 파일에 쓴 뒤 교체 → 중간에 중단돼도 manifest가 깨지지 않음"""
+        if self._unsaved == 0 and os.path.isfile(self.path):
+            return
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "outputs": self.outputs}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+
+    def summary(self):
+        return f"[*] manifest: {self.num_skipped}개 최신이라 건너뜀, {self.num_recorded}개 새로 렌더링"
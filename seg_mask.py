@@ -0,0 +1,149 @@
+import os
+import json
+import cv2
+import numpy as np
+
+# ───────────────────────────────────────────────────────────────
+# 세그멘테이션 폴리곤 → 클래스 인덱스 마스크 래스터라이저
+#   - 프레임의 shape들을 (H, W) uint8 인덱스 마스크 하나에 그림
+#       0 = 라벨 없음(배경), 1..K = label_colors 순서, UNKNOWN_INDEX = 정의되지 않은 라벨
+#   - shape는 파일 순서(labelme z-order)대로 그림 — 나중 shape가 위에 덮임
+#   - 같은 라벨이 연속된 shape들은 cv2.fillPoly 한 번에 모아서 채움
+#       ※ fillPoly는 한 호출 안에서 겹친 영역을 even-odd 규칙으로 비워 버리므로,
+#         bounding box가 겹치는 폴리곤끼리는 다른 호출로 나눔
+#   - 색상은 256색 룩업 테이블로 변환 (cv2.applyColorMap), 블렌딩은 라벨이 있는 픽셀에만 in-place 적용
+#   - 인덱스 마스크는 무손실 PNG로 저장해 두면 다음 오버레이/통계에서 폴리곤 래스터화를 건너뜀
+#
+# 사용 예)
+#   table = LabelTable(label_colors)
+#   mask = rasterize_shapes(json_data["shapes"], table, img_h, img_w)
+#   blend_mask(img, mask, table.lut, alpha=0.5)
+
+UNKNOWN_INDEX = 255
+UNKNOWN_COLOR = (255, 255, 255)  # 기존 스크립트와 같이 정의되지 않은 라벨은 흰색
+
+
+class LabelTable:
+    """
+    라벨 이름 ↔ 마스크 인덱스 ↔ 색상.
+    • label_colors: {라벨: (b, g, r)} — dict 순서대로 인덱스 1, 2, ... 부여
+    • lut: (256, 1, 3) uint8 BGR 룩업 테이블 (cv2.applyColorMap 사용자 컬러맵 형식, 0번은 검정)
+    """
+
+    def __init__(self, label_colors):
+        if len(label_colors) >= UNKNOWN_INDEX:
+            raise ValueError(f"라벨은 최대 {UNKNOWN_INDEX - 1}개까지 지원합니다: {len(label_colors)}개")
+        self.names = ["__background__"] + list(label_colors)
+        self.index = {name: i for i, name in enumerate(self.names) if i > 0}
+        self.lut = np.zeros((256, 1, 3), dtype=np.uint8)
+        for name, i in self.index.items():
+            self.lut[i, 0] = label_colors[name]
+        self.lut[UNKNOWN_INDEX, 0] = UNKNOWN_COLOR
+
+    def index_of(self, label):
+        return self.index.get(label, UNKNOWN_INDEX)
+
+    def to_json(self):
+        """인덱스 → 라벨 이름 (마스크와 함께 저장해서 나중에 해석할 때 사용)"""
+        names = {str(i): name for i, name in enumerate(self.names) if i > 0}
+        names[str(UNKNOWN_INDEX)] = "__unknown__"
+        return {"labels": names, "colors_bgr": {str(i): self.lut[i, 0].tolist() for i in map(int, names)}}
+
+
+def _bbox_batches(polygons):
+    """
+    bounding box가 서로 겹치지 않는 폴리곤끼리 묶음 (한 묶음 = fillPoly 한 번).
+    반환: [[poly, ...], ...] (입력 순서 유지)
+    """
+    batches = []  # [(묶음의 bbox 리스트, 폴리곤 리스트), ...]
+    for poly in polygons:
+        box = (*poly[:, 0].min(axis=0), *poly[:, 0].max(axis=0))
+        for boxes, polys in batches:
+            if all(box[0] > b[2] or box[2] < b[0] or box[1] > b[3] or box[3] < b[1] for b in boxes):
+                boxes.append(box)
+                polys.append(poly)
+                break
+        else:
+            batches.append(([box], [poly]))
+    return [polys for _, polys in batches]
+
+
+def rasterize_shapes(shapes, table, height, width, out=None):
+    """
+    labelme 형식 shapes → (H, W) uint8 클래스 인덱스 마스크.
+    • shapes: [{"label": ..., "points": [[x, y], ...]}, ...]
+    • out: 재사용할 (H, W) uint8 버퍼 (주어지면 0으로 초기화 후 사용)
+    """
+    if out is None:
+        mask = np.zeros((height, width), dtype=np.uint8)
+    else:
+        mask = out
+        mask.fill(0)
+
+    # 파일 순서(labelme z-order)대로, 같은 라벨이 연속된 구간만 하나로 묶음
+    runs = []  # [(인덱스, [폴리곤, ...]), ...]
+    for shape in shapes:
+        points = shape.get("points") or []
+        if len(points) == 0:
+            continue
+        # 기존 스크립트와 같이 소수 좌표는 int32 변환(버림)
+        pts = np.array(points, dtype=np.int32).reshape(-1, 1, 2)
+        idx = table.index_of(shape["label"])
+        if runs and runs[-1][0] == idx:
+            runs[-1][1].append(pts)
+        else:
+            runs.append((idx, [pts]))
+
+    for idx, polygons in runs:
+        for batch in _bbox_batches(polygons):
+            cv2.fillPoly(mask, batch, int(idx))
+    return mask
+
+
+def colorize_mask(mask, lut):
+    """인덱스 마스크 → (H, W, 3) BGR 색상 이미지 (1채널 → 3채널 테이블 조회를 한 번에)"""
+    return cv2.applyColorMap(mask, lut)
+
+
+def blend_mask(img, mask, lut, alpha=0.5):
+    """
+    img(BGR uint8)에 마스크 색상을 in-place로 합성: img = img*(1-alpha) + color*alpha
+    라벨이 없는 픽셀(0)은 그대로 둠 (기존 overlay.copy() + addWeighted와 같은 결과)
+    """
+    color = colorize_mask(mask, lut)
+    blended = cv2.addWeighted(img, 1.0 - alpha, color, alpha, 0)
+    # 불리언 인덱싱(np.copyto where=)보다 cv2.copyTo가 수십 배 빠름
+    cv2.copyTo(blended, cv2.compare(mask, 0, cv2.CMP_NE), img)
+    return img
+
+
+def save_index_mask(path, mask):
+    """인덱스 마스크를 1채널 무손실 PNG로 저장"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if not cv2.imwrite(path, mask):
+        raise IOError(f"마스크를 저장할 수 없습니다: {path}")
+    return path
+
+
+def load_index_mask(path):
+    """저장해 둔 인덱스 마스크 읽기 (없거나 읽을 수 없으면 None)"""
+    return cv2.imread(path, cv2.IMREAD_UNCHANGED)
+
+
+def write_label_table(mask_root, table):
+    """mask_root/labels.json에 인덱스 → 라벨 표를 저장 (마스크를 해석할 때 필요)"""
+    os.makedirs(mask_root, exist_ok=True)
+    path = os.path.join(mask_root, "labels.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(table.to_json(), f, ensure_ascii=False, indent=2)
+    return path
+
+
+def label_table_matches(mask_root, table):
+    """저장된 labels.json이 현재 라벨 표와 같으면 True (다르면 기존 마스크를 재사용하면 안 됨)"""
+    path = os.path.join(mask_root, "labels.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f) == table.to_json()
+    except (OSError, ValueError):
+        return False
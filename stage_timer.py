@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import contextlib
+import numpy as np
+
+# ───────────────────────────────────────────────────────────────
+# 배치 루프용 단계별 타이머 + JSON-lines trace
+#   - 프레임마다 단계(parse, points, draw, savefig ...)별 소요 시간과 점/객체 수, 출력 파일 크기를 기록
+#   - trace 파일: 프레임 하나 = JSON 한 줄
+#       {"frame": "000123", "stages": {"parse": 0.004, ...}, "total": 0.41,
+#        "points": 120000, "objects": 35, "output_bytes": 812345, "background": ["decode"]}
+#   - background 단계: prefetch 스레드에서 실행되어 메인 루프의 wait와 시간이 겹치는 단계
+#       → total(메인 루프 기준 프레임 시간)에 더하지 않음 (같은 시간을 두 번 세지 않도록)
+#   - 실행이 끝나면 단계별 p50/p95와 가장 느린 프레임을 출력
+#   - 꺼져 있으면(trace_path=None) 모든 호출이 공유된 no-op 객체로 끝나므로 오버헤드가 거의 없음
+#
+# 사용 예)
+#   tracer = StageTracer(TRACE_PATH)        # None이면 비활성
+#   timer = tracer.frame(frame_id)
+#   with timer.stage("parse"):
+#       ...
+#   timer.count(points=len(pts), objects=len(boxes))
+#   timer.add_output(out_path)
+#   tracer.record(timer)
+#   tracer.close()                          # 요약 출력
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+class FrameTimer:
+    """프레임 하나의 단계별 시간 기록 (워커 프로세스에서 만들고 to_dict()로 돌려줘도 됨)"""
+
+    enabled = True
+
+    def __init__(self, frame_id):
+        self.frame_id = str(frame_id)
+        self.stages = {}
+        self.background = set()
+        self.points = 0
+        self.objects = 0
+        self.output_bytes = 0
+
+    @contextlib.contextmanager
+    def stage(self, name, background=False):
+        """
+        with 블록의 경과 시간을 name 단계에 더함 (같은 단계를 여러 번 호출하면 합산)
+        • background: prefetch 스레드 등 메인 루프와 겹쳐 실행되는 단계면 True (total에서 제외)
+        """
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - t0, background)
+
+    def add_time(self, name, seconds, background=False):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        if background:
+            self.background.add(name)
+
+    def count(self, points=None, objects=None):
+        if points is not None:
+            self.points += int(points)
+        if objects is not None:
+            self.objects += int(objects)
+
+    def add_output(self, path):
+        """저장한 출력 파일 크기를 output_bytes에 더함"""
+        if path is not None and os.path.isfile(path):
+            self.output_bytes += os.path.getsize(path)
+
+    def to_dict(self):
+        stages = {name: round(sec, 6) for name, sec in self.stages.items()}
+        total = sum(sec for name, sec in self.stages.items() if name not in self.background)
+        rec = {"frame": self.frame_id, "stages": stages, "total": round(total, 6),
+               "points": self.points, "objects": self.objects, "output_bytes": self.output_bytes}
+        if self.background:
+            rec["background"] = sorted(self.background)
+        return rec
+
+
+class _NullFrameTimer:
+    """비활성 상태의 FrameTimer — 아무것도 기록하지 않음"""
+
+    enabled = False
+
+    def stage(self, name, background=False):
+        return _NULL_CONTEXT
+
+    def add_time(self, name, seconds, background=False):
+        pass
+
+    def count(self, points=None, objects=None):
+        pass
+
+    def add_output(self, path):
+        pass
+
+    def to_dict(self):
+        return None
+
+
+NULL_TIMER = _NullFrameTimer()
+
+
+class StageTracer:
+    """
+    프레임 기록을 모아서 JSON-lines로 쓰고, 종료 시 요약을 출력.
+    • trace_path: trace 파일 경로 (None이면 비활성 — frame()이 NULL_TIMER를 반환)
+    • slowest: 요약에 표시할 가장 느린 프레임 수
+    """
+
+    def __init__(self, trace_path=None, slowest=5):
+        self.enabled = trace_path is not None
+        self.trace_path = trace_path
+        self.slowest = slowest
+        self.records = []
+        self._file = None
+        if self.enabled:
+            out_dir = os.path.dirname(os.path.abspath(trace_path))
+            os.makedirs(out_dir, exist_ok=True)
+            self._file = open(trace_path, "w", encoding="utf-8")
+
+    def frame(self, frame_id):
+        return FrameTimer(frame_id) if self.enabled else NULL_TIMER
+
+    def record(self, timer):
+        """FrameTimer 또는 FrameTimer.to_dict() 결과를 trace에 한 줄로 기록"""
+        if not self.enabled or timer is None:
+            return
+        rec = timer if isinstance(timer, dict) else timer.to_dict()
+        if rec is None:
+            return
+        self.records.append(rec)
+        self._file.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def summary(self):
+        return summarize_records(self.records, self.slowest)
+
+    def close(self, print_summary=True):
+        if not self.enabled:
+            return
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            if print_summary and self.records:
+                print(self.summary())
+                print(f"[*] 단계별 trace 저장: {self.trace_path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def summarize_records(records, slowest=5):
+    """프레임 기록 리스트 → 단계별 p50/p95/합계 + 가장 느린 프레임 표 (문자열)"""
+    if not records:
+        return "[*] 기록된 프레임이 없습니다."
+    stage_names = []
+    background = set()
+    for rec in records:
+        background.update(rec.get("background", ()))
+        for name in rec["stages"]:
+            if name not in stage_names:
+                stage_names.append(name)
+
+    lines = [f"[*] 단계별 시간 ({len(records)}개 프레임)",
+             f"    {'stage':<14s}{'p50 ms':>10s}{'p95 ms':>10s}{'max ms':>10s}{'total s':>10s}{'share':>8s}"]
+    grand_total = sum(rec["total"] for rec in records) or 1.0
+    for name in stage_names + ["total"]:
+        if name == "total":
+            values = np.array([rec["total"] for rec in records])
+        else:
+            values = np.array([rec["stages"][name] for rec in records if name in rec["stages"]])
+        p50, p95 = np.percentile(values, [50, 95])
+        # background 단계는 total에 포함되지 않으므로 비율 대신 "-"
+        label, share = (name + " *", f"{'-':>8s}") if name in background else \
+            (name, f"{values.sum() / grand_total * 100:7.0f}%")
+        lines.append(f"    {label:<14s}{p50 * 1e3:10.1f}{p95 * 1e3:10.1f}{values.max() * 1e3:10.1f}"
+                     f"{values.sum():10.2f}{share}")
+
+    if background:
+        lines.append("    * prefetch 스레드 단계 (wait와 겹치므로 total에 포함하지 않음)")
+    lines.append(f"[*] 가장 느린 프레임 {min(slowest, len(records))}개")
+    for rec in sorted(records, key=lambda r: r["total"], reverse=True)[:slowest]:
+        fg = {name: sec for name, sec in rec["stages"].items() if name not in rec.get("background", ())}
+        worst = max(fg.items(), key=lambda kv: kv[1]) if fg else ("-", 0.0)
+        lines.append(f"    {rec['frame']}: {rec['total'] * 1e3:.1f} ms (가장 긴 단계 {worst[0]} "
+                     f"{worst[1] * 1e3:.1f} ms, 점 {rec['points']}, 객체 {rec['objects']}, "
+                     f"출력 {rec['output_bytes'] / 1024:.0f} KB)")
+    return "\n".join(lines)
+
+
+def summarize_trace(trace_path, slowest=5):
+    """저장된 trace 파일(JSON-lines)을 다시 읽어 요약 문자열 반환"""
+    with open(trace_path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return summarize_records(records, slowest)
@@ -0,0 +1,327 @@
+import os
+import json
+import numpy as np
+
+# ───────────────────────────────────────────────────────────────
+# 합성(synthetic) 데이터 생성기 — 실제 데이터셋 없이 각 스크립트의 입력 형식을 재현
+#   - 포인트클라우드: KITTI .bin, PCD (ascii / binary / binary_compressed)
+#   - 3D 박스 JSON: 102 (3dbbox.*), 173 (dimension/location/orientation + 2D bbox),
+#                   trajectory (annotation_metadata.object_list, 프레임 간 같은 track_id가 이동)
+#   - 134 폴리곤 JSON (data_set_info.data), 102 카메라 labelme JSON (shapes)
+#   - taillight 테이블 세트 (frame_data / frame_annotation / instance ...)
+#   - make_dataset(): 위 파일들을 dataset_formats가 인식하는 폴더 구조로 생성
+#   - seed가 같으면 항상 같은 데이터 (벤치마크 결과를 실행 간 비교할 수 있도록)
+#
+# 사용 예)
+#   paths = make_dataset("/tmp/synth", "trajectory", num_frames=20, num_objects=50, num_points=200_000)
+
+CLASSES = ("car", "truck", "bus", "pedestrian", "bicycle")
+
+
+# ───────────────────────────────────────────────────────────────
+# 1) 포인트클라우드
+
+def random_points(num_points, seed=0, extent=80.0):
+    """
+    (N, 4) float32 [x, y, z, intensity] — 지면 + 물체처럼 높이가 섞인 분포.
+    • extent: x, y 범위 [-extent, extent] [m]
+    """
+    rng = np.random.default_rng(seed)
+    pts = np.empty((num_points, 4), dtype=np.float32)
+    r = extent * np.sqrt(rng.random(num_points))  # 가까울수록 밀도 높게 (LiDAR와 비슷)
+    theta = rng.uniform(-np.pi, np.pi, num_points)
+    pts[:, 0] = r * np.cos(theta)
+    pts[:, 1] = r * np.sin(theta)
+    pts[:, 2] = np.where(rng.random(num_points) < 0.7, rng.normal(-1.7, 0.05, num_points),
+                         rng.uniform(-1.7, 3.0, num_points))
+    pts[:, 3] = rng.random(num_points)
+    return pts
+
+
+def write_kitti_bin(path, num_points, seed=0):
+    """KITTI .bin (float32 x, y, z, intensity)"""
+    _makedirs_for(path)
+    random_points(num_points, seed).tofile(path)
+    return path
+
+
+def _lzf_literals(raw):
+    """LZF 스트림 (literal run만 사용, 압축은 하지 않음) — pcd_io의 해제 경로를 그대로 태우기 위함"""
+    data = np.frombuffer(raw, dtype=np.uint8)
+    n_full, rest = divmod(data.size, 32)
+    blocks = np.empty((n_full, 33), dtype=np.uint8)
+    blocks[:, 0] = 31  # ctrl = 길이 - 1
+    blocks[:, 1:] = data[:n_full * 32].reshape(-1, 32)
+    out = blocks.tobytes()
+    if rest:
+        out += bytes([rest - 1]) + data[n_full * 32:].tobytes()
+    return out
+
+
+def write_pcd(path, num_points, data="binary", with_intensity=True, seed=0):
+    """
+    PCD 파일 생성.
+    • data: "ascii" | "binary" | "binary_compressed"
+    • with_intensity: True면 FIELDS x y z intensity (아니면 x y z)
+    """
+    pts = random_points(num_points, seed)
+    if not with_intensity:
+        pts = np.ascontiguousarray(pts[:, :3])
+    fields = ["x", "y", "z", "intensity"][:pts.shape[1]]
+    header = "\n".join([
+        "# .PCD v0.7 - Point Cloud Data file format",
+        "VERSION 0.7",
+        "FIELDS " + " ".join(fields),
+        "SIZE " + " ".join(["4"] * len(fields)),
+        "TYPE " + " ".join(["F"] * len(fields)),
+        "COUNT " + " ".join(["1"] * len(fields)),
+        f"WIDTH {num_points}",
+        "HEIGHT 1",
+        "VIEWPOINT 0 0 0 1 0 0 0",
+        f"POINTS {num_points}",
+        f"DATA {data}",
+    ]) + "\n"
+
+    _makedirs_for(path)
+    with open(path, "wb") as f:
+        f.write(header.encode("ascii"))
+        if data == "ascii":
+            np.savetxt(f, pts, fmt="%.4f")
+        elif data == "binary":
+            f.write(pts.astype("<f4").tobytes())
+        elif data == "binary_compressed":
+            raw = np.asfortranarray(pts.astype("<f4")).tobytes(order="F")  # 필드 단위(column-major)
+            compressed = _lzf_literals(raw)
+            f.write(np.array([len(compressed), len(raw)], dtype="<u4").tobytes())
+            f.write(compressed)
+        else:
+            raise ValueError(f"지원하지 않는 DATA 형식: {data}")
+    return path
+
+
+# ───────────────────────────────────────────────────────────────
+# 2) 3D 박스 / 폴리곤 라벨
+
+def random_boxes(num_objects, seed=0, extent=60.0):
+    """박스 중심 (N,3), 크기 [l, w, h] (N,3), yaw (N,), 클래스 리스트"""
+    rng = np.random.default_rng(seed)
+    centers = np.column_stack([rng.uniform(-extent, extent, (num_objects, 2)),
+                               rng.uniform(-1.0, 0.0, num_objects)])
+    sizes = np.column_stack([rng.uniform(3.5, 12.0, num_objects),
+                             rng.uniform(1.6, 2.6, num_objects),
+                             rng.uniform(1.4, 3.5, num_objects)])
+    yaws = rng.uniform(-np.pi, np.pi, num_objects)
+    classes = [CLASSES[i] for i in rng.integers(0, len(CLASSES), num_objects)]
+    return centers, sizes, yaws, classes
+
+
+def write_102_lidar_json(path, num_objects, seed=0):
+    """102 LiDAR 라벨: annotations[*]["3dbbox.*"] (dimension = [l, h, w])"""
+    centers, sizes, yaws, classes = random_boxes(num_objects, seed)
+    annotations = [{
+        "3dbbox.location": c.tolist(),
+        "3dbbox.dimension": [s[0], s[2], s[1]],
+        "3dbbox.rotation_y": float(y),
+        "3dbbox.category": cls,
+    } for c, s, y, cls in zip(centers, sizes, yaws, classes)]
+    return _write_json(path, {"annotations": annotations})
+
+
+def write_173_json(path, num_objects, seed=0, image_size=(1920, 1080)):
+    """173 라벨: annotations[*] 2D bbox + (절반 정도) 3D dimension/location/orientation"""
+    centers, sizes, yaws, classes = random_boxes(num_objects, seed)
+    boxes2d = _random_boxes2d(num_objects, image_size, seed)
+    annotations = []
+    for i in range(num_objects):
+        obj = {"class": classes[i], "bbox": boxes2d[i].tolist()}
+        if i % 2 == 0:
+            obj.update(location=centers[i].tolist(), dimension=sizes[i].tolist(),
+                       orientation=[0.0, 0.0, float(yaws[i])])
+        annotations.append(obj)
+    return _write_json(path, {"annotations": annotations})
+
+
+def _box_vertices(centers, sizes, yaws):
+    from box_geometry import boxes_to_corners
+    return boxes_to_corners(centers, sizes, yaws, convention="173")
+
+
+def write_trajectory_json(path, num_objects, frame_index=0, seed=0):
+    """
+    trajectory 라벨: annotation_metadata.object_list[*] (bbox_center, bbox_vertices, class_name, track_id)
+    같은 seed면 frame_index가 바뀌어도 track_id/크기는 같고 위치만 yaw 방향으로 이동
+    """
+    centers, sizes, yaws, classes = random_boxes(num_objects, seed)
+    step = 0.5 * frame_index
+    centers = centers + step * np.column_stack([np.cos(yaws), np.sin(yaws), np.zeros(num_objects)])
+    vertices = _box_vertices(centers, sizes, yaws)
+    objects = [{
+        "class_name": cls,
+        "track_id": i + 1,
+        "bbox_center": centers[i].tolist(),
+        "bbox_vertices": vertices[i].round(4).tolist(),
+    } for i, cls in enumerate(classes)]
+    return _write_json(path, {"annotation_metadata": {"object_list": objects}})
+
+
+def _random_boxes2d(num_objects, image_size, seed):
+    rng = np.random.default_rng(seed + 1)
+    w, h = image_size
+    x0 = rng.uniform(0, w * 0.9, num_objects)
+    y0 = rng.uniform(0, h * 0.9, num_objects)
+    bw = rng.uniform(20, w * 0.1, num_objects)
+    bh = rng.uniform(20, h * 0.1, num_objects)
+    return np.column_stack([x0, y0, np.minimum(x0 + bw, w - 1), np.minimum(y0 + bh, h - 1)]).round(1)
+
+
+def random_polygons(num_polygons, image_size=(1920, 1080), num_vertices=12, seed=0):
+    """이미지 안의 볼록에 가까운 폴리곤 리스트 [(V, 2), ...]"""
+    rng = np.random.default_rng(seed + 2)
+    w, h = image_size
+    polys = []
+    for _ in range(num_polygons):
+        cx, cy = rng.uniform(0, w), rng.uniform(0, h)
+        r = rng.uniform(0.02, 0.12) * min(w, h)
+        a = np.sort(rng.uniform(-np.pi, np.pi, num_vertices))
+        rr = r * rng.uniform(0.7, 1.0, num_vertices)
+        polys.append(np.column_stack([np.clip(cx + rr * np.cos(a), 0, w - 1),
+                                      np.clip(cy + rr * np.sin(a), 0, h - 1)]).round(1))
+    return polys
+
+
+def write_lane_violation_json(path, num_polygons, image_size=(1920, 1080), seed=0):
+    """134 차로 위반 라벨: data_set_info.data[*].value (points, metainfo, extra, object_Label)"""
+    data = []
+    for i, poly in enumerate(random_polygons(num_polygons, image_size, seed=seed)):
+        data.append({"value": {
+            "points": [{"x": float(x), "y": float(y)} for x, y in poly],
+            "metainfo": {"violation_type": ["solid", "dashed", "stop"][i % 3], "video_id": f"V{seed:04d}",
+                         "camera_channel": "A", "time_info": "12:00:00", "camera_number": "1"},
+            "annotation": "polygon",
+            "extra": {"label": "lane", "value": str(i), "color": ["#ff0000", "#00ff00", "#0000ff"][i % 3]},
+            "object_Label": {"vehicle": CLASSES[i % len(CLASSES)], "lane": str(i % 4)},
+        }})
+    return _write_json(path, {"dataID": seed, "data_set_info": {"data": data}})
+
+
+def write_labelme_json(path, num_polygons, labels, image_size=(1920, 1080), seed=0):
+    """102 카메라 세그멘테이션 라벨 (labelme): shapes[*]["label", "points"]"""
+    w, h = image_size
+    shapes = [{"label": labels[0], "points": [[0, 0], [w - 1, 0], [w - 1, h * 0.4], [0, h * 0.4]]}]
+    for i, poly in enumerate(random_polygons(num_polygons, image_size, seed=seed)):
+        shapes.append({"label": labels[i % len(labels)], "points": poly.tolist()})
+    return _write_json(path, {"imagePath": None, "imageHeight": h, "imageWidth": w, "shapes": shapes})
+
+
+def write_taillight_tables(meta_dir, num_frames, objects_per_frame, image_size=(1920, 1080), seed=0):
+    """
+    taillight meta 폴더: dataset / frame / frame_data / frame_annotation / instance.json
+    반환: frame_data 레코드 리스트 (이미지 파일 이름은 file_name.file_format)
+    """
+    rng = np.random.default_rng(seed)
+    instances = [{"uuid": f"inst-{i:06d}", "category_name": f"dynamic_object.vehicle.{CLASSES[i % 3]}"}
+                 for i in range(objects_per_frame)]
+    frames, frame_data, annotations = [], [], []
+    for f in range(num_frames):
+        fd = {"uuid": f"fd-{f:06d}", "frame_uuid": f"frame-{f:06d}",
+              "file_name": str(1681716180000000000 + f * 100_000_000), "file_format": "png"}
+        frames.append({"uuid": fd["frame_uuid"], "index": f})
+        frame_data.append(fd)
+        boxes = _random_boxes2d(objects_per_frame, image_size, seed + f)
+        for inst, box in zip(instances, boxes):
+            annotations.append({
+                "uuid": f"ann-{len(annotations):08d}", "frame_data_uuid": fd["uuid"],
+                "instance_uuid": inst["uuid"], "geometry": {"bbox_image2d": box.tolist()},
+                "attribute": {"brake": ["on", "off"][int(rng.integers(2))],
+                              "turn_signal": ["left", "right", "none"][int(rng.integers(3))]},
+            })
+    tables = {"dataset.json": [{"uuid": "dataset-0", "name": "synthetic"}], "frame.json": frames,
+              "frame_data.json": frame_data, "frame_annotation.json": annotations,
+              "instance.json": instances}
+    for name, table in tables.items():
+        _write_json(os.path.join(meta_dir, name), table)
+    return frame_data
+
+
+def write_image(path, image_size=(1920, 1080), seed=0):
+    """노이즈 + 그라디언트 BGR 이미지 (JPEG/PNG 인코딩 비용이 실제 사진과 비슷하도록)"""
+    import cv2
+    w, h = image_size
+    rng = np.random.default_rng(seed)
+    grad = np.linspace(0, 200, w, dtype=np.float32)[None, :, None]
+    img = (grad + rng.normal(0, 20, (h, w, 3))).clip(0, 255).astype(np.uint8)
+    _makedirs_for(path)
+    if not cv2.imwrite(path, img):
+        raise IOError(f"이미지를 저장할 수 없습니다: {path}")
+    return path
+
+
+# ───────────────────────────────────────────────────────────────
+# 3) 데이터셋 폴더 구조 한 번에 만들기 (dataset_formats가 원천 파일을 찾는 규칙과 동일)
+
+def make_dataset(root, kind, num_frames=10, num_objects=20, num_points=100_000,
+                 image_size=(1920, 1080), with_images=False, seed=0):
+    """
+    kind별 폴더 구조를 root 아래에 생성하고 라벨 경로 리스트를 반환 (taillight은 meta 폴더 하나).
+    • "102_lidar":  Validation/02.라벨링데이터/Clip_000/Lidar/Lidar_Roof/*.json + 01.원천데이터/.../*.bin
+    • "102_camera": Validation/02.라벨링데이터/Clip_000/Camera/Camera_Front/*.json (+ .jpg)
+    • "173":        labeling/*.json + lidar/*.pcd (+ image/*.png)
+    • "trajectory": json/*.json + lidar/stitched/*.pcd
+    • "lane_violation": 라벨링데이터/A/s/*.json (+ 원천데이터/A/s/*.jpg)
+    • "taillight":  meta/*.json (+ sensor/camera(00)/*.png)
+    """
+    paths = []
+    if kind == "taillight":
+        meta_dir = os.path.join(root, "meta")
+        frame_data = write_taillight_tables(meta_dir, num_frames, num_objects, image_size, seed)
+        if with_images:
+            for i, fd in enumerate(frame_data):
+                write_image(os.path.join(root, "sensor", "camera(00)",
+                                         f"{fd['file_name']}.{fd['file_format']}"), image_size, seed + i)
+        return [meta_dir]
+
+    for i in range(num_frames):
+        name = f"{kind}_{i:05d}"
+        s = seed + i
+        if kind == "102_lidar":
+            rel = os.path.join("Clip_000", "Lidar", "Lidar_Roof")
+            paths.append(write_102_lidar_json(
+                os.path.join(root, "Validation", "02.라벨링데이터", rel, name + ".json"), num_objects, s))
+            write_kitti_bin(os.path.join(root, "Validation", "01.원천데이터", rel, name + ".bin"), num_points, s)
+        elif kind == "102_camera":
+            rel = os.path.join("Clip_000", "Camera", "Camera_Front")
+            paths.append(write_labelme_json(
+                os.path.join(root, "Validation", "02.라벨링데이터", rel, name + ".json"), num_objects,
+                ["sky", "road", "car", "truck", "pole", "vegetation"], image_size, s))
+            if with_images:
+                write_image(os.path.join(root, "Validation", "01.원천데이터", rel, name + ".jpg"), image_size, s)
+        elif kind == "173":
+            paths.append(write_173_json(os.path.join(root, "labeling", name + ".json"), num_objects, s, image_size))
+            write_pcd(os.path.join(root, "lidar", name + ".pcd"), num_points, "binary", seed=s)
+            if with_images:
+                write_image(os.path.join(root, "image", name + ".png"), image_size, s)
+        elif kind == "trajectory":
+            paths.append(write_trajectory_json(os.path.join(root, "json", name + ".json"),
+                                               num_objects, frame_index=i, seed=seed))
+            write_pcd(os.path.join(root, "lidar", "stitched", name + ".pcd"), num_points, "binary", seed=s)
+        elif kind == "lane_violation":
+            rel = os.path.join("A", "s")
+            paths.append(write_lane_violation_json(
+                os.path.join(root, "라벨링데이터", rel, name + ".json"), num_objects, image_size, s))
+            if with_images:
+                write_image(os.path.join(root, "원천데이터", rel, name + ".jpg"), image_size, s)
+        else:
+            raise ValueError(f"알 수 없는 데이터셋 종류: {kind}")
+    return paths
+
+
+def _makedirs_for(path):
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+
+
+def _write_json(path, data):
+    _makedirs_for(path)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    return path
@@ -1,7 +1,10 @@
 import json
 import os
+import time
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from prefetch import prefetch
+from stage_timer import StageTracer
 
 # ────────────────────────────────────────────────────────────────────
 # 0) 경로 설정
@@ -10,6 +13,44 @@ IMG_DIR = "/mnt/d/Dataset/03_Bigdata/Tail_Light/round(20230417095611_Autocar_Tai
 OUT_DIR = os.path.join(BASE_DIR, "annotated_output")
 os.makedirs(OUT_DIR, exist_ok=True)
 
+# 프레임 단위 처리 여부
+#   True : 프레임(이미지)마다 한 번만 읽고, 그 프레임의 모든 annotation을 한 장에 그림
+#   False: 기존처럼 annotation 하나당 이미지 한 장
+GROUP_BY_FRAME = True
+
+# 처리할 최대 개수 (None이면 파일 전체) — 프레임 단위 모드에서는 프레임 수, 아니면 annotation 수
+MAX_ITEMS = None
+
+# 이미지 prefetch: 현재 프레임을 그리는 동안 다음 이미지들을 스레드에서 미리 디코딩
+#   PREFETCH_DEPTH = 0이면 기존처럼 순차 처리
+PREFETCH_DEPTH   = 8     # 미리 읽어 둘 최대 이미지 수
+PREFETCH_MAX_MB  = 1024  # 미리 읽어 둔 이미지의 메모리 상한 [MB]
+PREFETCH_WORKERS = 4     # I/O 스레드 수
+
+# 그리기 백엔드
+#   "matplotlib": Figure + patches + savefig(dpi=200) (기존 방식)
+#   "cv2"       : 원본 해상도 이미지 버퍼에 OpenCV로 직접 그림 (훨씬 빠름, 텍스트는 ASCII만 지원)
+RENDER_BACKEND = "matplotlib"
+
+# 단계별 시간 trace (JSON-lines, 출력 이미지당 한 줄) — None이면 끔
+#   decode(prefetch 스레드) / wait / draw / savefig(또는 encode) 시간과 객체 수, 출력 크기를 기록
+TRACE_PATH = None  # 예: os.path.join(OUT_DIR, "stage_trace.jsonl")
+
+# 콘택트 시트(모자이크) 모드 — 프레임별 200dpi PNG 대신 썸네일을 cols × rows 격자로 모아 저장
+#   - 항상 프레임 단위 (GROUP_BY_FRAME과 무관), 타일마다 프레임 번호/file_name 표시
+#   - reduce: 이미지를 1/n 해상도로 읽음 (1, 2, 4, 8) — JPEG는 디코딩 단계에서 바로 축소되어 빠르고,
+#     PNG는 전체를 디코딩한 뒤 줄이므로 디코딩 시간은 그대로
+#   - bbox 좌표도 1/n로 줄여서 박스 + 클래스 태그만 그림 (attribute 텍스트는 생략)
+#   None이면 기존처럼 프레임(또는 annotation)마다 한 장씩 저장
+CONTACT_SHEET = None  # 예: {"cols": 6, "rows": 5, "reduce": 4, "tile_width": 480}
+CONTACT_SHEET_DIR = os.path.join(OUT_DIR, "contact_sheets")
+
+# OpenCV(cv2)는 cv2 백엔드 / 콘택트 시트 모드에서만 import
+if RENDER_BACKEND == "cv2" or CONTACT_SHEET is not None:
+    from cv_overlay import read_bgr, read_bgr_reduced, draw_rectangle, draw_tag, draw_text_panel, save_bgr
+if CONTACT_SHEET is not None:
+    from contact_sheet import ContactSheetWriter
+
 # ────────────────────────────────────────────────────────────────────
 # 1) JSON 파일 로드
 
@@ -33,32 +74,35 @@ frame_data_by_uuid = {fd["uuid"]: fd for fd in frame_data}
 # instance_uuid → 인스턴스 메타정보 (category_name 등)
 instance_info = {inst["uuid"]: inst for inst in instances}
 
+# frame_data_uuid → 해당 프레임의 annotation 리스트 (파일에 나온 순서 유지)
+annotations_by_frame = {}
+for ann in annotations:
+    annotations_by_frame.setdefault(ann["frame_data_uuid"], []).append(ann)
+
 # ────────────────────────────────────────────────────────────────────
-# 3) 첫 10개 annotation을 순차적으로 처리
+# 3) 그리기 함수
 
-for idx, ann in enumerate(annotations[:550], start=1):
-    # 3-1) frame_data_uuid로 이미지 파일 정보 얻기
-    fd_uuid = ann["frame_data_uuid"]
-    if fd_uuid not in frame_data_by_uuid:
-        print(f"[!] frame_data_uuid '{fd_uuid}' 없음, 스킵")
-        continue
-    fd = frame_data_by_uuid[fd_uuid]
+def annotation_overlay(ann):
+    """
+    annotation 하나 → 그릴 내용 (백엔드와 무관)
+    반환: (bbox [x_min, y_min, x_max, y_max], 짧은 클래스명, attribute 줄 리스트)
+    """
+    bbox = ann["geometry"]["bbox_image2d"]  # [x_min, y_min, x_max, y_max]
 
-    # file_name + file_format → 실제 이미지 파일명 (예: "1681716180099674780.png")
-    img_fname = f"{fd['file_name']}.{fd['file_format']}"
-    img_path = os.path.join(IMG_DIR, img_fname)
-    if not os.path.isfile(img_path):
-        print(f"[!] 이미지 파일을 찾을 수 없습니다: {img_path}, 스킵")
-        continue
+    # 클래스명 (instance의 category_name), 예: "dynamic_object.vehicle.car"
+    inst_uuid = ann["instance_uuid"]
+    cls_name = instance_info.get(inst_uuid, {}).get("category_name", "unknown")
+    short_cls = cls_name.split(".")[-1]  # 마지막 부분(car 등)
 
-    # 3-2) 이미지를 불러와서 Matplotlib 축 준비 (RGB)
-    img = plt.imread(img_path)
-    fig, ax = plt.subplots(1, figsize=(10, 6))
-    ax.imshow(img)
-    ax.set_axis_off()
+    # attribute 값들: 한 줄에 한 개씩 "키: 값" 형식
+    attrs = ann.get("attribute", {})
+    attr_lines = [f"{k}: {v}" for k, v in attrs.items()]
+    return bbox, short_cls, attr_lines
 
-    # 3-3) 해당 annotation의 bbox와 attribute를 그리기
-    bbox = ann["geometry"]["bbox_image2d"]  # [x_min, y_min, x_max, y_max]
+
+def draw_annotation(ax, ann):
+    """annotation 하나의 bbox, 클래스명, attribute 텍스트를 ax에 그림"""
+    bbox, short_cls, attr_lines = annotation_overlay(ann)
     x_min, y_min, x_max, y_max = bbox
     width  = x_max - x_min
     height = y_max - y_min
@@ -74,11 +118,7 @@ for idx, ann in enumerate(annotations[:550], start=1):
     )
     ax.add_patch(rect)
 
-    # (b) 클래스명 (instance의 category_name) 표시
-    inst_uuid = ann["instance_uuid"]
-    cls_name = instance_info.get(inst_uuid, {}).get("category_name", "unknown")
-    # 예: "dynamic_object.vehicle.car"
-    short_cls = cls_name.split(".")[-1]  # 마지막 부분(ca r 등)
+    # (b) 클래스명 표시
     ax.text(
         x_min,
         y_min - 4,
@@ -89,9 +129,6 @@ for idx, ann in enumerate(annotations[:550], start=1):
     )
 
     # (c) attribute 값들을 텍스트로 표시 (bbox 오른쪽 아래에 여러 줄로)
-    attrs = ann.get("attribute", {})
-    # 한 줄에 한 개씩 "키: 값" 형식으로 넣기
-    attr_lines = [f"{k}: {v}" for k, v in attrs.items()]
     if attr_lines:
         # 텍스트 박스를 그릴 위치 (bbox 우측 아래 쪽으로 약간 띄워서)
         text_x = x_max + 2
@@ -110,16 +147,176 @@ for idx, ann in enumerate(annotations[:550], start=1):
             bbox=dict(facecolor="black", alpha=0.6, edgecolor="none", pad=2)
         )
 
-    # 3-4) 제목(어떤 annotation인지 식별용) 추가
-    ax.set_title(f"Annot #{idx}  |  FrameData: {fd_uuid[:8]}..  |  Inst: {inst_uuid[:8]}..")
 
-    # 3-5) 결과 이미지 저장
-    out_fname = f"annot_{idx:02d}_{fd['file_name']}.png"
-    out_path = os.path.join(OUT_DIR, out_fname)
-    plt.tight_layout()
-    fig.savefig(out_path, dpi=200, bbox_inches="tight", pad_inches=0)
-    plt.close(fig)
+def draw_annotation_cv2(img, ann):
+    """draw_annotation()과 같은 내용을 BGR 버퍼에 직접 그림 (원본 픽셀 좌표)"""
+    bbox, short_cls, attr_lines = annotation_overlay(ann)
+    x_min, y_min, x_max, y_max = bbox
+    draw_rectangle(img, bbox, "lime", thickness=2)
+    draw_tag(img, short_cls, (x_min, y_min), "lime")
+    if attr_lines:
+        draw_text_panel(img, attr_lines, (x_max + 2, y_min + 2), "black", alpha=0.6, pad=2)
+
+
+def image_path(fd):
+    """file_name + file_format → 실제 이미지 경로 (예: ".../1681716180099674780.png")"""
+    return os.path.join(IMG_DIR, f"{fd['file_name']}.{fd['file_format']}")
+
+
+def load_image(fd_uuid):
+    """
+    prefetch 스레드에서 실행: frame_data_uuid → (frame_data, 디코딩된 이미지)
+    찾을 수 없으면 None (메시지는 메인 루프에서 출력)
+    """
+    fd = frame_data_by_uuid.get(fd_uuid)
+    if fd is None:
+        return None
+    img_path = image_path(fd)
+    if not os.path.isfile(img_path):
+        return fd, None
+    # matplotlib 백엔드: RGB, cv2 백엔드: BGR uint8, 콘택트 시트: 축소 BGR uint8
+    if CONTACT_SHEET is not None:
+        return fd, read_bgr_reduced(img_path, CONTACT_SHEET.get("reduce", 4))[0]
+    return fd, read_bgr(img_path) if RENDER_BACKEND == "cv2" else plt.imread(img_path)
+
+
+def load_image_timed(fd_uuid, frame_id):
+    """load_image() + decode 시간 기록 → (load_image 결과, timer)"""
+    timer = tracer.frame(frame_id)
+    with timer.stage("decode", background=True):
+        loaded = load_image(fd_uuid)
+    return loaded, timer
+
+
+def report_missing(fd_uuid, loaded):
+    """load_image() 결과가 비어 있으면 이유를 출력하고 True 반환"""
+    if loaded is None:
+        print(f"[!] frame_data_uuid '{fd_uuid}' 없음, 스킵")
+        return True
+    fd, img = loaded
+    if img is None:
+        print(f"[!] 이미지 파일을 찾을 수 없습니다: {image_path(fd)}, 스킵")
+        return True
+    return False
+
+
+def render_frame(img, frame_annotations, title, out_path, timer):
+    """디코딩된 이미지 한 장에 주어진 annotation들을 모두 그린 뒤 저장"""
+    timer.count(objects=len(frame_annotations))
+    if RENDER_BACKEND == "cv2":
+        with timer.stage("draw"):
+            for ann in frame_annotations:
+                draw_annotation_cv2(img, ann)
+            draw_text_panel(img, [title], (0, 0), "black", alpha=0.6)  # 제목은 왼쪽 위에 표시
+        with timer.stage("encode"):
+            save_bgr(out_path, img)
+        return
+
+    with timer.stage("draw"):
+        fig, ax = plt.subplots(1, figsize=(10, 6))
+        ax.imshow(img)
+        ax.set_axis_off()
+
+        for ann in frame_annotations:
+            draw_annotation(ax, ann)
+
+        ax.set_title(title)
+        plt.tight_layout()
+    # savefig = 래스터화 + PNG 인코딩
+    with timer.stage("savefig"):
+        fig.savefig(out_path, dpi=200, bbox_inches="tight", pad_inches=0)
+        plt.close(fig)
+
+
+def render_tile(img, frame_annotations, scale, label, sheets, timer):
+    """축소 이미지에 bbox(좌표 × scale) + 클래스 태그를 그려서 콘택트 시트에 추가"""
+    timer.count(objects=len(frame_annotations))
+    with timer.stage("draw"):
+        for ann in frame_annotations:
+            bbox, short_cls, _ = annotation_overlay(ann)
+            bbox_scaled = [v * scale for v in bbox]
+            draw_rectangle(img, bbox_scaled, "lime", thickness=1)
+            draw_tag(img, short_cls, bbox_scaled[:2], "lime", font_scale=0.35)
+    with timer.stage("tile"):  # 타일 배치 (시트가 다 차면 JPEG 인코딩 포함)
+        saved = sheets.add(img, label)
+    if saved is not None:
+        print(f"[V] 시트 저장: {saved} (타일 {sheets.num_tiles}개까지)")
+
+# ────────────────────────────────────────────────────────────────────
+# 4) 처리
+
+sheets = None
+if CONTACT_SHEET is not None:
+    sheets = ContactSheetWriter(CONTACT_SHEET_DIR, cols=CONTACT_SHEET.get("cols", 6),
+                                rows=CONTACT_SHEET.get("rows", 5),
+                                tile_width=CONTACT_SHEET.get("tile_width", 480))
+
+tracer = StageTracer(TRACE_PATH)
+try:
+    t_wait = time.perf_counter()
+    if GROUP_BY_FRAME or sheets is not None:
+        # 4-a) 프레임 단위: 이미지 디코딩/인코딩 횟수 = 프레임 수
+        frame_items = list(annotations_by_frame.items())[:MAX_ITEMS]
+        print(f"[*] annotation {len(annotations)}개 → 프레임 {len(annotations_by_frame)}개 "
+              f"(이번 실행: {len(frame_items)}개 프레임)")
+
+        loaded_frames = prefetch(frame_items, lambda item: load_image_timed(item[0], item[0]),
+                                 depth=PREFETCH_DEPTH, max_bytes=PREFETCH_MAX_MB * 1024 * 1024,
+                                 num_workers=PREFETCH_WORKERS)
+        for idx, ((fd_uuid, frame_annotations), (loaded, timer)) in enumerate(loaded_frames, start=1):
+            timer.add_time("wait", time.perf_counter() - t_wait)
+            if report_missing(fd_uuid, loaded):
+                t_wait = time.perf_counter()
+                continue
+            fd, img = loaded
+
+            if sheets is not None:
+                render_tile(img, frame_annotations, 1.0 / CONTACT_SHEET.get("reduce", 4),
+                            f"#{idx} {fd['file_name']}", sheets, timer)
+                tracer.record(timer)
+                t_wait = time.perf_counter()
+                continue
+
+            out_fname = f"frame_{idx:04d}_{fd['file_name']}.png"
+            out_path = os.path.join(OUT_DIR, out_fname)
+            title = f"Frame #{idx}  |  FrameData: {fd_uuid[:8]}..  |  Objects: {len(frame_annotations)}"
+            render_frame(img, frame_annotations, title, out_path, timer)
+
+            timer.add_output(out_path)
+            tracer.record(timer)
+            print(f"[+] 저장 완료: {out_path} (annotation {len(frame_annotations)}개)")
+            t_wait = time.perf_counter()
+    else:
+        # 4-b) annotation 단위 (기존 방식): annotation 하나당 이미지 한 장
+        # trace의 frame id는 annotation uuid (없으면 frame_data_uuid)
+        loaded_annotations = prefetch(annotations[:MAX_ITEMS],
+                                      lambda a: load_image_timed(a["frame_data_uuid"],
+                                                                 a.get("uuid", a["frame_data_uuid"])),
+                                      depth=PREFETCH_DEPTH, max_bytes=PREFETCH_MAX_MB * 1024 * 1024,
+                                      num_workers=PREFETCH_WORKERS)
+        for idx, (ann, (loaded, timer)) in enumerate(loaded_annotations, start=1):
+            timer.add_time("wait", time.perf_counter() - t_wait)
+            fd_uuid = ann["frame_data_uuid"]
+            if report_missing(fd_uuid, loaded):
+                t_wait = time.perf_counter()
+                continue
+            fd, img = loaded
+
+            # 제목(어떤 annotation인지 식별용)
+            inst_uuid = ann["instance_uuid"]
+            title = f"Annot #{idx}  |  FrameData: {fd_uuid[:8]}..  |  Inst: {inst_uuid[:8]}.."
+            out_fname = f"annot_{idx:02d}_{fd['file_name']}.png"
+            out_path = os.path.join(OUT_DIR, out_fname)
+            render_frame(img, [ann], title, out_path, timer)
 
-    print(f"[+] 저장 완료: {out_path}")
+            timer.add_output(out_path)
+            tracer.record(timer)
+            print(f"[+] 저장 완료: {out_path}")
+            t_wait = time.perf_counter()
+finally:
+    if sheets is not None:
+        sheets.close()
+        print(f"[V] 콘택트 시트 {len(sheets.paths)}장 저장: {CONTACT_SHEET_DIR} (타일 {sheets.num_tiles}개)")
+    tracer.close()
 
 print("=== 모든 작업 완료 ===")
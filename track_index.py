@@ -0,0 +1,255 @@
+import os
+import numpy as np
+from annotation_store import read_columns
+from box_geometry import corners_to_yaws
+
+# ───────────────────────────────────────────────────────────────
+# trajectory 장면의 트랙 인덱스 (.npz 한 파일)
+#   - JSON을 한 번 훑어서 객체(행)마다 중심/yaw/클래스/track_id/프레임 번호를 연속 배열로 저장
+#   - 행을 (트랙, 프레임) 순으로 정렬한 order + track_offsets → 트랙 하나의 궤적 = 연속 구간
+#   - row_pos(행 → order 안의 위치)로 "이 객체의 최근 K 프레임 궤적"을 이전 프레임 재탐색 없이 꺼냄
+#   - 파일별 (크기, mtime_ns)를 같이 저장해서 새로 생겼거나 바뀐 JSON만 파싱 (나머지 행은 재사용)
+#   - 프레임 번호 = 정렬된 JSON 목록에서의 순서
+#
+# 사용 예)
+#   index = update_track_index("track_index.npz", json_paths)
+#   for track_id, trail, speed in index.frame_tracks(json_path, length=20, frame_rate=10):
+#       ...  # trail: (K, 3) 최근 K개 중심 (마지막이 현재 프레임), speed: [m/s] 또는 NaN
+
+TRACK_INDEX_VERSION = 1
+
+# 프레임 순서로 저장되는 행 배열 (정렬/파생 배열은 저장할 때 다시 계산)
+_ROW_ARRAYS = ("center", "yaw", "track_codes", "class_codes")
+
+
+class TrackIndex:
+    """
+    트랙 인덱스 읽기 전용 래퍼 (모든 배열은 메모리에 올려 둠).
+    • files (F,), frame_row_offsets (F+1,): 프레임 f의 행 = frame_row_offsets[f]:[f+1]
+    • 행 배열 (R,): center (R, 3), yaw, track_codes, class_codes, frame
+    • order: 행을 (트랙, 프레임) 순으로 정렬한 인덱스, track_offsets (T+1,)
+    • row_pos: 행 r의 order 안 위치, step: 같은 트랙 직전 샘플과의 거리 / 프레임 간격 [m/frame]
+    """
+
+    def __init__(self, arrays, path=None):
+        self.path = path
+        for name, value in arrays.items():
+            setattr(self, name, value)
+        self._file_index = {str(p): i for i, p in enumerate(self.files)}
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as npz:
+            return cls({name: npz[name] for name in npz.files}, path)
+
+    @property
+    def num_tracks(self):
+        return len(self.track_offsets) - 1
+
+    def frame_of(self, json_path):
+        """JSON 경로 → 프레임 번호 (인덱스에 없으면 None)"""
+        return self._file_index.get(os.path.abspath(json_path))
+
+    def track_rows(self, track):
+        """트랙 코드 하나의 행 번호 (프레임 순)"""
+        return self.order[self.track_offsets[track]:self.track_offsets[track + 1]]
+
+    def trail_rows(self, row, length):
+        """행 r과 같은 트랙의 최근 length개 행 (r 포함, 프레임 순) — 비용은 length에 비례"""
+        pos = self.row_pos[row]
+        start = max(int(self.track_offsets[self.track_codes[row]]), int(pos) - length + 1)
+        return self.order[start:pos + 1]
+
+    def frame_tracks(self, json_path, length=20, frame_rate=None):
+        """
+        프레임 하나의 객체별 (track_id, trail (K, 3), speed) 리스트 (인덱스에 없는 프레임이면 []).
+        • length: 궤적에 포함할 최대 프레임 수 (현재 프레임 포함)
+        • frame_rate: 초당 프레임 수 — 주면 speed [m/s], 아니면 [m/frame]. 트랙의 첫 샘플은 NaN
+        """
+        f = self.frame_of(json_path)
+        if f is None:
+            return []
+        scale = 1.0 if frame_rate is None else float(frame_rate)
+        out = []
+        for row in range(int(self.frame_row_offsets[f]), int(self.frame_row_offsets[f + 1])):
+            trail = self.center[self.trail_rows(row, length)]
+            out.append((str(self.track_categories[self.track_codes[row]]), trail,
+                        float(self.step[row]) * scale))
+        return out
+
+    def window_files(self, json_path, length):
+        """
+        프레임 하나의 객체별 최근 length개 샘플이 걸친 JSON 경로 목록 (프레임 순, 현재 프레임 포함).
+        궤적/속도를 그린 출력은 이 파일들에 의존하므로 출력 manifest의 입력으로 사용
+        """
+        f = self.frame_of(json_path)
+        if f is None:
+            return []
+        rows = np.concatenate([np.zeros(0, dtype=np.int64)] + [
+            self.trail_rows(row, length)
+            for row in range(int(self.frame_row_offsets[f]), int(self.frame_row_offsets[f + 1]))])
+        frames = np.unique(np.append(self.frame[rows], f))
+        return [str(self.files[i]) for i in frames]
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _parse_frame(json_path, store=None):
+    """JSON 하나 → 중심이 있는 객체의 (center, yaw, track_id 리스트, class_name 리스트)"""
+    columns = None
+    if store is not None:
+        columns = store.rows(json_path, ["center", "vertices", "track_id", "class_name"])
+    if columns is None:
+        columns = read_columns(json_path, "trajectory")
+    valid = ~np.isnan(columns["center"]).any(axis=1)
+    yaw = corners_to_yaws(columns["vertices"][valid])  # 꼭짓점이 없으면 NaN
+    return (columns["center"][valid], yaw,
+            [t for t, ok in zip(columns["track_id"], valid) if ok],
+            [c for c, ok in zip(columns["class_name"], valid) if ok])
+
+
+def _reuse_frame(old, i):
+    """기존 인덱스에서 i번 프레임의 행을 꺼냄 (JSON을 다시 읽지 않음)"""
+    s, e = int(old.frame_row_offsets[i]), int(old.frame_row_offsets[i + 1])
+    return (old.center[s:e], old.yaw[s:e],
+            old.track_categories[old.track_codes[s:e]].tolist(),
+            old.class_categories[old.class_codes[s:e]].tolist())
+
+
+def _derive(arrays):
+    """프레임 순 행 배열 → frame, order, track_offsets, row_pos, step"""
+    counts = np.diff(arrays["frame_row_offsets"])
+    frame = np.repeat(np.arange(len(counts), dtype=np.int64), counts)
+    track = arrays["track_codes"]
+    num_tracks = len(arrays["track_categories"])
+
+    order = np.lexsort((frame, track)).astype(np.int64)  # 트랙 → 프레임 순 (안정 정렬)
+    track_offsets = np.searchsorted(track[order], np.arange(num_tracks + 1)).astype(np.int64)
+    row_pos = np.empty_like(order)
+    row_pos[order] = np.arange(len(order))
+
+    # 정렬된 순서에서 같은 트랙의 이웃 샘플 사이 거리 / 프레임 간격
+    step_sorted = np.full(len(order), np.nan)
+    if len(order) > 1:
+        c = arrays["center"][order]
+        f = frame[order]
+        same = (np.diff(track[order]) == 0) & (np.diff(f) > 0)
+        dist = np.linalg.norm(np.diff(c, axis=0), axis=1)
+        step_sorted[1:][same] = dist[same] / np.diff(f)[same]
+    step = np.empty_like(step_sorted)
+    step[order] = step_sorted
+
+    arrays.update(frame=frame, order=order, track_offsets=track_offsets, row_pos=row_pos, step=step)
+    return arrays
+
+
+def _open_existing(index_path):
+    if index_path is None or not os.path.isfile(index_path):
+        return None
+    try:
+        index = TrackIndex.load(index_path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[!] 트랙 인덱스를 읽을 수 없어 새로 만듭니다: {index_path} ({e})")
+        return None
+    if int(index.version) != TRACK_INDEX_VERSION:
+        return None
+    return index
+
+
+def update_track_index(index_path, json_paths, store=None):
+    """
+    trajectory JSON 목록으로 트랙 인덱스를 만들거나 갱신.
+    • index_path: 인덱스 파일 경로 (.npz)
+    • json_paths: 장면의 JSON 파일 목록 (정렬 순서 = 프레임 순서, 목록에 없는 파일은 제거)
+    • store: 컬럼형 어노테이션 캐시 (있으면 새 프레임도 JSON 대신 캐시에서 읽음)
+    • (크기, mtime_ns)가 같은 파일은 기존 행을 재사용하고, 새로 생겼거나 바뀐 파일만 파싱
+
+    반환: TrackIndex
+    """
+    json_paths = [os.path.abspath(p) for p in json_paths]
+    signatures = np.array([_file_signature(p) for p in json_paths], dtype=np.int64).reshape(-1, 2)
+
+    old = _open_existing(index_path)
+    old_sigs = {}
+    if old is not None:
+        old_sigs = {str(p): (int(size), int(mtime), i) for i, (p, size, mtime) in
+                    enumerate(zip(old.files, old.file_size, old.file_mtime_ns))}
+
+    parts, num_parsed = [], 0
+    for path, (size, mtime) in zip(json_paths, signatures):
+        hit = old_sigs.get(path)
+        if hit is not None and hit[:2] == (int(size), int(mtime)):
+            parts.append(_reuse_frame(old, hit[2]))
+        else:
+            parts.append(_parse_frame(path, store))
+            num_parsed += 1
+    num_reused = len(json_paths) - num_parsed
+
+    if old is not None and num_parsed == 0 and list(old_sigs) == json_paths:
+        print(f"[*] 트랙 인덱스: {num_reused}개 프레임 모두 최신 ({index_path})")
+        return old
+
+    centers = [p[0] for p in parts]
+    track_labels = np.array([t for p in parts for t in p[2]], dtype=str)
+    class_labels = np.array([c for p in parts for c in p[3]], dtype=str)
+    track_categories, track_codes = np.unique(track_labels, return_inverse=True)
+    class_categories, class_codes = np.unique(class_labels, return_inverse=True)
+    arrays = {
+        "version": np.array(TRACK_INDEX_VERSION),
+        "files": np.array(json_paths, dtype=str),
+        "file_size": signatures[:, 0],
+        "file_mtime_ns": signatures[:, 1],
+        "frame_row_offsets": np.concatenate([[0], np.cumsum([len(c) for c in centers])]).astype(np.int64),
+        "center": np.concatenate([np.empty((0, 3))] + centers),
+        "yaw": np.concatenate([np.empty(0)] + [p[1] for p in parts]),
+        "track_codes": track_codes.astype(np.int32),
+        "track_categories": track_categories,
+        "class_codes": class_codes.astype(np.int32),
+        "class_categories": class_categories,
+    }
+    arrays = _derive(arrays)
+
+    # 임시 파일에 쓴 뒤 교체 (중간에 끊겨도 기존 인덱스가 깨지지 않도록)
+    os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+    tmp_path = index_path + ".tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, index_path)
+    print(f"[*] 트랙 인덱스 저장: {index_path} ({num_reused}개 재사용, {num_parsed}개 새로 파싱, "
+          f"트랙 {len(track_categories)}개, 총 {len(track_codes)}행)")
+    return TrackIndex(arrays, index_path)
+
+
+# ───────────────────────────────────────────────────────────────
+# 스크립트용 헬퍼
+
+_OPEN_INDEXES = {}
+
+
+def open_track_index(index_path):
+    """프로세스마다 한 번만 읽는 TrackIndex (파일이 없으면 None)"""
+    if index_path is None or not os.path.isfile(index_path):
+        return None
+    if index_path not in _OPEN_INDEXES:
+        _OPEN_INDEXES[index_path] = TrackIndex.load(index_path)
+    return _OPEN_INDEXES[index_path]
+
+
+def add_trail_collection(ax, trails, colors, linewidth=1.0, alpha=None):
+    """
+    여러 트랙의 궤적(폴리라인)을 Line3DCollection 하나로 3D 축에 추가.
+    • trails: [(K, 3) 배열, ...] — 점이 2개 미만인 궤적은 건너뜀
+    • colors: 궤적별 색상 리스트 (Matplotlib 색상 형식)
+    반환: 추가된 Line3DCollection (그릴 궤적이 없으면 None)
+    """
+    from mpl_toolkits.mplot3d.art3d import Line3DCollection
+
+    keep = [i for i, trail in enumerate(trails) if len(trail) >= 2]
+    if not keep:
+        return None
+    lc = Line3DCollection([trails[i] for i in keep], colors=[colors[i] for i in keep],
+                          linewidths=linewidth, alpha=alpha)
+    ax.add_collection3d(lc)
+    return lc
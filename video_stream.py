@@ -0,0 +1,89 @@
+import os
+import numpy as np
+import cv2
+
+# ───────────────────────────────────────────────────────────────
+# Matplotlib Figure / 이미지 배열을 PNG를 거치지 않고 바로 cv2.VideoWriter에 기록
+#   - 렌더링된 캔버스 버퍼(RGBA) → BGR 변환 → VideoWriter.write
+#   - 프레임 크기는 고정 (첫 프레임 또는 frame_size 인자로 결정)
+
+
+def figure_to_bgr(fig):
+    """
+    Matplotlib Figure를 Agg 캔버스에 그린 뒤 (H, W, 3) BGR uint8 배열로 반환.
+    savefig와 달리 PNG 인코딩/파일 쓰기 없이 캔버스 버퍼를 그대로 사용.
+    """
+    fig.canvas.draw()
+    rgba = np.asarray(fig.canvas.buffer_rgba())  # (H, W, 4), 복사 없음
+    return cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR)
+
+
+def figure_frame_size(fig):
+    """Figure가 Agg 캔버스에 그려질 때의 (width, height) 픽셀 크기"""
+    w, h = fig.get_size_inches() * fig.dpi
+    return int(round(w)), int(round(h))
+
+
+class StreamingVideoWriter:
+    """
+    프레임을 하나씩 받아서 바로 비디오 파일로 인코딩하는 래퍼.
+
+    • output_path: 생성할 비디오 파일 경로 (예: "output.mp4")
+    • fps: 초당 프레임 수
+    • frame_size: (width, height). None이면 첫 프레임 크기로 고정
+    • fourcc: 코덱 문자열 (기본 "mp4v" → .mp4)
+
+    사용 예:
+        with StreamingVideoWriter("out.mp4", fps=10) as writer:
+            writer.write_figure(fig)   # 또는 writer.write(bgr_frame)
+    """
+
+    def __init__(self, output_path, fps=10, frame_size=None, fourcc="mp4v"):
+        self.output_path = output_path
+        self.fps = fps
+        self.frame_size = tuple(frame_size) if frame_size is not None else None
+        self.fourcc = fourcc
+        self.num_frames = 0
+        self._writer = None
+
+    def _open(self, width, height):
+        out_dir = os.path.dirname(self.output_path)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        self.frame_size = (width, height)
+        self._writer = cv2.VideoWriter(
+            self.output_path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, self.frame_size
+        )
+        if not self._writer.isOpened():
+            raise IOError(f"VideoWriter를 열 수 없습니다: {self.output_path}")
+        print(f"비디오 해상도: {width}x{height}, fps: {self.fps} → {self.output_path}")
+
+    def write(self, frame):
+        """(H, W, 3) BGR uint8 프레임 한 장을 기록 (크기가 다르면 고정 크기로 리사이즈)"""
+        if self._writer is None:
+            if self.frame_size is None:
+                self._open(frame.shape[1], frame.shape[0])
+            else:
+                self._open(*self.frame_size)
+
+        width, height = self.frame_size
+        if frame.shape[0] != height or frame.shape[1] != width:
+            frame = cv2.resize(frame, (width, height))
+        self._writer.write(frame)
+        self.num_frames += 1
+
+    def write_figure(self, fig):
+        """Matplotlib Figure를 캔버스 버퍼에서 바로 기록"""
+        self.write(figure_to_bgr(fig))
+
+    def release(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False